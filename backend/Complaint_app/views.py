@@ -16,7 +16,8 @@ from django.utils import timezone
 from account.models import Notification
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from backend.utils import send_otp_email
-from django.core.mail import send_mail
+from account.emails import queue_email
+from account.notifications import notify_user, notify_users
 # Create your views here.
 class ComplaintListCreateView(generics.ListCreateAPIView):
     """
@@ -120,22 +121,19 @@ class ComplaintFeedbackView(APIView):
         
         # Notify admin about the feedback
         try:
-            # Create notification for admin staff
-            admin_users = CustomUser.objects.filter(is_staff=True)
-            for admin in admin_users:
-                Notification.objects.create(
-                    user=admin,
-                    notification_type='complaint',
-                    title=f'Complaint #{complaint.id} needs further action',
-                    message=f'User {complaint.user.email} provided feedback on complaint response and needs further assistance.',
-                    data={
-                        'complaint_id': complaint.id,
-                        'user_email': complaint.user.email,
-                        'rating': resolution_rating,
-                        'action_required': 'review_feedback'
-                    }
-                )
-            
+            # One bulk insert and one channel-layer batch for all admin staff
+            notify_users(
+                CustomUser.objects.filter(is_staff=True).values_list('id', flat=True),
+                notification_type='complaint',
+                title=f'Complaint #{complaint.id} needs further action',
+                message=f'User {complaint.user.email} provided feedback on complaint response and needs further assistance.',
+                data={
+                    'complaint_id': complaint.id,
+                    'user_email': complaint.user.email,
+                    'rating': resolution_rating,
+                    'action_required': 'review_feedback'
+                }
+            )
             
         except Exception as e:
             print(f"Error sending feedback notification: {str(e)}")
@@ -209,8 +207,8 @@ class AdminComplaintResponseView(APIView):
         
         # Create notification for the user
         try:
-            Notification.objects.create(
-                user=complaint.user,
+            notify_user(
+                complaint.user,
                 notification_type='complaint',
                 title=f'Response to your complaint #{complaint.id}',
                 message=f'An admin has responded to your complaint. Please review the response and let us know if it resolves your issue.',
@@ -222,7 +220,7 @@ class AdminComplaintResponseView(APIView):
             )
             
             # Send email notification to user
-            send_mail(
+            queue_email(
                 subject=f'Response to Your Complaint #{complaint.id}',
                 message=f"""
                 Dear {complaint.user.name},
@@ -242,7 +240,6 @@ class AdminComplaintResponseView(APIView):
                 """,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[complaint.user.email],
-                fail_silently=True
             )
         except Exception as e:
             print(f"Error sending response notification: {str(e)}")
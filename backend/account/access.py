@@ -0,0 +1,62 @@
+# account/access.py
+"""
+Cached job-participant checks shared by the chat/video consumers and the
+conversation and file views.
+
+A job's participants are its client and the professionals whose application
+is Accepted. The set is cached per job and dropped whenever an application
+changes (see account.signals) or a view reassigns the job, so reconnect
+storms are served from the cache instead of Job/JobApplication queries.
+"""
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Job, JobApplication
+
+PARTICIPANTS_CACHE_TIMEOUT = 60 * 10
+
+
+def _cache_key(job_id):
+    return f'job_participants:{job_id}'
+
+
+def get_job_participants(job_id):
+    """Return {'client_id': id, 'professional_ids': [ids]}, or None if the job does not exist."""
+    key = _cache_key(job_id)
+    participants = cache.get(key)
+    if participants is not None:
+        return participants
+
+    client_id = Job.objects.filter(job_id=job_id).values_list('client_id', flat=True).first()
+    if client_id is None:
+        return None
+
+    participants = {
+        'client_id': client_id,
+        'professional_ids': list(
+            JobApplication.objects.filter(job_id=job_id, status='Accepted')
+            .values_list('professional_id', flat=True)
+        ),
+    }
+    cache.set(key, participants, PARTICIPANTS_CACHE_TIMEOUT)
+    return participants
+
+
+def is_job_participant(user, job_id):
+    """True if the user is the job's client or an accepted professional."""
+    if not user or user.is_anonymous:
+        return False
+    participants = get_job_participants(job_id)
+    if participants is None:
+        return False
+    return user.id == participants['client_id'] or user.id in participants['professional_ids']
+
+
+ais_job_participant = database_sync_to_async(is_job_participant)
+
+
+def invalidate_job_participants(job_id):
+    # Drop the entry after commit so a concurrent request cannot re-cache
+    # the pre-change participants from a transaction that has not finished.
+    transaction.on_commit(lambda: cache.delete(_cache_key(job_id)))
@@ -0,0 +1,75 @@
+# account/async_views.py
+"""
+Native async DRF views.
+
+DRF's APIView is synchronous, so under Daphne every request to it is run in
+asgiref's thread executor. AsyncAPIView keeps DRF's request parsing,
+negotiation, permissions and exception handling but awaits coroutine
+handlers on the event loop. Handlers must use the async ORM (aget, afirst,
+`async for`, ...) and hand serializers already fetched rows.
+
+Authentication calls `aauthenticate()` on authentication classes that
+provide it (CustomJWTAuthentication does, through its user cache) and falls
+back to running `authenticate()` in a thread. Permission and throttle
+classes are checked inline and must not query the database.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        """APIView.initial() with authentication awaited."""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        for authenticator in self.get_authenticators():
+            aauthenticate = getattr(authenticator, 'aauthenticate', None)
+            if aauthenticate is not None:
+                user_auth_tuple = await aauthenticate(request)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
@@ -1,21 +1,83 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework import exceptions
 import logging
 
 logger = logging.getLogger(__name__)
+
+# Users resolved from tokens are cached briefly so that API polling and
+# websocket connects do not each cost a CustomUser lookup. Entries are
+# dropped whenever the user row changes (see account.signals).
+USER_CACHE_TIMEOUT = 60
+
+
+def _user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    transaction.on_commit(lambda: cache.delete(_user_cache_key(user_id)))
+
+
 class CustomJWTAuthentication(JWTAuthentication):
-    def authenticate(self, request):
+    @staticmethod
+    def get_request_token(request):
         raw_token = request.COOKIES.get('access_token')
         if not raw_token:
             auth_header = request.META.get('HTTP_AUTHORIZATION')
             if auth_header and auth_header.startswith('Bearer '):
                 raw_token = auth_header.split(' ')[1]
-            else:
-                return None  # Don't raise exception, return None
+        return raw_token
+
+    def authenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if not raw_token:
+            return None  # Don't raise exception, return None
         
         try:
             validated_token = self.get_validated_token(raw_token)
             user = self.get_user(validated_token)
             return (user, validated_token)
         except Exception:
-            return None  # Don't raise exception, return None
\ No newline at end of file
+            return None  # Don't raise exception, return None
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views (see account.async_views)."""
+        raw_token = self.get_request_token(request)
+        if not raw_token:
+            return None
+
+        try:
+            validated_token = self.get_validated_token(raw_token)
+            user = await self.aget_user(validated_token)
+            return (user, validated_token)
+        except Exception:
+            return None
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = _user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+    async def aget_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = await cache.aget(_user_cache_key(user_id)) if user_id is not None else None
+        if user is None:
+            # Cache miss: the regular lookup, which also fills the cache
+            return await sync_to_async(self.get_user)(validated_token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
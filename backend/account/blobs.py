@@ -0,0 +1,155 @@
+# account/blobs.py
+"""
+Content-addressed storage for chat attachments.
+
+With CHAT_FILE_STORAGE['CONTENT_ADDRESSED'] on, every attachment is kept
+once in the message storage under cas/<aa>/<bb>/<sha256><ext> and recorded
+as a StoredBlob. Messages point at their blob and its ref_count follows the
+Message rows (see account.signals), so a file that is already stored costs
+one hash and no write. Blobs nobody references any more are removed, with
+their image variants, by the gc_message_blobs command once GC_GRACE_PERIOD
+has passed.
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Message, StoredBlob
+from .previews import VARIANTS, source_name, variant_name
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'CONTENT_ADDRESSED': False,
+    'GC_GRACE_PERIOD': 60 * 60,
+}
+
+BLOB_DIR = 'cas'
+
+
+def get_blob_settings():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_FILE_STORAGE', {})}
+
+
+def content_addressed():
+    return get_blob_settings()['CONTENT_ADDRESSED']
+
+
+def message_storage():
+    return Message._meta.get_field('file').storage
+
+
+def file_sha256(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(sha256, filename):
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def find_blob(sha256):
+    """The StoredBlob for `sha256` when content addressing is on and its file exists."""
+    if not content_addressed() or not sha256:
+        return None
+    blob = StoredBlob.objects.filter(pk=sha256.lower()).first()
+    if blob is None or not message_storage().exists(blob.name):
+        return None
+    # Keep the blob out of the GC grace window while it is being reused
+    StoredBlob.objects.filter(pk=blob.pk).update(last_used_at=timezone.now())
+    return blob
+
+
+def store_blob(file, filename, sha256=None):
+    """Return the StoredBlob holding `file`'s content, writing it only if it is new."""
+    sha256 = sha256 or file_sha256(file)
+    blob = find_blob(sha256)
+    if blob is not None:
+        return blob
+
+    storage = message_storage()
+    size = file.size
+    name = blob_name(sha256, filename)
+    if not storage.exists(name):
+        saved = storage.save(name, file)
+        if saved != name:
+            # A concurrent upload of the same content got there first
+            storage.delete(saved)
+    blob, created = StoredBlob.objects.get_or_create(sha256=sha256, defaults={'name': name, 'size': size})
+    if created:
+        logger.info(f"Stored new blob {name} ({size} bytes)")
+    return blob
+
+
+def add_reference(blob_id):
+    StoredBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + 1, last_used_at=timezone.now())
+
+
+def drop_reference(blob_id):
+    StoredBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, last_used_at=timezone.now()
+    )
+
+
+def recount_references():
+    """Recompute every ref_count from the Message rows; returns the blobs updated."""
+    counts = Message.objects.filter(blob=OuterRef('pk')).values('blob').annotate(total=Count('id')).values('total')
+    return StoredBlob.objects.update(ref_count=Coalesce(Subquery(counts), Value(0)))
+
+
+def collect_garbage(dry_run=False):
+    """
+    Delete unreferenced blobs older than the grace period, plus files under
+    the blob directory that no StoredBlob row points at. Returns
+    (blobs removed, orphan files removed).
+    """
+    cutoff = timezone.now() - timedelta(seconds=get_blob_settings()['GC_GRACE_PERIOD'])
+    storage = message_storage()
+    unreferenced = StoredBlob.objects.filter(ref_count=0, last_used_at__lt=cutoff)
+
+    removed_blobs = 0
+    removed_names = set()
+    for sha256 in unreferenced.values_list('pk', flat=True).iterator():
+        with transaction.atomic():
+            blob = unreferenced.select_for_update(skip_locked=True).filter(pk=sha256).first()
+            if blob is None or blob.messages.exists():
+                continue
+            removed_blobs += 1
+            removed_names.add(blob.name)
+            if not dry_run:
+                blob.delete()
+                for name in [blob.name] + [variant_name(blob.name, variant) for variant in VARIANTS]:
+                    transaction.on_commit(partial(storage.delete, name))
+
+    removed_files = 0
+    # Files of the blobs just removed are deleted with them, not as orphans
+    known = set(StoredBlob.objects.values_list('name', flat=True)) | removed_names
+    for name in _blob_files(storage, BLOB_DIR):
+        if source_name(name) in known or storage.get_modified_time(name) >= cutoff:
+            continue
+        removed_files += 1
+        if not dry_run:
+            storage.delete(name)
+
+    return removed_blobs, removed_files
+
+
+def _blob_files(storage, directory):
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}'
+    for name in directories:
+        yield from _blob_files(storage, f'{directory}/{name}')
@@ -0,0 +1,215 @@
+# account/chat_buffer.py
+"""
+Write-behind persistence for chat messages (CHAT_WRITE_BEHIND['ENABLED']).
+
+Instead of inserting every incoming frame on a sync thread before it is
+broadcast, ChatConsumer appends the message to a process-wide buffer and
+broadcasts it straight away under a temporary id ('pending-<hex>'). The
+buffer is written with a single bulk_create once it holds MAX_BATCH
+messages or FLUSH_INTERVAL seconds after the first pending message, and
+whenever a chat socket disconnects.
+
+Message ids are assigned by that INSERT, like every other Message insert,
+so a message never commits long after the id it was given: one process
+writes its batches one at a time, in the order they were queued. Inserts
+from different processes or requests can still commit out of id order by
+the length of a transaction, exactly as with unbuffered writes, and a
+client polling the history API with `after` may miss such a row until it
+reloads. Once a batch is written each message's room is sent a
+'message_saved' event mapping its temporary id to the real one.
+
+Appending only holds the buffer's lock long enough to queue the message;
+the write itself runs under a separate lock, so chat sends never wait for
+a flush in progress.
+
+A batch that fails to write is retried, ahead of anything queued since,
+up to MAX_ATTEMPTS times. It is then written message by message; a message
+that still fails is logged with its content and dropped, and its room gets
+a 'message_failed' event, so one bad row cannot hold up the rest.
+"""
+import asyncio
+import logging
+import uuid
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import record_new_messages
+from .models import Message
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'ENABLED': False,
+    'MAX_BATCH': 100,
+    'FLUSH_INTERVAL': 0.5,
+    'MAX_ATTEMPTS': 3,
+}
+
+
+def get_write_behind_settings():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_WRITE_BEHIND', {})}
+
+
+def write_behind_enabled():
+    return get_write_behind_settings()['ENABLED']
+
+
+class PendingMessage:
+    """A buffered Message, with the temporary id it was broadcast under and the room to confirm it to."""
+    def __init__(self, message, group):
+        self.message = message
+        self.group = group
+        self.temp_id = f'pending-{uuid.uuid4().hex}'
+        self.attempts = 0
+
+
+class MessageWriteBuffer:
+    def __init__(self, max_batch, flush_interval, max_attempts):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending = []
+        self._lock = None
+        self._write_lock = None
+        self._flush_timer = None
+
+    # Both locks are created lazily so they belong to the running event loop
+
+    @property
+    def lock(self):
+        """Guards _pending and the flush timer; never held across a database write."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def write_lock(self):
+        """Keeps this process's batches writing one at a time, in queue order."""
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    async def append(self, conversation_id, sender, content, group, file_type=None):
+        """Queue the message; returns its PendingMessage (the Message has no id yet)."""
+        pending = PendingMessage(
+            Message(
+                conversation_id=conversation_id,
+                sender=sender,
+                content=content,
+                file_type=file_type,
+                is_read=False,
+                created_at=timezone.now()
+            ),
+            group
+        )
+        async with self.lock:
+            self._pending.append(pending)
+            should_flush = len(self._pending) >= self.max_batch
+
+        if should_flush:
+            # In the background, so this send doesn't wait for the write
+            asyncio.ensure_future(self.flush())
+        else:
+            self._schedule_flush()
+        return pending
+
+    def _schedule_flush(self):
+        if self._flush_timer is None:
+            loop = asyncio.get_running_loop()
+            self._flush_timer = loop.call_later(
+                self.flush_interval,
+                lambda: asyncio.ensure_future(self.flush())
+            )
+
+    @staticmethod
+    def _write(messages):
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            record_new_messages(messages)
+
+    @classmethod
+    def _write_each(cls, batch):
+        """Write the messages one at a time; returns (saved, failed) PendingMessages."""
+        saved, failed = [], []
+        for pending in batch:
+            try:
+                cls._write([pending.message])
+                saved.append(pending)
+            except Exception as e:
+                logger.error(
+                    f"Dropping chat message after {pending.attempts} failed writes: "
+                    f"conversation={pending.message.conversation_id}, sender={pending.message.sender_id}, "
+                    f"content={pending.message.content!r}: {str(e)}"
+                )
+                failed.append(pending)
+        return saved, failed
+
+    async def flush(self):
+        async with self.write_lock:
+            async with self.lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            saved, failed = [], []
+            try:
+                await database_sync_to_async(self._write)([pending.message for pending in batch])
+                saved = batch
+                logger.debug(f"Flushed {len(batch)} buffered chat messages")
+            except Exception as e:
+                for pending in batch:
+                    pending.attempts += 1
+                    # The rolled-back INSERT may have assigned ids; the retry gets new ones
+                    pending.message.pk = None
+                if batch[0].attempts < self.max_attempts:
+                    # Keep the batch (ahead of anything queued since) and retry later
+                    logger.error(f"Chat message flush failed, will retry: {str(e)}")
+                    async with self.lock:
+                        self._pending = batch + self._pending
+                        self._schedule_flush()
+                else:
+                    logger.error(f"Chat message flush failed {batch[0].attempts} times, writing one by one: {str(e)}")
+                    saved, failed = await database_sync_to_async(self._write_each)(batch)
+
+        await self._confirm(saved, failed)
+
+    @staticmethod
+    async def _confirm(saved, failed):
+        channel_layer = get_channel_layer()
+        for pending in saved:
+            await channel_layer.group_send(pending.group, {
+                'type': 'message_saved',
+                'message': {
+                    'event': 'message_saved',
+                    'temp_id': pending.temp_id,
+                    'id': pending.message.id,
+                    'created_at': pending.message.created_at.isoformat(),
+                }
+            })
+        for pending in failed:
+            await channel_layer.group_send(pending.group, {
+                'type': 'message_failed',
+                'message': {'event': 'message_failed', 'temp_id': pending.temp_id}
+            })
+
+
+_buffer = None
+
+
+def get_message_buffer():
+    global _buffer
+    if _buffer is None:
+        options = get_write_behind_settings()
+        _buffer = MessageWriteBuffer(
+            max_batch=options['MAX_BATCH'],
+            flush_interval=options['FLUSH_INTERVAL'],
+            max_attempts=options['MAX_ATTEMPTS'],
+        )
+    return _buffer
@@ -0,0 +1,282 @@
+# account/cloud_uploads.py
+"""
+Staged Cloudinary uploads for profile and job documents.
+
+With CLOUDINARY_UPLOADS['STAGED'] on, request handlers no longer ping
+Cloudinary and upload through CloudinaryField while the client waits.
+stage_document() writes the file to local disk, records a StagedUpload and
+marks the record's *_upload_status 'pending'. The `upload_staged_documents`
+worker then pushes each file to Cloudinary and swaps the resource into the
+record's field, deleting the document it replaces once that commits. An
+upload that can't be swapped in, because it failed or a newer document
+superseded it, is deleted from Cloudinary again. Failed attempts are
+retried with exponential backoff, and after MAX_ATTEMPTS the record is
+marked 'failed'. The worker also deletes 'uploaded' rows once they are
+KEEP_UPLOADED seconds old.
+
+Staging is off unless CLOUDINARY_UPLOADS['STAGED'] is set, because it only
+works where that worker runs (docker-compose's upload-worker service).
+
+BACKEND 'fake' writes "uploads" under MEDIA_ROOT/fake_cloudinary instead,
+so the whole flow can be exercised without Cloudinary credentials.
+"""
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import timedelta
+
+from cloudinary import CloudinaryResource, uploader
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import Job, ProfessionalProfile, StagedUpload
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'STAGED': False,
+    'BACKEND': 'cloudinary',
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,
+    'MAX_BACKOFF': 3600,
+    'LEASE_TIMEOUT': 300,
+    'POLL_INTERVAL': 5,
+    'KEEP_UPLOADED': 86400,
+    'FAKE_ROOT': os.path.join(settings.MEDIA_ROOT, 'fake_cloudinary'),
+}
+
+# target -> (model, CloudinaryField name, upload status field)
+TARGETS = {
+    'profile_verify_doc': (ProfessionalProfile, 'verify_doc', 'verify_doc_upload_status'),
+    'job_document': (Job, 'document', 'document_upload_status'),
+}
+
+
+def get_cloud_upload_settings():
+    return {**DEFAULTS, **getattr(settings, 'CLOUDINARY_UPLOADS', {})}
+
+
+def staged_uploads_enabled():
+    return get_cloud_upload_settings()['STAGED']
+
+
+def _field_options(model, field_name):
+    field = model._meta.get_field(field_name)
+    return {'type': field.type, 'resource_type': field.resource_type, **field.options}
+
+
+class CloudinaryUploader:
+    def upload(self, path, options):
+        return uploader.upload_resource(path, **options)
+
+    def destroy(self, resource):
+        uploader.destroy(resource.public_id, resource_type=resource.resource_type, type=resource.type)
+
+
+class FakeCloudinaryUploader:
+    """Stores "uploads" on local disk and returns resources like Cloudinary's."""
+    def __init__(self, root):
+        self.root = root
+
+    def upload(self, path, options):
+        name, extension = os.path.splitext(os.path.basename(path))
+        public_id = f"{options.get('folder', '')}{uuid.uuid4().hex}"
+        destination = os.path.join(self.root, public_id + extension)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+        return CloudinaryResource(
+            public_id=public_id,
+            format=extension.lstrip('.') or None,
+            version=str(int(time.time())),
+            type=options.get('type', 'upload'),
+            resource_type='raw' if options.get('resource_type') == 'auto' else options.get('resource_type'),
+        )
+
+    def destroy(self, resource):
+        path = os.path.join(self.root, resource.public_id + (f'.{resource.format}' if resource.format else ''))
+        if os.path.exists(path):
+            os.remove(path)
+
+
+_uploader = None
+
+
+def get_uploader():
+    global _uploader
+    if _uploader is None:
+        options = get_cloud_upload_settings()
+        if options['BACKEND'] == 'fake':
+            _uploader = FakeCloudinaryUploader(options['FAKE_ROOT'])
+        else:
+            _uploader = CloudinaryUploader()
+    return _uploader
+
+
+def _set_upload_status(target, object_id, status):
+    model, _, status_field = TARGETS[target]
+    model.objects.filter(pk=object_id).update(**{status_field: status})
+
+
+def stage_document(instance, target, uploaded_file):
+    """
+    Keep `uploaded_file` locally and queue it for the worker. An older
+    staged document for the same record that has not been pushed yet is
+    dropped. Returns the StagedUpload.
+    """
+    _, _, status_field = TARGETS[target]
+    with transaction.atomic():
+        discard_staged(target, instance.pk)
+        staged = StagedUpload(target=target, object_id=instance.pk, original_name=uploaded_file.name)
+        staged.file.save(uploaded_file.name, uploaded_file, save=False)
+        staged.save()
+        _set_upload_status(target, instance.pk, 'pending')
+    setattr(instance, status_field, 'pending')
+    logger.info(f"Staged {target} for {instance.pk}: {staged.file.name}")
+    return staged
+
+
+def discard_staged(target, object_id):
+    """Forget documents for this record that are still waiting for the worker."""
+    waiting = StagedUpload.objects.filter(target=target, object_id=object_id, status='pending')
+    for staged in waiting:
+        staged.file.delete(save=False)
+    waiting.delete()
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to batch_size due uploads as 'uploading' and return them. Rows
+    left in 'uploading' by a worker that died are picked up again after
+    LEASE_TIMEOUT.
+    """
+    options = get_cloud_upload_settings()
+    current = now()
+    due = (
+        Q(status='pending', next_attempt_at__lte=current) |
+        Q(status='uploading', locked_at__lt=current - timedelta(seconds=options['LEASE_TIMEOUT']))
+    )
+    with transaction.atomic():
+        uploads = list(
+            StagedUpload.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if uploads:
+            StagedUpload.objects.filter(id__in=[staged.id for staged in uploads]).update(
+                status='uploading', locked_at=current
+            )
+    return uploads
+
+
+def _record_failure(staged, error, options):
+    staged.attempts += 1
+    staged.last_error = str(error)
+    staged.locked_at = None
+    if staged.attempts >= options['MAX_ATTEMPTS']:
+        staged.status = 'failed'
+        _set_upload_status(staged.target, staged.object_id, 'failed')
+        logger.error(f"Giving up on staged upload {staged.id} after {staged.attempts} attempts: {error}")
+    else:
+        delay = min(options['RETRY_BACKOFF'] * 2 ** (staged.attempts - 1), options['MAX_BACKOFF'])
+        staged.status = 'pending'
+        staged.next_attempt_at = now() + timedelta(seconds=delay)
+        logger.warning(f"Staged upload {staged.id} failed (attempt {staged.attempts}), retrying in {delay}s: {error}")
+    staged.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'next_attempt_at'])
+
+
+def _destroy(cloud, resource):
+    try:
+        cloud.destroy(resource)
+    except Exception as e:
+        logger.warning(f"Could not delete Cloudinary resource {resource.public_id}: {str(e)}")
+
+
+def _swap_in(staged, resource, cloud):
+    """
+    Point the record at the uploaded resource unless a newer document
+    replaced it. The resource it replaces is deleted from Cloudinary once
+    the swap commits. Returns False if the record is gone or superseded.
+    """
+    model, field_name, status_field = TARGETS[staged.target]
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=staged.object_id).first()
+        superseded = StagedUpload.objects.filter(
+            target=staged.target, object_id=staged.object_id, id__gt=staged.id
+        ).exists()
+        if instance is None or superseded:
+            return False
+        previous = getattr(instance, field_name)
+        setattr(instance, field_name, resource)
+        setattr(instance, status_field, 'uploaded')
+        instance.save(update_fields=[field_name, status_field])
+        if previous and getattr(previous, 'public_id', None):
+            transaction.on_commit(lambda: _destroy(cloud, previous))
+    return True
+
+
+def upload_batch(uploads):
+    """Push claimed uploads to Cloudinary and record the outcome of each. Returns (uploaded, failed)."""
+    options = get_cloud_upload_settings()
+    cloud = get_uploader()
+    uploaded = failed = 0
+
+    for staged in uploads:
+        model, field_name, _ = TARGETS[staged.target]
+        try:
+            resource = cloud.upload(staged.file.path, _field_options(model, field_name))
+        except Exception as e:
+            _record_failure(staged, e, options)
+            failed += 1
+            continue
+
+        try:
+            swapped = _swap_in(staged, resource, cloud)
+        except Exception as e:
+            # Nothing points at the new resource; the retry uploads it again
+            _destroy(cloud, resource)
+            _record_failure(staged, e, options)
+            failed += 1
+            continue
+        if not swapped:
+            _destroy(cloud, resource)
+
+        staged.file.delete(save=False)
+        staged.status = 'uploaded'
+        staged.uploaded_at = now()
+        staged.locked_at = None
+        staged.attempts += 1
+        staged.save(update_fields=['file', 'status', 'uploaded_at', 'locked_at', 'attempts'])
+        uploaded += 1
+
+    return uploaded, failed
+
+
+def purge_uploaded():
+    """
+    Delete StagedUpload rows uploaded more than KEEP_UPLOADED seconds ago.
+    Their files are already gone. Rows are kept for a while because _swap_in()
+    checks for newer uploads to tell whether an upload was superseded, so
+    KEEP_UPLOADED must outlast the retry backoff. Returns the number deleted.
+    """
+    cutoff = now() - timedelta(seconds=get_cloud_upload_settings()['KEEP_UPLOADED'])
+    deleted, _ = StagedUpload.objects.filter(status='uploaded', uploaded_at__lt=cutoff).delete()
+    return deleted
+
+
+def drain_staged_uploads(batch_size=None):
+    """Upload everything that is currently due, batch by batch. Returns (uploaded, failed)."""
+    batch_size = batch_size or get_cloud_upload_settings()['BATCH_SIZE']
+    total_uploaded = total_failed = 0
+    while True:
+        uploads = claim_batch(batch_size)
+        if not uploads:
+            break
+        uploaded, failed = upload_batch(uploads)
+        total_uploaded += uploaded
+        total_failed += failed
+    return total_uploaded, total_failed
@@ -1,13 +1,15 @@
 import json
 import logging
-import urllib.parse
 import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.core.cache import cache
 from django.utils import timezone
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from account.models import Job, JobApplication, Conversation, Message, CustomUser
+from account.chat_buffer import get_message_buffer, write_behind_enabled
+from account.access import ais_job_participant, get_job_participants
+from account.heartbeat import get_heartbeat_wheel, heartbeat_enabled
+from account.job_events import job_state_snapshot, job_states_group
 import jwt
 
 logger = logging.getLogger('django')
@@ -15,7 +17,6 @@ logger = logging.getLogger('django')
 class ChatConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.heartbeat_task = None
         self.is_connected = False
         
     async def connect(self):
@@ -23,12 +24,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.job_id = self.scope['url_route']['kwargs']['job_id']
             self.room_group_name = f'chat_{self.job_id}'
             
-            query_string = self.scope.get('query_string', b'').decode()
-            cookies = self.scope.get('cookies', {})
             logger.info(f"WebSocket connect attempt: job_id={self.job_id}")
             
-            # Quick authentication check
-            self.user = await self.authenticate_user(cookies, query_string)
+            # Resolved once by JWTAuthMiddleware
+            self.user = self.scope.get('user')
             
             if not self.user or self.user.is_anonymous:
                 logger.error(f"Authentication failed for job_id={self.job_id}")
@@ -42,13 +41,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.close(code=4003)
                 return
             
+            if write_behind_enabled():
+                # Resolved once so buffered messages skip the per-frame lookups
+                self.conversation_id = await self.get_conversation_id()
+            
             # Join room group
             await self.channel_layer.group_add(self.room_group_name, self.channel_name)
             await self.accept()
             self.is_connected = True
             
-            # Start heartbeat
-            self.heartbeat_task = asyncio.create_task(self.heartbeat_loop())
+            # Heartbeats and idle timeouts come from the shared scheduler
+            if heartbeat_enabled():
+                get_heartbeat_wheel().register(self)
             
             logger.info(f"WebSocket connected successfully: user={self.user.email}, job_id={self.job_id}")
             
@@ -71,66 +75,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
             logger.error(f"Connect error: {str(e)}")
             await self.close(code=4000)
 
-    async def authenticate_user(self, cookies, query_string):
-        """Fast authentication method"""
-        try:
-            # Try cookie first
-            token = cookies.get('access_token')
-            if token:
-                jwt_auth = JWTAuthentication()
-                validated_token = jwt_auth.get_validated_token(token)
-                user = await database_sync_to_async(jwt_auth.get_user)(validated_token)
-                if user:
-                    return user
-            
-            # Try query string
-            if query_string:
-                query_params = dict(urllib.parse.parse_qsl(query_string))
-                token = query_params.get('token')
-                if token:
-                    jwt_auth = JWTAuthentication()
-                    validated_token = jwt_auth.get_validated_token(token)
-                    user = await database_sync_to_async(jwt_auth.get_user)(validated_token)
-                    if user:
-                        return user
-            
-            # Fallback to scope user
-            return self.scope.get('user')
-            
-        except (InvalidToken, TokenError) as e:
-            logger.error(f"Token error: {str(e)}")
-            return None
-        except Exception as e:
-            logger.error(f"Authentication error: {str(e)}")
-            return None
-
-    async def heartbeat_loop(self):
-        """Send periodic heartbeat to keep connection alive"""
-        try:
-            while self.is_connected:
-                await asyncio.sleep(30)  # Send heartbeat every 30 seconds
-                if self.is_connected:
-                    await self.send(text_data=json.dumps({
-                        'type': 'heartbeat',
-                        'timestamp': timezone.now().isoformat()
-                    }))
-        except asyncio.CancelledError:
-            logger.info("Heartbeat task cancelled")
-        except Exception as e:
-            logger.error(f"Heartbeat error: {str(e)}")
-
     async def disconnect(self, close_code):
         logger.info(f"WebSocket disconnect: code={close_code}, user={getattr(self.user, 'email', 'Unknown')}")
         
         self.is_connected = False
         
-        # Cancel heartbeat task
-        if self.heartbeat_task:
-            self.heartbeat_task.cancel()
-            try:
-                await self.heartbeat_task
-            except asyncio.CancelledError:
-                pass
+        get_heartbeat_wheel().unregister(self)
+        
+        # Persist anything this process still holds before the socket goes away
+        if write_behind_enabled():
+            await get_message_buffer().flush()
         
         # Leave room group
         if hasattr(self, 'room_group_name'):
@@ -141,6 +95,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         try:
+            get_heartbeat_wheel().touch(self)
             data = json.loads(text_data)
             
             # Handle heartbeat response
@@ -152,7 +107,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 return
             
             message_content = data['message']
-            message_data = await self.save_message(message_content)
+            if write_behind_enabled():
+                message_data = await self.buffer_message(message_content)
+            else:
+                message_data = await self.save_message(message_content)
             
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -174,31 +132,51 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def user_joined(self, event):
         await self.send(text_data=json.dumps(event['message']))
 
+    async def message_saved(self, event):
+        await self.send(text_data=json.dumps(event['message']))
+
+    async def message_failed(self, event):
+        await self.send(text_data=json.dumps(event['message']))
+
     async def user_left(self, event):
         await self.send(text_data=json.dumps(event['message']))
 
-    @database_sync_to_async
-    def is_user_authorized(self):
+    async def is_user_authorized(self):
         try:
-            job = Job.objects.get(job_id=self.job_id)
-            
-            if job.client_id.id == self.user.id:
-                return True
-            
-            application = JobApplication.objects.filter(
-                job_id=job,
-                professional_id=self.user,
-                status='Accepted'
-            ).first()
-            
-            return application is not None
-            
-        except Job.DoesNotExist:
-            return False
+            return await ais_job_participant(self.user, self.job_id)
         except Exception as e:
             logger.error(f"Authorization error: {str(e)}")
             return False
 
+    @database_sync_to_async
+    def get_conversation_id(self):
+        conversation, created = Conversation.objects.get_or_create(job_id=self.job_id)
+        return conversation.id
+
+    async def buffer_message(self, content):
+        """Queue the message for a batched insert and return it for broadcast."""
+        pending = await get_message_buffer().append(
+            conversation_id=self.conversation_id,
+            sender=self.user,
+            content=content,
+            group=self.room_group_name,
+            file_type='text' if content else None
+        )
+        message = pending.message
+        return {
+            # Replaced by the real id in a 'message_saved' event once written
+            'id': pending.temp_id,
+            'pending': True,
+            'sender': self.user.id,
+            'sender_name': self.user.name,
+            'sender_role': self.user.role,
+            'content': message.content,
+            'file_url': None,
+            'file_type': message.file_type,
+            'created_at': message.created_at.isoformat(),
+            'is_read': False
+        }
+
     @database_sync_to_async
     def save_message(self, content):
         job = Job.objects.get(job_id=self.job_id)
@@ -226,57 +204,48 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
 
 
+# Signaling for a call goes straight to the other participant's channel.
+# Each connected socket registers its channel name in the cache under
+# video_call_peer:<job>:<user>; peers learn about each other from that
+# registry, from peer_joined events and from the sender_channel of any event.
+# A socket re-registers every VIDEO_PEER_REFRESH seconds and re-reads the
+# registry, so the entry of a socket that died without cleaning up expires
+# within VIDEO_PEER_TIMEOUT and signaling falls back to the room group.
+VIDEO_PEER_TIMEOUT = 60
+VIDEO_PEER_REFRESH = 20
+# Trickle ICE candidates arriving within this window are sent as one frame
+ICE_COALESCE_WINDOW = 0.025  # seconds
+
+
+def video_peer_key(job_id, user_id):
+    return f'video_call_peer:{job_id}:{user_id}'
+
+
 class VideoCallConsumer(AsyncWebsocketConsumer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # user id -> channel name; events can add peers before load_peers() runs
+        self.peers = {}
+        self.registered = False
+        self.refresh_task = None
+        self.ice_buffer = []
+        self.ice_flush_task = None
+
     async def connect(self):
         try:
             self.job_id = self.scope['url_route']['kwargs']['job_id']
             self.room_group_name = f'video_call_{self.job_id}'
             
-            # Authentication logic (similar to ChatConsumer)
-            query_string = self.scope.get('query_string', b'').decode()
-            cookies = self.scope.get('cookies', {})
             logger.info(f"VideoCall WebSocket connecting: job_id={self.job_id}")
             
-            self.user = None
-            token = cookies.get('access_token')
-            logger.info(f"Extracted access_token from cookies: {'Present' if token else 'Missing'}")
-            
-            if token:
-                try:
-                    jwt_auth = JWTAuthentication()
-                    validated_token = jwt_auth.get_validated_token(token)
-                    self.user = await database_sync_to_async(jwt_auth.get_user)(validated_token)
-                    logger.info(f"Authenticated user from cookie: {self.user.email} (ID: {self.user.id})")
-                except (InvalidToken, TokenError) as e:
-                    logger.error(f"Token error: {str(e)}")
-                except Exception as e:
-                    logger.error(f"Unexpected authentication error: {str(e)}")
-            
-            # Extract token from query string if not in cookie
-            if not self.user and query_string:
-                try:
-                    query_params = dict(urllib.parse.parse_qsl(query_string))
-                    token = query_params.get('token')
-                    if token:
-                        jwt_auth = JWTAuthentication()
-                        validated_token = jwt_auth.get_validated_token(token)
-                        self.user = await database_sync_to_async(jwt_auth.get_user)(validated_token)
-                        logger.info(f"Authenticated user from query string: {self.user.email} (ID: {self.user.id})")
-                except Exception as e:
-                    logger.error(f"Query string authentication error: {str(e)}")
-            
-            if not self.user:
-                self.user = self.scope.get('user')
-                logger.info(f"Fallback to AuthMiddlewareStack user: {self.user if self.user else 'None'}")
+            # Resolved once by JWTAuthMiddleware
+            self.user = self.scope.get('user')
             
             if not self.user or self.user.is_anonymous:
                 logger.error(f"Unauthenticated video call user: job_id={self.job_id}")
                 await self.close(code=4001)
                 return
             
-            # Now that user is authenticated, we can safely log this
-            logger.info(f"User {self.user.id} joined video call room {self.room_group_name}")
-            
             # Check if user is authorized for this job
             is_authorized = await self.is_user_authorized()
             if not is_authorized:
@@ -284,259 +253,284 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
                 await self.close(code=4003)
                 return
             
-            # Join room group
+            # The group is only used until the peer's channel is known
             await self.channel_layer.group_add(self.room_group_name, self.channel_name)
             await self.accept()
+
+            await cache.aset(video_peer_key(self.job_id, self.user.id), self.channel_name, VIDEO_PEER_TIMEOUT)
+            self.registered = True
+            self.refresh_task = asyncio.create_task(self.refresh_registration())
+            await self.load_peers()
+            if self.peers:
+                await self.send_to_peers({'type': 'peer_joined'})
             logger.info(f"Video call WebSocket accepted: user={self.user.email}, job_id={self.job_id}")
         
         except Exception as e:
             logger.error(f"VideoCall connect error: {str(e)}", exc_info=True)
             await self.close(code=4000)
             return
+
     async def disconnect(self, close_code):
         logger.info(f"Video call WebSocket disconnect: code={close_code}, user={getattr(self.user, 'email', 'Unknown')}")
-       
-        if hasattr(self, 'room_group_name') and hasattr(self, 'user'):
-            # Send call_ended notification to all members
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'call_ended',
-                    'user_id': self.user.id,
-                    'user_name': self.user.name,
-                }
-            )
-            
+
+        if self.ice_flush_task is not None:
+            self.ice_flush_task.cancel()
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+
+        if self.registered:
+            key = video_peer_key(self.job_id, self.user.id)
+            # A reconnect may already have registered a newer channel
+            if await cache.aget(key) == self.channel_name:
+                await cache.adelete(key)
+
+            # Send call_ended notification to the other participants
+            await self.send_to_peers({
+                'type': 'call_ended',
+                'user_id': self.user.id,
+                'user_name': self.user.name,
+                'disconnected': True,
+            })
+
+        if hasattr(self, 'room_group_name'):
             await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
+    async def registered_peers(self):
+        """{user id: channel name} of the job's other participants in the registry."""
+        participants = await database_sync_to_async(get_job_participants)(self.job_id)
+        if participants is None:
+            return {}
+        user_ids = [participants['client_id'], *participants['professional_ids']]
+        keys = {video_peer_key(self.job_id, user_id): user_id for user_id in user_ids if user_id != self.user.id}
+        found = await cache.aget_many(list(keys))
+        return {keys[key]: channel for key, channel in found.items()}
+
+    async def load_peers(self):
+        # Channels learned from events while the registry was read are newer
+        self.peers = {**await self.registered_peers(), **self.peers}
+
+    async def refresh_registration(self):
+        key = video_peer_key(self.job_id, self.user.id)
+        while True:
+            await asyncio.sleep(VIDEO_PEER_REFRESH)
+            try:
+                await cache.aset(key, self.channel_name, VIDEO_PEER_TIMEOUT)
+                # Peers whose entries expired are gone; forget them
+                self.peers = await self.registered_peers()
+            except Exception as e:
+                logger.error(f"Video call registry refresh failed: {str(e)}")
+
+    async def forget_peer(self, user_id, channel):
+        self.peers.pop(user_id, None)
+        key = video_peer_key(self.job_id, user_id)
+        if await cache.aget(key) == channel:
+            await cache.adelete(key)
+
+    def remember_peer(self, event):
+        sender_id = event.get('sender_id')
+        sender_channel = event.get('sender_channel')
+        if sender_id is not None and sender_channel and sender_channel != self.channel_name:
+            self.peers[sender_id] = sender_channel
+
+    async def send_to_peers(self, event):
+        """
+        Direct channel_layer.send to each known peer. Peers whose send fails
+        are dropped from the registry, and the event goes to the room group
+        when no peer is known or none could be reached.
+        """
+        event = {**event, 'sender_id': self.user.id, 'sender_channel': self.channel_name}
+        if not self.peers:
+            await self.load_peers()
+        peers = list(self.peers.items())
+        if peers:
+            results = await asyncio.gather(*[
+                self.channel_layer.send(channel, event) for _, channel in peers
+            ], return_exceptions=True)
+            failed = [(peer, result) for peer, result in zip(peers, results) if isinstance(result, Exception)]
+            for (user_id, channel), error in failed:
+                logger.warning(f"Video call send to user {user_id} failed, dropping {channel}: {str(error)}")
+                await self.forget_peer(user_id, channel)
+            if len(failed) < len(peers):
+                return
+        await self.channel_layer.group_send(self.room_group_name, event)
+
+    async def queue_ice_candidate(self, candidate):
+        self.ice_buffer.append(candidate)
+        if self.ice_flush_task is None:
+            self.ice_flush_task = asyncio.create_task(self.flush_ice_candidates())
+
+    async def flush_ice_candidates(self):
+        try:
+            await asyncio.sleep(ICE_COALESCE_WINDOW)
+        finally:
+            self.ice_flush_task = None
+        candidates, self.ice_buffer = self.ice_buffer, []
+        if candidates:
+            await self.send_to_peers({'type': 'ice_candidates', 'ice_candidates': candidates})
+
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
-        # First get the message type, then use it in logging
             message_type = data.get('type')
+            logger.debug(f"Video call message from user {self.user.id}, room: {self.room_group_name}, type: {message_type}")
             
-            logger.info(f"Current user ID: {self.user.id}, channel: {self.channel_name}")
-            logger.info(f"Message data: {data}")
-            logger.info(f"Received message from user {self.user.id}, room: {self.room_group_name}, type: {message_type}")
-        
             # Handle different WebRTC signaling messages
-            message_type = data.get('type')
-            
             if message_type == 'offer':
                 # Call offer from initiator
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'call_offer',
-                        'offer': data.get('offer'),
-                        'caller_id': self.user.id,
-                        'caller_name': self.user.name,
-                        'caller_role': self.user.role,
-                        'sender_channel': self.channel_name
-                    }
-                )
+                await self.send_to_peers({
+                    'type': 'call_offer',
+                    'offer': data.get('offer'),
+                    'caller_id': self.user.id,
+                    'caller_name': self.user.name,
+                    'caller_role': self.user.role,
+                })
             
             elif message_type == 'answer':
                 # Call answer from receiver
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'call_answer',
-                        'answer': data.get('answer'),
-                        'answerer_id': self.user.id,
-                    }
-                )
+                await self.send_to_peers({
+                    'type': 'call_answer',
+                    'answer': data.get('answer'),
+                    'answerer_id': self.user.id,
+                })
             
             elif message_type == 'ice_candidate':
+                # Forward the COMPLETE ice_candidate object, batched with its neighbours
+                await self.queue_ice_candidate(data.get('ice_candidate'))
 
-                logger.info(f"Received ICE candidate from user {self.user.id}: {data.get('ice_candidate')}")
-                
-                # Make sure to forward the COMPLETE ice_candidate object
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'ice_candidate',
-                        'ice_candidate': data.get('ice_candidate'),  # This should contain the full candidate
-                        'sender_id': self.user.id,
-                    }
-                )
             elif message_type == 'end_call':
                 # User ended call
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'call_ended',
-                        'user_id': self.user.id,
-                        'user_name': self.user.name,
-                    }
-                )
+                await self.send_to_peers({
+                    'type': 'call_ended',
+                    'user_id': self.user.id,
+                    'user_name': self.user.name,
+                })
                 
             elif message_type == 'ping':
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'ping_message',
-                        'message': data.get('message'),
-                        'sender_id': self.user.id,
-                        'sender_channel': self.channel_name
-                    }
-                )
+                await self.send_to_peers({
+                    'type': 'ping_message',
+                    'message': data.get('message'),
+                })
+
             elif message_type == 'testing_signal':
-                logger.info(f"Received test signal from user {self.user.id}: {data.get('message')}")
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'test_signal',
-                        'message': data.get('message'),
-                        'sender_id': self.user.id,
-                        'sender_name': self.user.name
-        }
-    )
+                await self.send_to_peers({
+                    'type': 'test_signal',
+                    'message': data.get('message'),
+                    'sender_name': self.user.name
+                })
+
             elif message_type == 'ready_to_call':
-            # Handle ready_to_call message
-               await self.channel_layer.group_send(
-                self.room_group_name,
-                {
+                await self.send_to_peers({
                     'type': 'ready_to_call',
                     'user_id': self.user.id,
                     'user_name': self.user.name,
-                    'sender_channel': self.channel_name
-                }
-            )
+                })
    
         except json.JSONDecodeError:
             logger.error("Invalid JSON in video call")
         except Exception as e:
             logger.error(f"Video call receive error: {str(e)}")
 
+    async def peer_joined(self, event):
+        self.remember_peer(event)
+
     # Handler for call offer
     async def call_offer(self, event):
-        logger.info(f"Processing call_offer: from={event.get('caller_id')}, to={self.user.id}, same={event.get('sender_channel') == self.channel_name}")
         if event.get('sender_channel') == self.channel_name:
-            logger.info("Skipping sending offer to self")
             return
+        self.remember_peer(event)
         
         await self.send(text_data=json.dumps({
-        'type': 'offer',
-        'offer': event['offer'],
-        'caller_id': event['caller_id'],
-        'caller_name': event['caller_name'],
-        'caller_role': event['caller_role'],
-    }))
+            'type': 'offer',
+            'offer': event['offer'],
+            'caller_id': event['caller_id'],
+            'caller_name': event['caller_name'],
+            'caller_role': event['caller_role'],
+        }))
 
     # Handler for call answer
     async def call_answer(self, event):
+        if event.get('sender_channel') == self.channel_name:
+            return
+        self.remember_peer(event)
+
         await self.send(text_data=json.dumps({
             'type': 'answer',
             'answer': event['answer'],
             'answerer_id': event['answerer_id'],
         }))
+
     async def ping_message(self, event):
         if event.get('sender_channel') == self.channel_name:
             return
+        self.remember_peer(event)
             
         await self.send(text_data=json.dumps({
             'type': 'ping',
             'message': event['message'],
             'sender_id': event['sender_id']
         }))
-    # Handler for ICE candidates
-    async def ice_candidate(self, event):
-    # Add debug logging
-        logger.info(f"Forwarding ICE candidate from {event['sender_id']} to {self.user.id}")
-        
-        # Forward the message to the client
+
+    # Handler for a batch of ICE candidates: one websocket frame per batch
+    async def ice_candidates(self, event):
+        if event.get('sender_channel') == self.channel_name:
+            return
+        self.remember_peer(event)
+
         await self.send(text_data=json.dumps({
-            'type': 'ice_candidate',
-            'ice_candidate': event['ice_candidate'],
+            'type': 'ice_candidates',
+            'ice_candidates': event['ice_candidates'],
             'sender_id': event['sender_id'],
         }))
+
     async def ready_to_call(self, event):
         if event.get('sender_channel') == self.channel_name:
             return
+        self.remember_peer(event)
             
         await self.send(text_data=json.dumps({
             'type': 'ready_to_call',
             'user_id': event['user_id'],
             'user_name': event['user_name']
         }))
+
     # Handler for call ended notification
     async def call_ended(self, event):
+        if event.get('sender_channel') == self.channel_name:
+            return
+        if event.get('disconnected'):
+            self.peers.pop(event.get('sender_id'), None)
+
         await self.send(text_data=json.dumps({
             'type': 'call_ended',
             'user_id': event['user_id'],
             'user_name': event['user_name'],
         }))
+
     async def test_signal(self, event):
-        if event.get('sender_id') != self.user.id:
-            logger.info(f"Forwarding test signal to user {self.user.id}")
-            await self.send(text_data=json.dumps({
-                'type': 'testing_signal',
-                'message': event['message'],
-                'sender_id': event['sender_id'],
-                'sender_name': event['sender_name']
-            }))
-    @database_sync_to_async
-    def is_user_authorized(self):
+        if event.get('sender_channel') == self.channel_name:
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'testing_signal',
+            'message': event['message'],
+            'sender_id': event['sender_id'],
+            'sender_name': event['sender_name']
+        }))
+
+    async def is_user_authorized(self):
+        # Client or professional with an accepted application
         try:
-            job = Job.objects.get(job_id=self.job_id)
-            
-            # Allow job client
-            if job.client_id.id == self.user.id:
-                return True
-            
-            # Allow professionals with accepted applications
-            application = JobApplication.objects.filter(
-                job_id=job,
-                professional_id=self.user,
-                status='Accepted'
-            ).first()
-            
-            return application is not None
-            
-        except Job.DoesNotExist:
-            logger.error(f"Job not found for video call: job_id={self.job_id}")
-            return False
+            return await ais_job_participant(self.user, self.job_id)
         except Exception as e:
             logger.error(f"Video call authorization error: {str(e)}")
             return False
+
+
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        # Authorization similar to ChatConsumer
-        query_string = self.scope.get('query_string', b'').decode()
-        cookies = self.scope.get('cookies', {})
         logger.info(f"Notification WebSocket connecting")
         
-        self.user = None
-        token = cookies.get('access_token')
-        logger.info(f"Extracted access_token from cookies: {'Present' if token else 'Missing'}")
-        
-        if token:
-            try:
-                jwt_auth = JWTAuthentication()
-                validated_token = jwt_auth.get_validated_token(token)
-                self.user = await database_sync_to_async(jwt_auth.get_user)(validated_token)
-                logger.info(f"Authenticated user from cookie: {self.user.email} (ID: {self.user.id})")
-            except (InvalidToken, TokenError) as e:
-                logger.error(f"Token error: {str(e)}")
-            except Exception as e:
-                logger.error(f"Unexpected authentication error: {str(e)}")
-        
-        if not self.user and query_string:
-            try:
-                query_params = dict(urllib.parse.parse_qsl(query_string))
-                token = query_params.get('token')
-                if token:
-                    jwt_auth = JWTAuthentication()
-                    validated_token = jwt_auth.get_validated_token(token)
-                    self.user = await database_sync_to_async(jwt_auth.get_user)(validated_token)
-                    logger.info(f"Authenticated user from query string: {self.user.email} (ID: {self.user.id})")
-            except Exception as e:
-                logger.error(f"Query string authentication error: {str(e)}")
-        
-        if not self.user:
-            self.user = self.scope.get('user')
-            logger.info(f"Fallback to AuthMiddlewareStack user: {self.user if self.user else 'None'}")
+        # Resolved once by JWTAuthMiddleware
+        self.user = self.scope.get('user')
         
         if not self.user or self.user.is_anonymous:
             logger.error(f"Unauthenticated notification user")
@@ -565,6 +559,11 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.notification_group_name,
                 self.channel_name
             )
+        if getattr(self, 'job_states_subscribed', False):
+            await self.channel_layer.group_discard(
+                job_states_group(self.user.id),
+                self.channel_name
+            )
 
     async def receive(self, text_data):
         # This consumer primarily listens for notifications, but we can handle client messages if needed
@@ -578,6 +577,21 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 logger.info(f"User {self.user.id} marked notification {notification_id} as read")
                 # You could update a Notification model here if you implement it
 
+            elif data.get('type') == 'subscribe_job_states':
+                # Job-state deltas from now on, starting from a full snapshot
+                if not getattr(self, 'job_states_subscribed', False):
+                    await self.channel_layer.group_add(
+                        job_states_group(self.user.id),
+                        self.channel_name
+                    )
+                    self.job_states_subscribed = True
+                job_states = await database_sync_to_async(job_state_snapshot)(self.user)
+                await self.send(text_data=json.dumps({
+                    'type': 'job_states_snapshot',
+                    'job_states': job_states,
+                    'timestamp': timezone.now().isoformat()
+                }))
+
         except json.JSONDecodeError:
             logger.error("Invalid JSON in notification websocket")
         except Exception as e:
@@ -587,4 +601,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     async def send_notification(self, event):
         # Send notification to WebSocket
         await self.send(text_data=json.dumps(event["content"]))
-        logger.info(f"Sent notification to user {self.user.id}: {event['content'].get('type')}")
\ No newline at end of file
+        logger.info(f"Sent notification to user {self.user.id}: {event['content'].get('type')}")
+
+    # Handler for job-state deltas (account.job_events)
+    async def job_state(self, event):
+        await self.send(text_data=json.dumps(event["content"]))
@@ -0,0 +1,180 @@
+# account/counters.py
+"""
+Per-user unread counters for chat messages and notifications.
+
+The badge endpoints read a single UnreadCounter row instead of counting
+Message/Notification rows on every poll. Every write path that creates or
+reads messages and notifications goes through the functions below.
+
+Increments of existing counters are applied once the caller's transaction
+commits, in a short transaction of their own run at READ COMMITTED
+(account.transactions). Two messages for one user at the same moment update
+the same row; at the database's default SERIALIZABLE level one of them
+would be aborted, while at READ COMMITTED the later F() increment waits and
+applies on top of the earlier one. Keeping them out of the caller's
+transaction means a counter write never aborts the message, notification or
+read that caused it. A missing row is still created in the caller's
+transaction, from the source tables as that transaction sees them, so the
+rest of the transaction's changes are counted exactly once.
+"""
+from collections import Counter
+from functools import partial
+
+from asgiref.sync import sync_to_async
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils.timezone import now
+
+from .models import Job, Message, Notification, UnreadCounter
+from .transactions import run_in_transaction
+
+
+def _ensure_counters(user_ids):
+    """
+    Create missing counter rows straight from the source tables and return
+    the ids of users whose rows already existed. Rows built this way already
+    include whatever was just written, so they must not be incremented again.
+    """
+    existing = set(
+        UnreadCounter.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+    )
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    if missing:
+        counts = compute_unread_counts(missing)
+        UnreadCounter.objects.bulk_create(
+            [
+                UnreadCounter(user_id=user_id, **counts.get(user_id, {'messages': 0, 'notifications': 0}))
+                for user_id in missing
+            ],
+            ignore_conflicts=True
+        )
+    return existing
+
+
+def _write_increments(field, increments):
+    # Users receiving the same delta share one UPDATE statement
+    users_by_delta = {}
+    for user_id, delta in increments.items():
+        users_by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        UnreadCounter.objects.filter(user_id__in=sorted(user_ids)).update(
+            **{field: Greatest(F(field) + delta, 0)},
+            updated_at=now()
+        )
+
+
+def _apply_increments(field, increments):
+    """Add the per-user deltas in `increments` to `field` once the current transaction commits."""
+    increments = {user_id: delta for user_id, delta in increments.items() if delta}
+    if not increments:
+        return
+    existing = _ensure_counters(list(increments))
+    increments = {user_id: delta for user_id, delta in increments.items() if user_id in existing}
+    if not increments:
+        return
+    transaction.on_commit(partial(run_in_transaction, _write_increments, field, increments, read_committed=True))
+
+
+def record_new_messages(messages):
+    """Count newly created unread messages for the other participants of each job."""
+    messages = [message for message in messages if not message.is_read]
+    if not messages:
+        return
+
+    conversation_ids = {message.conversation_id for message in messages}
+    participants = {
+        row['conversation__id']: (row['client_id'], row['professional_id'])
+        for row in Job.objects.filter(conversation__id__in=conversation_ids).values(
+            'conversation__id', 'client_id', 'professional_id'
+        )
+    }
+
+    increments = Counter()
+    for message in messages:
+        for user_id in set(participants.get(message.conversation_id, ())):
+            if user_id is not None and user_id != message.sender_id:
+                increments[user_id] += 1
+    _apply_increments('messages', increments)
+
+
+def record_new_notifications(notifications):
+    increments = Counter(
+        notification.user_id for notification in notifications if not notification.is_read
+    )
+    _apply_increments('notifications', increments)
+
+
+def record_messages_read(user_id, count):
+    _apply_increments('messages', {user_id: -count})
+
+
+def record_notifications_read(user_id, count):
+    _apply_increments('notifications', {user_id: -count})
+
+
+def compute_unread_counts(user_ids=None):
+    """
+    Count unread messages and notifications from the source tables.
+    Returns {user_id: {'messages': n, 'notifications': n}} for users with any.
+    """
+    counts = {}
+
+    def add(user_id, field, value):
+        counts.setdefault(user_id, {'messages': 0, 'notifications': 0})[field] += value
+
+    notifications = Notification.objects.filter(is_read=False)
+    if user_ids is not None:
+        notifications = notifications.filter(user_id__in=user_ids)
+    for row in notifications.values('user_id').annotate(total=Count('id')):
+        add(row['user_id'], 'notifications', row['total'])
+
+    # Same rule as UnreadMessagesCountView: unread messages in conversations
+    # of jobs the user is the client or professional of, sent by someone else.
+    unread_messages = Message.objects.filter(is_read=False)
+    for participant in ('client_id', 'professional_id'):
+        field = f'conversation__job__{participant}'
+        messages = unread_messages.filter(**{f'{field}__isnull': False}).exclude(sender_id=F(field))
+        if user_ids is not None:
+            messages = messages.filter(**{f'{field}__in': user_ids})
+        for row in messages.values(field).annotate(total=Count('id')):
+            add(row[field], 'messages', row['total'])
+
+    return counts
+
+
+def get_unread_counts(user):
+    """O(1) badge lookup; builds the counter row from source tables on first use."""
+    counter = UnreadCounter.objects.filter(user=user).values('messages', 'notifications').first()
+    if counter is None:
+        _ensure_counters([user.id])
+        counter = UnreadCounter.objects.filter(user=user).values('messages', 'notifications').first()
+    return counter
+
+
+async def aget_unread_counts(user):
+    """get_unread_counts() for async views."""
+    counters = UnreadCounter.objects.filter(user=user).values('messages', 'notifications')
+    counter = await counters.afirst()
+    if counter is None:
+        await sync_to_async(_ensure_counters)([user.id])
+        counter = await counters.afirst()
+    return counter
+
+
+def rebuild_unread_counters(user_ids=None):
+    """Reset counters from the source tables. Returns the number of rows written."""
+    counts = compute_unread_counts(user_ids)
+    with transaction.atomic():
+        stale = UnreadCounter.objects.exclude(user_id__in=counts.keys())
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        stale.update(messages=0, notifications=0, updated_at=now())
+        UnreadCounter.objects.bulk_create(
+            [UnreadCounter(user_id=user_id, **values) for user_id, values in counts.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['messages', 'notifications', 'updated_at']
+        )
+    return len(counts)
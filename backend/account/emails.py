@@ -0,0 +1,190 @@
+# account/emails.py
+"""
+Database-backed email outbox.
+
+Request handlers call queue_email(), which only inserts an OutboundEmail row,
+so no worker thread waits on an SMTP round-trip. The `send_queued_emails`
+management command claims due rows in batches and delivers them over a single
+reused SMTP connection; failures are retried with exponential backoff until
+EMAIL_OUTBOX['MAX_ATTEMPTS'] is reached.
+
+Deployments without that worker keep EMAIL_OUTBOX['SEND_ON_COMMIT'] on: each
+queued email is then also sent as soon as the queuing transaction commits,
+and only a failed send is left for the worker to retry.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import OutboundEmail
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,
+    'MAX_BACKOFF': 3600,
+    'LEASE_TIMEOUT': 300,
+    'POLL_INTERVAL': 5,
+    'SEND_ON_COMMIT': True,
+}
+
+
+def get_outbox_settings():
+    return {**DEFAULTS, **getattr(settings, 'EMAIL_OUTBOX', {})}
+
+
+def queue_email(subject, message, recipient_list, from_email=None, html_message=None):
+    """Queue an email for the outbox worker; same arguments as send_mail."""
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+    if get_outbox_settings()['SEND_ON_COMMIT']:
+        transaction.on_commit(lambda: _send_now(email.id))
+    return email
+
+
+def _send_now(email_id):
+    """Send one queued email straight away unless a worker has already claimed it."""
+    try:
+        claimed = OutboundEmail.objects.filter(id=email_id, status='pending').update(
+            status='sending', locked_at=now()
+        )
+        if not claimed:
+            return
+        connection = get_connection(fail_silently=False)
+        try:
+            send_batch([OutboundEmail.objects.get(id=email_id)], connection)
+        finally:
+            connection.close()
+    except Exception as e:
+        # The row stays in the outbox for the worker, or the lease timeout, to pick up
+        logger.error(f"Could not send email {email_id} on commit: {str(e)}")
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to batch_size due emails as 'sending' and return them. Rows left
+    in 'sending' by a worker that died are picked up again after LEASE_TIMEOUT.
+    """
+    options = get_outbox_settings()
+    current = now()
+    due = (
+        Q(status='pending', next_attempt_at__lte=current) |
+        Q(status='sending', locked_at__lt=current - timedelta(seconds=options['LEASE_TIMEOUT']))
+    )
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if emails:
+            OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                status='sending', locked_at=current
+            )
+    return emails
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error, options):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.locked_at = None
+    if email.attempts >= options['MAX_ATTEMPTS']:
+        email.status = 'failed'
+        logger.error(f"Giving up on email {email.id} after {email.attempts} attempts: {error}")
+    else:
+        delay = min(options['RETRY_BACKOFF'] * 2 ** (email.attempts - 1), options['MAX_BACKOFF'])
+        email.status = 'pending'
+        email.next_attempt_at = now() + timedelta(seconds=delay)
+        logger.warning(f"Email {email.id} failed (attempt {email.attempts}), retrying in {delay}s: {error}")
+    email.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'next_attempt_at'])
+
+
+def send_batch(emails, connection):
+    """
+    Deliver claimed emails over an already opened connection and record the
+    outcome of each. Returns (sent, failed).
+    """
+    options = get_outbox_settings()
+    sent = failed = 0
+
+    for email in emails:
+        try:
+            try:
+                _build_message(email, connection).send()
+            except smtplib.SMTPServerDisconnected:
+                # Server closed an idle connection; reconnect and try once more
+                connection.close()
+                connection.open()
+                _build_message(email, connection).send()
+        except Exception as e:
+            _record_failure(email, e, options)
+            failed += 1
+            continue
+
+        email.status = 'sent'
+        email.sent_at = now()
+        email.locked_at = None
+        email.attempts += 1
+        email.save(update_fields=['status', 'sent_at', 'locked_at', 'attempts'])
+        sent += 1
+
+    return sent, failed
+
+
+def drain_outbox(batch_size=None):
+    """
+    Send everything that is currently due, batch by batch, over one SMTP
+    connection that is only opened if there is something to send.
+    Returns (sent, failed).
+    """
+    batch_size = batch_size or get_outbox_settings()['BATCH_SIZE']
+    total_sent = total_failed = 0
+    connection = None
+    try:
+        while True:
+            emails = claim_batch(batch_size)
+            if not emails:
+                break
+            if connection is None:
+                connection = get_connection(fail_silently=False)
+                try:
+                    connection.open()
+                except Exception:
+                    # Hand the batch back untouched; the caller retries later
+                    OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                        status='pending', locked_at=None
+                    )
+                    raise
+            sent, failed = send_batch(emails, connection)
+            total_sent += sent
+            total_failed += failed
+    finally:
+        if connection is not None:
+            connection.close()
+    return total_sent, total_failed
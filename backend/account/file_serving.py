@@ -0,0 +1,164 @@
+# account/file_serving.py
+"""
+Download responses for chat attachments.
+
+FILE_SERVING['MODE'] picks who sends the bytes once the permission check
+has passed:
+
+  'python'      Django streams the file itself (development default).
+  'x-accel'     nginx serves it through an internal location; the response
+                only carries X-Accel-Redirect, e.g.
+
+                    location /protected/message/ {
+                        internal;
+                        alias /app/media/message/;
+                    }
+
+  'x-sendfile'  Apache mod_xsendfile / lighttpd serve the absolute path
+                given in X-Sendfile.
+
+Every attachment and variant URL handed to clients points at this view
+(message_file_url()); MEDIA_ROOT/message is never mounted as static files.
+
+In every mode ETag / Last-Modified are computed from the file's stat and
+conditional requests are answered with 304 without touching the file. In
+the offload modes the web server handles Range; in 'python' mode a single
+byte range is served here with 206.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+DEFAULTS = {
+    'MODE': 'python',
+    'INTERNAL_PREFIX': '/protected/message/',
+    'CACHE_MAX_AGE': 60 * 60,
+}
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_serving_settings():
+    return {**DEFAULTS, **getattr(settings, 'FILE_SERVING', {})}
+
+
+def message_file_url(name, request=None):
+    """The serve_message_file URL of a stored attachment or variant, absolute if `request` is given."""
+    url = reverse('serve_message_file', kwargs={'file_path': name})
+    return request.build_absolute_uri(url) if request else url
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) for a single satisfiable 'bytes=' range, None when the
+    header should be ignored (absent, multiple ranges or malformed) and
+    False when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class RangeFileWrapper:
+    """Yield `length` bytes of `file` starting at `offset`."""
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.file.seek(offset)
+        self.remaining = length
+
+    def __iter__(self):
+        try:
+            while self.remaining > 0:
+                block = self.file.read(min(STREAM_BLOCK_SIZE, self.remaining))
+                if not block:
+                    break
+                self.remaining -= len(block)
+                yield block
+        finally:
+            self.file.close()
+
+
+def serve_file(request, full_path, relative_path):
+    """Build the download response for `full_path` (already permission checked)."""
+    options = get_serving_settings()
+    mode = options['MODE']
+    stat = os.stat(full_path)
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        filename = os.path.basename(full_path)
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        if mode == 'x-accel':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = options['INTERNAL_PREFIX'] + quote(relative_path)
+        elif mode == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = _python_response(request, full_path, stat, etag, content_type)
+
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = f"private, max-age={options['CACHE_MAX_AGE']}"
+    return response
+
+
+def _python_response(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET':
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag:
+            byte_range = parse_range(request.headers.get('Range'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            RangeFileWrapper(open(full_path, 'rb'), start, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
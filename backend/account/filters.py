@@ -0,0 +1,54 @@
+# account/filters.py
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _parse_decimal(value, name):
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError):
+        raise InvalidFilter(f'{name} must be a number')
+
+
+def _parse_date(value, name):
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise InvalidFilter(f'{name} must be a date in YYYY-MM-DD format')
+    return parsed
+
+
+def filter_open_jobs(queryset, query_params):
+    """
+    Apply the open-jobs feed filters from the query string:
+    min_budget, max_budget, deadline_after, deadline_before and q (keyword).
+    """
+    min_budget = query_params.get('min_budget')
+    if min_budget:
+        queryset = queryset.filter(budget__gte=_parse_decimal(min_budget, 'min_budget'))
+
+    max_budget = query_params.get('max_budget')
+    if max_budget:
+        queryset = queryset.filter(budget__lte=_parse_decimal(max_budget, 'max_budget'))
+
+    deadline_after = query_params.get('deadline_after')
+    if deadline_after:
+        queryset = queryset.filter(deadline__gte=_parse_date(deadline_after, 'deadline_after'))
+
+    deadline_before = query_params.get('deadline_before')
+    if deadline_before:
+        queryset = queryset.filter(deadline__lte=_parse_date(deadline_before, 'deadline_before'))
+
+    keyword = (query_params.get('q') or '').strip()
+    if keyword:
+        queryset = queryset.filter(Q(title__icontains=keyword) | Q(description__icontains=keyword))
+
+    return queryset
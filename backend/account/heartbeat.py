@@ -0,0 +1,175 @@
+# account/heartbeat.py
+"""
+Process-wide heartbeat and idle-timeout scheduler for chat sockets.
+
+Instead of one sleeping task per ChatConsumer, every connected consumer is
+placed in one slot of a timing wheel with INTERVAL / TICK slots. A single
+task advances the wheel once per TICK and only touches the consumers in the
+current slot, so each socket gets a heartbeat once per INTERVAL and is
+closed once it has been silent for IDLE_TIMEOUT seconds.
+
+A heartbeat counts as missed when nothing (a heartbeat_response or any other
+frame) arrived from the client since the previous one. Counters are kept per
+process and published to the cache once per wheel rotation; see
+get_cluster_metrics().
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'INTERVAL': 30,
+    'TICK': 1,
+    'IDLE_TIMEOUT': 120,
+}
+
+IDLE_CLOSE_CODE = 4008
+METRICS_PROCESSES_KEY = 'heartbeat_metrics:processes'
+
+
+def get_heartbeat_settings():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_HEARTBEAT', {})}
+
+
+class HeartbeatWheel:
+    def __init__(self, interval, tick, idle_timeout):
+        self.interval = interval
+        self.tick = tick
+        self.idle_timeout = idle_timeout
+        self.slot_count = max(1, round(interval / tick))
+        self.slots = [set() for _ in range(self.slot_count)]
+        self.slot_of = {}
+        self.cursor = 0
+        self.task = None
+        self.process_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.counters = {
+            'heartbeats_sent': 0,
+            'missed_heartbeats': 0,
+            'idle_disconnects': 0,
+        }
+
+    @property
+    def live_connections(self):
+        return len(self.slot_of)
+
+    def register(self, consumer):
+        self.touch(consumer)
+        consumer.last_heartbeat_at = None
+        # The slot just behind the cursor comes round last: first beat in ~INTERVAL
+        slot = (self.cursor - 1) % self.slot_count
+        self.slots[slot].add(consumer)
+        self.slot_of[consumer] = slot
+        self._ensure_running()
+
+    def unregister(self, consumer):
+        slot = self.slot_of.pop(consumer, None)
+        if slot is not None:
+            self.slots[slot].discard(consumer)
+
+    @staticmethod
+    def touch(consumer):
+        """Record inbound activity from the client."""
+        consumer.last_activity = time.monotonic()
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+
+            due = list(self.slots[self.cursor])
+            self.cursor = (self.cursor + 1) % self.slot_count
+            if due:
+                await asyncio.gather(*[self._beat(consumer) for consumer in due], return_exceptions=True)
+            if self.cursor == 0:
+                await self.publish_metrics()
+
+    async def _beat(self, consumer):
+        now = time.monotonic()
+        if consumer.last_heartbeat_at is not None and consumer.last_activity < consumer.last_heartbeat_at:
+            self.counters['missed_heartbeats'] += 1
+
+        if self.idle_timeout and now - consumer.last_activity >= self.idle_timeout:
+            self.counters['idle_disconnects'] += 1
+            self.unregister(consumer)
+            logger.info(f"Closing idle chat socket: user={getattr(consumer.user, 'id', None)}")
+            await consumer.close(code=IDLE_CLOSE_CODE)
+            return
+
+        consumer.last_heartbeat_at = now
+        self.counters['heartbeats_sent'] += 1
+        await consumer.send(text_data=json.dumps({
+            'type': 'heartbeat',
+            'timestamp': timezone.now().isoformat()
+        }))
+
+    def snapshot(self):
+        return {
+            'process': self.process_id,
+            'live_connections': self.live_connections,
+            **self.counters,
+            'updated_at': timezone.now().isoformat(),
+        }
+
+    async def publish_metrics(self):
+        try:
+            ttl = max(self.interval * 3, 60)
+            processes = await cache.aget(METRICS_PROCESSES_KEY) or []
+            if self.process_id not in processes:
+                await cache.aset(METRICS_PROCESSES_KEY, processes + [self.process_id], None)
+            await cache.aset(f'heartbeat_metrics:{self.process_id}', self.snapshot(), ttl)
+        except Exception as e:
+            logger.error(f"Failed to publish heartbeat metrics: {str(e)}")
+
+
+_wheel = None
+
+
+def get_heartbeat_wheel():
+    global _wheel
+    if _wheel is None:
+        options = get_heartbeat_settings()
+        _wheel = HeartbeatWheel(
+            interval=options['INTERVAL'],
+            tick=options['TICK'],
+            idle_timeout=options['IDLE_TIMEOUT'],
+        )
+    return _wheel
+
+
+def heartbeat_enabled():
+    return get_heartbeat_settings()['ENABLED']
+
+
+def get_cluster_metrics():
+    """Latest published snapshot of every worker process, plus totals."""
+    processes = cache.get(METRICS_PROCESSES_KEY) or []
+    snapshots = cache.get_many([f'heartbeat_metrics:{process}' for process in processes])
+    workers = sorted(snapshots.values(), key=lambda snapshot: snapshot['process'])
+
+    # Forget processes whose snapshot expired
+    alive = [snapshot['process'] for snapshot in workers]
+    if len(alive) != len(processes):
+        cache.set(METRICS_PROCESSES_KEY, alive, None)
+
+    totals = {
+        field: sum(snapshot[field] for snapshot in workers)
+        for field in ('live_connections', 'heartbeats_sent', 'missed_heartbeats', 'idle_disconnects')
+    }
+    return {'totals': totals, 'workers': workers}
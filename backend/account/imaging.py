@@ -0,0 +1,56 @@
+# account/imaging.py
+"""
+Pillow rendering for chat image variants.
+
+This module runs inside the preview process pool (see account.previews),
+so it must not import Django: worker processes are spawned fresh and never
+configure settings.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+def _open_rgb(source_path):
+    image = Image.open(source_path)
+    image.seek(0)  # First frame of animated GIFs
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    return image
+
+
+def render_variants(source_path, targets, quality):
+    """
+    Render WebP variants of `source_path`.
+
+    `targets` maps a variant name to (output path, size, crop): with crop the
+    image is cut to a size x size square, otherwise it is scaled down to fit
+    in size x size. Outputs that already exist are reused. Returns
+    {variant: (width, height)}.
+    """
+    results = {}
+    image = None
+    for variant, (output_path, size, crop) in targets.items():
+        if os.path.exists(output_path):
+            with Image.open(output_path) as existing:
+                results[variant] = existing.size
+            continue
+
+        if image is None:
+            image = _open_rgb(source_path)
+        if crop:
+            rendered = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        else:
+            rendered = image.copy()
+            rendered.thumbnail((size, size), Image.LANCZOS)
+
+        # Write next to the target and rename, so readers never see a partial file
+        partial_path = f'{output_path}.tmp'
+        rendered.save(partial_path, 'WEBP', quality=quality, method=4)
+        os.replace(partial_path, output_path)
+        results[variant] = rendered.size
+
+    if image is not None:
+        image.close()
+    return results
@@ -0,0 +1,95 @@
+# account/job_events.py
+"""
+Job-state snapshots and change events.
+
+job_state_snapshot() returns every job a user takes part in with its
+applications in one query (a LEFT JOIN of jobs and applications, grouped
+here), replacing the per-job application queries CheckJobStatesView used
+to run.
+
+Views that change a job or its applications call publish_job_states();
+once the transaction commits, the job's new state is pushed to the
+job_states_<user_id> group of its client and every applicant. Only the
+client sees every application; an applicant's copy, like their snapshot,
+lists just their own, so applicants never see each other's emails.
+NotificationConsumer adds a socket to that group when the client sends
+{"type": "subscribe_job_states"} and replies with a full snapshot, so the
+client only needs to resync after reconnecting.
+"""
+from django.utils import timezone
+
+from .models import Job, JobApplication
+from .notifications import send_realtime
+
+JOB_STATE_FIELDS = (
+    'job_id', 'title', 'status', 'rating', 'client_id',
+    'applications__application_id',
+    'applications__professional_id',
+    'applications__professional_id__email',
+    'applications__status',
+)
+
+
+def job_states_group(user_id):
+    return f'job_states_{user_id}'
+
+
+def _job_states(jobs):
+    """Build [{job..., 'applications': [...]}] from a Job queryset in one query."""
+    states = {}
+    rows = jobs.order_by('job_id', 'applications__application_id').values_list(*JOB_STATE_FIELDS)
+    for job_id, title, job_status, rating, client_id, application_id, professional_id, email, application_status in rows:
+        state = states.get(job_id)
+        if state is None:
+            state = states[job_id] = {
+                'job_id': job_id,
+                'title': title,
+                'status': job_status,
+                'rating': rating,
+                'client_id': client_id,
+                'applications': [],
+            }
+        if application_id is not None:
+            state['applications'].append({
+                'application_id': application_id,
+                'professional_id': professional_id,
+                'professional_email': email,
+                'status': application_status,
+            })
+    return list(states.values())
+
+
+def state_for(state, user_id):
+    """`state` as `user_id` may see it: all applications for the job's client, their own otherwise."""
+    if user_id == state['client_id']:
+        return state
+    return {
+        **state,
+        'applications': [
+            application for application in state['applications']
+            if application['professional_id'] == user_id
+        ],
+    }
+
+
+def job_state_snapshot(user):
+    if user.role == 'client':
+        jobs = Job.objects.filter(client_id=user)
+    else:
+        applied = JobApplication.objects.filter(professional_id=user).values('job_id')
+        jobs = Job.objects.filter(job_id__in=applied)
+    return [state_for(state, user.id) for state in _job_states(jobs)]
+
+
+def publish_job_states(job_ids):
+    """Push the current state of `job_ids` to everyone involved, after commit."""
+    timestamp = timezone.now().isoformat()
+    events = []
+    for state in _job_states(Job.objects.filter(job_id__in=job_ids)):
+        recipients = {state['client_id']}
+        recipients.update(application['professional_id'] for application in state['applications'])
+        events.extend(
+            (user_id, {'type': 'job_state', 'job': state_for(state, user_id), 'timestamp': timestamp})
+            for user_id in recipients if user_id is not None
+        )
+    send_realtime(events, group=job_states_group, handler='job_state')
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import statistics
+import time
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from account.models import Job, JobApplication
+from account.routing import websocket_urlpatterns
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure video call setup latency (offer, answer and trickle ICE) through '
+        'VideoCallConsumer and the configured channel layer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('job_id', type=int, help='Job with a client and an accepted professional')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--candidates', type=int, default=10, help='ICE candidates sent by each side')
+        parser.add_argument('--timeout', type=float, default=5, help='Seconds to wait for any frame')
+
+    def handle(self, *args, **options):
+        try:
+            job = Job.objects.select_related('client_id').get(job_id=options['job_id'])
+        except Job.DoesNotExist:
+            raise CommandError('Job not found')
+        application = JobApplication.objects.select_related('professional_id').filter(
+            job_id=job, status='Accepted'
+        ).first()
+        if application is None:
+            raise CommandError('The job has no accepted professional')
+
+        results = asyncio.run(self.run_benchmark(
+            job.job_id, job.client_id, application.professional_id, options
+        ))
+
+        setup_ms = sorted(result['setup_ms'] for result in results)
+        frames = [result['ice_frames'] for result in results]
+        p95 = setup_ms[max(0, int(len(setup_ms) * 0.95) - 1)]
+        self.stdout.write(
+            f"{len(results)} call setups, {options['candidates']} ICE candidates per side\n"
+            f"  setup latency ms: min {setup_ms[0]:.1f}  p50 {statistics.median(setup_ms):.1f}  "
+            f"p95 {p95:.1f}  max {setup_ms[-1]:.1f}\n"
+            f"  ICE frames received per side: avg {statistics.mean(frames) / 2:.1f}"
+        )
+
+    async def run_benchmark(self, job_id, caller, callee, options):
+        application = URLRouter(websocket_urlpatterns)
+        path = f'/ws/video-call/{job_id}/'
+        timeout = options['timeout']
+        results = []
+
+        async def connect(user):
+            communicator = WebsocketCommunicator(application, path)
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect(timeout=timeout)
+            if not connected:
+                raise CommandError(f'User {user.id} could not join the call')
+            return communicator
+
+        async def receive(communicator, expected_type):
+            while True:
+                frame = json.loads(await communicator.receive_from(timeout=timeout))
+                if frame['type'] == expected_type:
+                    return frame
+
+        async def trickle(sender, receiver, count):
+            for index in range(count):
+                await sender.send_to(text_data=json.dumps({
+                    'type': 'ice_candidate',
+                    'ice_candidate': {'candidate': f'candidate:{index}', 'sdpMid': '0', 'sdpMLineIndex': 0},
+                }))
+            received = frames = 0
+            while received < count:
+                frame = json.loads(await receiver.receive_from(timeout=timeout))
+                if frame['type'] == 'ice_candidates':
+                    received += len(frame['ice_candidates'])
+                    frames += 1
+                elif frame['type'] == 'ice_candidate':
+                    received += 1
+                    frames += 1
+            return frames
+
+        for _ in range(options['iterations']):
+            caller_socket = await connect(caller)
+            callee_socket = await connect(callee)
+            try:
+                started = time.perf_counter()
+                await caller_socket.send_to(text_data=json.dumps({'type': 'offer', 'offer': {'type': 'offer', 'sdp': 'v=0'}}))
+                await receive(callee_socket, 'offer')
+                await callee_socket.send_to(text_data=json.dumps({'type': 'answer', 'answer': {'type': 'answer', 'sdp': 'v=0'}}))
+                await receive(caller_socket, 'answer')
+                frames = await asyncio.gather(
+                    trickle(caller_socket, callee_socket, options['candidates']),
+                    trickle(callee_socket, caller_socket, options['candidates']),
+                )
+                results.append({
+                    'setup_ms': (time.perf_counter() - started) * 1000,
+                    'ice_frames': sum(frames),
+                })
+            finally:
+                await caller_socket.disconnect()
+                await callee_socket.disconnect()
+
+        return results
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from account.query_shapes import QUERY_SHAPES
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the catalogued hot query shapes and fail if any of them does not use its index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--disable-seqscan',
+            action='store_true',
+            help='Plan with sequential scans disabled, to check the indexes are usable on a small database',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan for every query shape',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plan checks require PostgreSQL')
+
+        failures = []
+        with transaction.atomic():
+            if options['disable_seqscan']:
+                # Small development databases make sequential scans look cheaper
+                # than any index; this only shows the index can be used at all.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for shape in QUERY_SHAPES:
+                plan = shape['queryset']().explain()
+                uses_index = shape['index'] in plan
+                if options['verbose_plans']:
+                    self.stdout.write(plan)
+
+                if uses_index:
+                    self.stdout.write(self.style.SUCCESS(f"OK   {shape['name']} -> {shape['index']}"))
+                else:
+                    failures.append(shape['name'])
+                    self.stdout.write(self.style.ERROR(
+                        f"MISS {shape['name']} ({shape['used_by']}) did not use {shape['index']}:\n{plan}"
+                    ))
+
+        if failures:
+            raise CommandError(f"{len(failures)} query shape(s) fell back to other plans: {', '.join(failures)}")
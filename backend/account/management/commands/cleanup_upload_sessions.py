@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from account.uploads import discard_session, expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that were not completed within CHAT_UPLOADS["SESSION_TTL"], with their staging files'
+
+    def handle(self, *args, **options):
+        removed = 0
+        for session in expired_sessions().iterator():
+            discard_session(session)
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired upload session(s)'))
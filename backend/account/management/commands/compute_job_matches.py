@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from account.matching import compute_job_matches
+
+
+class Command(BaseCommand):
+    help = "Score open jobs against available professionals and store each professional's top matches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            help='Matches kept per professional (defaults to JOB_MATCHING["TOP_K"])',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        professionals, jobs, matches = compute_job_matches(options['top_k'])
+        self.stdout.write(
+            f'Stored {matches} match(es) for {professionals} professional(s) '
+            f'over {jobs} open job(s) in {time.monotonic() - started:.2f}s'
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from account.blobs import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed chat files that no message references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help='Recompute reference counts from the messages first')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            updated = recount_references()
+            self.stdout.write(f'Recounted references for {updated} blob(s)')
+
+        blobs, files = collect_garbage(dry_run=options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {blobs} unreferenced blob(s) and {files} orphan file(s)'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from account.models import Message
+from account.previews import build_variants, get_preview_pool, get_preview_settings, render_variants, variant_targets
+
+
+class Command(BaseCommand):
+    help = 'Render missing thumbnail and preview variants for image messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Also re-check messages that already have variants')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        messages = Message.objects.filter(file_type='image').exclude(file='').exclude(file__isnull=True)
+        if not options['all']:
+            messages = messages.filter(variants={})
+
+        quality = get_preview_settings()['WEBP_QUALITY']
+        pool = get_preview_pool()
+        rendered = failed = 0
+        batch = []
+
+        def flush():
+            nonlocal rendered, failed
+            storage = Message._meta.get_field('file').storage
+            futures = [
+                (message_id, name, pool.submit(render_variants, storage.path(name), variant_targets(name), quality))
+                for message_id, name in batch
+            ]
+            for message_id, name, future in futures:
+                try:
+                    sizes = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Message {message_id}: {e}')
+                    continue
+                Message.objects.filter(pk=message_id).update(variants=build_variants(name, sizes))
+                rendered += 1
+            batch.clear()
+
+        for message_id, name in messages.values_list('id', 'file').iterator():
+            batch.append((message_id, name))
+            if len(batch) >= options['batch_size']:
+                flush()
+        if batch:
+            flush()
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered variants for {rendered} message(s), {failed} failed'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from account.rollups import rebuild_payment_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily payment rollups from the payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report whether the rollups are off; change nothing',
+        )
+
+    def handle(self, *args, **options):
+        buckets, differed = rebuild_payment_rollups(fix=not options['verify'])
+        if options['verify'] and differed:
+            raise CommandError(f'{differed} daily payment rollup(s) are out of date')
+        if differed:
+            self.stdout.write(f'Rebuilt {buckets} daily payment rollup(s); {differed} had differed')
+        else:
+            self.stdout.write(f'Checked {buckets} daily payment rollup(s): all up to date')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from account.ratings import recompute_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute professionals\' rating sums, counts and histograms from their rated jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report profiles whose running aggregates are off; change nothing',
+        )
+
+    def handle(self, *args, **options):
+        checked, differed = recompute_rating_aggregates(fix=not options['verify'])
+        if options['verify']:
+            if differed:
+                raise CommandError(f'{differed} of {checked} profile(s) have out-of-date rating aggregates')
+            self.stdout.write(f'Checked {checked} profile(s): all up to date')
+        else:
+            self.stdout.write(f'Checked {checked} profile(s), rebuilt {differed}')
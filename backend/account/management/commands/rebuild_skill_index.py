@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from account.models import ProfessionalProfile
+from account.skills import sync_profile_skills
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the skill taxonomy and skill-to-profile index from ProfessionalProfile.skills'
+
+    def handle(self, *args, **options):
+        total = 0
+        for profile in ProfessionalProfile.objects.only('user', 'skills').iterator(chunk_size=500):
+            sync_profile_skills(profile)
+            total += 1
+        self.stdout.write(f'Indexed skills of {total} profile(s)')
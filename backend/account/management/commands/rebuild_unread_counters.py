@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from account.counters import rebuild_unread_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user unread message and notification counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild the counters of this user (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        updated = rebuild_unread_counters(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt unread counters; {updated} user(s) have unread items'))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from account.emails import drain_outbox, get_outbox_settings
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued OutboundEmail rows, reusing one SMTP connection per drain cycle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send whatever is due and exit instead of polling',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Emails claimed per batch (defaults to EMAIL_OUTBOX["BATCH_SIZE"])',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = get_outbox_settings()['POLL_INTERVAL']
+
+        while True:
+            try:
+                sent, failed = drain_outbox(options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} email(s), {failed} failed')
+            except Exception as e:
+                # SMTP server unreachable; the claimed batch was released, try again later
+                self.stderr.write(f'Email outbox error: {str(e)}')
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(poll_interval)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from email import message_from_bytes
+from email.policy import default as default_policy
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+
+class SMTPSinkProtocol:
+    """
+    Just enough of SMTP (RFC 5321) for Django's SMTP backend: accepts every
+    message and hands it to `deliver`. No TLS or AUTH, so point the app at it
+    with EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=False and leave
+    EMAIL_HOST_USER empty.
+    """
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    async def handle(self, reader, writer):
+        async def reply(line):
+            writer.write(f'{line}\r\n'.encode())
+            await writer.drain()
+
+        mail_from, rcpt_to = None, []
+        await reply('220 smtp-sink ready')
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('latin1').strip()
+                verb = command[:4].upper()
+
+                if verb in ('HELO', 'EHLO'):
+                    if verb == 'EHLO':
+                        await reply('250-smtp-sink')
+                        await reply('250 8BITMIME')
+                    else:
+                        await reply('250 smtp-sink')
+                elif verb == 'MAIL':
+                    mail_from, rcpt_to = command[10:].strip(), []
+                    await reply('250 OK')
+                elif verb == 'RCPT':
+                    rcpt_to.append(command[8:].strip())
+                    await reply('250 OK')
+                elif verb == 'DATA':
+                    await reply('354 End data with <CR><LF>.<CR><LF>')
+                    lines = []
+                    while True:
+                        data = await reader.readline()
+                        if data in (b'.\r\n', b'.\n', b''):
+                            break
+                        # Undo dot-stuffing
+                        lines.append(data[1:] if data.startswith(b'..') else data)
+                    self.deliver(mail_from, rcpt_to, b''.join(lines))
+                    mail_from, rcpt_to = None, []
+                    await reply('250 OK queued')
+                elif verb == 'RSET':
+                    mail_from, rcpt_to = None, []
+                    await reply('250 OK')
+                elif verb == 'NOOP':
+                    await reply('250 OK')
+                elif verb == 'QUIT':
+                    await reply('221 Bye')
+                    break
+                else:
+                    await reply('502 Command not implemented')
+        finally:
+            writer.close()
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP server that accepts all mail, for developing and testing the email outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument(
+            '--output-dir',
+            help='Write each received message to this directory as an .eml file instead of printing it',
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir']
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        received = 0
+
+        def deliver(mail_from, rcpt_to, raw):
+            nonlocal received
+            received += 1
+            message = message_from_bytes(raw, policy=default_policy)
+            self.stdout.write(f"[{received}] {mail_from} -> {', '.join(rcpt_to)}: {message['Subject']}")
+            if output_dir:
+                filename = f"{now().strftime('%Y%m%d%H%M%S%f')}-{received}.eml"
+                with open(os.path.join(output_dir, filename), 'wb') as f:
+                    f.write(raw)
+            else:
+                self.stdout.write(raw.decode('utf-8', 'replace'))
+
+        async def serve():
+            server = await asyncio.start_server(
+                SMTPSinkProtocol(deliver).handle, options['host'], options['port']
+            )
+            self.stdout.write(self.style.SUCCESS(f"SMTP sink listening on {options['host']}:{options['port']}"))
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            self.stdout.write(f'Stopped after receiving {received} message(s)')
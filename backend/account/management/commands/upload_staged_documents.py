@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from account.cloud_uploads import drain_staged_uploads, get_cloud_upload_settings, purge_uploaded
+
+
+class Command(BaseCommand):
+    help = 'Push staged profile and job documents to Cloudinary, swap them into their records and purge old uploaded rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Upload whatever is due and exit instead of polling',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Uploads claimed per batch (defaults to CLOUDINARY_UPLOADS["BATCH_SIZE"])',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = get_cloud_upload_settings()['POLL_INTERVAL']
+
+        while True:
+            try:
+                uploaded, failed = drain_staged_uploads(options['batch_size'])
+                if uploaded or failed:
+                    self.stdout.write(f'Uploaded {uploaded} document(s), {failed} failed')
+                purged = purge_uploaded()
+                if purged:
+                    self.stdout.write(f'Purged {purged} uploaded row(s)')
+            except Exception as e:
+                self.stderr.write(f'Staged upload error: {str(e)}')
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(poll_interval)
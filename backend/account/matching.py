@@ -0,0 +1,172 @@
+# account/matching.py
+"""
+Batch job-to-professional matching.
+
+compute_job_matches() scores every open Job against every available
+professional and stores each professional's TOP_K best jobs as JobMatch
+rows, so the "jobs for you" endpoint is one indexed read.
+
+Both sides are weighted skill vectors over the skills they share. A
+profile has its indexed skills (ProfessionalSkill). A job has the skill
+keys found in its title and description (account.skills). Every skill is
+weighted by its idf over the open jobs, so a skill nearly every job
+mentions counts for little. Rows are L2-normalized and scored by cosine
+similarity with NumPy: one matrix product per block of JOB_BLOCK_SIZE jobs,
+whose best columns are merged into a running per-professional top-K with
+argpartition. Memory stays at professionals x (TOP_K + JOB_BLOCK_SIZE)
+scores however many jobs are open.
+"""
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job, JobMatch, ProfessionalSkill, Skill
+from .skills import skill_ids_in_text
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'TOP_K': 20,
+    'MIN_SCORE': 0.05,
+    'JOB_BLOCK_SIZE': 1024,
+    'INSERT_BATCH_SIZE': 2000,
+}
+
+
+def get_matching_settings():
+    return {**DEFAULTS, **getattr(settings, 'JOB_MATCHING', {})}
+
+
+def available_profile_skills():
+    """{professional user id: set of skill ids} for profiles taking work."""
+    profile_skills = {}
+    rows = ProfessionalSkill.objects.filter(
+        profile__availability_status='Available',
+        profile__user__is_active=True,
+        profile__user__is_blocked=False,
+    ).values_list('profile_id', 'skill_id')
+    for profile_id, skill_id in rows.iterator(chunk_size=5000):
+        profile_skills.setdefault(profile_id, set()).add(skill_id)
+    return profile_skills
+
+
+def open_job_skills():
+    """{job id: set of skill ids} for open jobs that mention at least one known skill."""
+    skill_ids_by_key = dict(Skill.objects.values_list('key', 'id'))
+    job_skills = {}
+    rows = Job.objects.filter(status='Open').values_list('job_id', 'title', 'description')
+    for job_id, title, description in rows.iterator(chunk_size=2000):
+        found = skill_ids_in_text(f'{title}\n{description}', skill_ids_by_key)
+        if found:
+            job_skills[job_id] = found
+    return job_skills
+
+
+def _coordinates(skill_sets, columns):
+    """(rows, cols) of the non-zero cells of a one-row-per-skill-set matrix, rows ascending."""
+    rows, cols = [], []
+    for row, skills in enumerate(skill_sets):
+        for skill_id in skills:
+            column = columns.get(skill_id)
+            if column is not None:
+                rows.append(row)
+                cols.append(column)
+    return np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+
+
+def _normalized(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def score_matches(profile_skills, job_skills, top_k, block_size):
+    """
+    Return (profile ids, job ids, scores): row i holds profile i's best
+    min(top_k, jobs) jobs and their cosine scores, best first.
+    """
+    profile_ids = np.fromiter(profile_skills, dtype=np.int64, count=len(profile_skills))
+    job_ids = np.fromiter(job_skills, dtype=np.int64, count=len(job_skills))
+
+    # Skills on only one side can't contribute to any score
+    shared = set().union(*profile_skills.values()) & set().union(*job_skills.values())
+    columns = {skill_id: column for column, skill_id in enumerate(sorted(shared))}
+
+    job_rows, job_cols = _coordinates(job_skills.values(), columns)
+    document_frequency = np.bincount(job_cols, minlength=len(columns))
+    idf = (np.log((1 + len(job_ids)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    profile_rows, profile_cols = _coordinates(profile_skills.values(), columns)
+    profiles = np.zeros((len(profile_ids), len(columns)), dtype=np.float32)
+    profiles[profile_rows, profile_cols] = idf[profile_cols]
+    _normalized(profiles)
+
+    k = min(top_k, len(job_ids))
+    best_scores = np.empty((len(profile_ids), 0), dtype=np.float32)
+    best_jobs = np.empty((len(profile_ids), 0), dtype=np.int64)
+
+    for start in range(0, len(job_ids), block_size):
+        end = min(start + block_size, len(job_ids))
+        first, last = np.searchsorted(job_rows, [start, end])
+        block = np.zeros((end - start, len(columns)), dtype=np.float32)
+        block[job_rows[first:last] - start, job_cols[first:last]] = idf[job_cols[first:last]]
+        scores = profiles @ _normalized(block).T
+
+        candidate_scores = np.hstack([best_scores, scores])
+        candidate_jobs = np.hstack([best_jobs, np.broadcast_to(job_ids[start:end], scores.shape)])
+        if candidate_scores.shape[1] > k:
+            keep = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+            candidate_jobs = np.take_along_axis(candidate_jobs, keep, axis=1)
+        best_scores, best_jobs = candidate_scores, candidate_jobs
+
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return profile_ids, np.take_along_axis(best_jobs, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def compute_job_matches(top_k=None):
+    """
+    Recompute every professional's top matches and replace the stored
+    JobMatch rows in one transaction. Returns (professionals, jobs, matches).
+    """
+    options = get_matching_settings()
+    top_k = top_k or options['TOP_K']
+    started = time.monotonic()
+
+    profile_skills = available_profile_skills()
+    job_skills = open_job_skills()
+    computed_at = timezone.now()
+    matches = []
+
+    if profile_skills and job_skills:
+        profile_ids, top_jobs, top_scores = score_matches(
+            profile_skills, job_skills, top_k, options['JOB_BLOCK_SIZE']
+        )
+        skill_names = dict(Skill.objects.values_list('id', 'name'))
+        for row, profile_id in enumerate(profile_ids.tolist()):
+            for rank, (job_id, score) in enumerate(zip(top_jobs[row].tolist(), top_scores[row].tolist()), 1):
+                if score < options['MIN_SCORE']:
+                    break
+                shared = profile_skills[profile_id] & job_skills[job_id]
+                matches.append(JobMatch(
+                    professional_id=profile_id,
+                    job_id=job_id,
+                    rank=rank,
+                    score=round(score, 4),
+                    matched_skills=sorted(skill_names[skill_id] for skill_id in shared),
+                    computed_at=computed_at,
+                ))
+
+    with transaction.atomic():
+        JobMatch.objects.all().delete()
+        JobMatch.objects.bulk_create(matches, batch_size=options['INSERT_BATCH_SIZE'])
+
+    logger.info(
+        f"Matched {len(profile_skills)} professionals against {len(job_skills)} open jobs: "
+        f"{len(matches)} matches in {time.monotonic() - started:.2f}s"
+    )
+    return len(profile_skills), len(job_skills), len(matches)
@@ -1,30 +1,51 @@
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.http.cookie import parse_cookie
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, AuthenticationFailed
+from account.authentication import CustomJWTAuthentication
+import logging
 import urllib.parse
 
+logger = logging.getLogger('django')
+
+
 class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Resolves the websocket user once per connection and stores it in
+    scope['user']; consumers read it from there instead of re-authenticating.
+    The access_token cookie takes precedence over a ?token= query parameter.
+    """
     async def __call__(self, scope, receive, send):
-        # Parse query string for token
-        query_string = scope.get('query_string', b'').decode()
-        query_params = dict(urllib.parse.parse_qsl(query_string))
-        token = query_params.get('token', '')
-        
         scope['user'] = AnonymousUser()
-        
-        if token:
+
+        for token in self.get_tokens(scope):
             try:
-                user = await self.get_user_from_token(token)
-                scope['user'] = user
-            except (InvalidToken, TokenError):
-                pass
+                scope['user'] = await self.get_user_from_token(token)
+                break
+            except (InvalidToken, TokenError, AuthenticationFailed) as e:
+                logger.error(f"WebSocket token error: {str(e)}")
         
         return await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def get_tokens(scope):
+        tokens = []
+        headers = dict(scope.get('headers', []))
+        cookie_header = headers.get(b'cookie')
+        if cookie_header:
+            token = parse_cookie(cookie_header.decode('latin1')).get('access_token')
+            if token:
+                tokens.append(token)
+
+        query_string = scope.get('query_string', b'').decode()
+        token = dict(urllib.parse.parse_qsl(query_string)).get('token')
+        if token:
+            tokens.append(token)
+        return tokens
     
     @database_sync_to_async
     def get_user_from_token(self, token):
-        jwt_auth = JWTAuthentication()
+        jwt_auth = CustomJWTAuthentication()
         validated_token = jwt_auth.get_validated_token(token)
-        return jwt_auth.get_user(validated_token)
\ No newline at end of file
+        return jwt_auth.get_user(validated_token)
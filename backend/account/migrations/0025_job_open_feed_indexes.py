@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0024_alter_message_file"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(("status", "Open")),
+                fields=["-created_at", "-job_id"],
+                name="job_open_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(("status", "Open")),
+                fields=["budget"],
+                name="job_open_budget_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(("status", "Open")),
+                fields=["deadline"],
+                name="job_open_deadline_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:47
+# Indexes for the hot query shapes catalogued in account/query_shapes.py;
+# verify them with `python manage.py check_query_plans`.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0025_job_open_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="complaint",
+            index=models.Index(
+                fields=["user", "-created_at"], name="complaint_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["client_id", "status"], name="job_client_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["status", "-created_at"], name="job_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["job_id", "professional_id", "status"],
+                name="jobapp_job_pro_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["professional_id", "status"], name="jobapp_pro_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "is_read", "sender"],
+                name="msg_conv_read_sender_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "is_read", "-created_at"],
+                name="notif_user_read_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["razorpay_order_id"], name="payment_order_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0030_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(fields=["file"], name="msg_file_idx"),
+        ),
+    ]
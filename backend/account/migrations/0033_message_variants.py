@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0032_storedblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0037_profile_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["created_at", "conversation"], name="msg_created_conv_idx"
+            ),
+        ),
+    ]
@@ -8,9 +8,12 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.timezone import now
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from cloudinary.models import CloudinaryField
 # Add this to your existing models.py file
-from .storage import LocalFileStorage
+from .storage import LocalFileStorage, staged_upload_storage
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('job_application', 'Job Application'),
@@ -30,6 +33,9 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} - {self.title[:30]}"
@@ -95,6 +101,18 @@ class CustomUser(AbstractUser):
         return self.email
 
 # accounts/models.py
+DOCUMENT_UPLOAD_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('uploaded', 'Uploaded'),
+    ('failed', 'Failed'),
+]
+
+RATING_AGGREGATE_FIELDS = (
+    'avg_rating', 'rating_sum', 'rating_count',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+)
+
+
 class ProfessionalProfile(models.Model):
     AVAILABILITY_CHOICES = [
         ('Available', 'Available'),
@@ -121,8 +139,18 @@ class ProfessionalProfile(models.Model):
         folder='verification_documents/',  # Organizes files in Cloudinary
         help_text='Upload verification document (ID, degree, certificate, etc.)'
     )
+    # State of a staged upload to Cloudinary (account.cloud_uploads); blank when none was staged
+    verify_doc_upload_status = models.CharField(max_length=10, choices=DOCUMENT_UPLOAD_STATUS_CHOICES, blank=True, default='')
     verify_status = models.CharField(max_length=15, choices=VERIFY_STATUS_CHOICES, default='Pending')
     avg_rating = models.FloatField(default=0.0)
+    # Running review aggregates, updated with F() expressions (see account.ratings)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     denial_reason = models.TextField(blank=True, null=True) 
     def get_verify_doc_url(self):
         """Get the full URL of the verification document if it exists"""
@@ -151,26 +179,40 @@ class ProfessionalProfile(models.Model):
                 logger.error(f"Failed to delete verification document: {e}")
                 return False
         return False
-    def update_avg_rating(self):
-        jobs = Job.objects.filter(
-            applications__professional_id=self.user,
-            applications__status='Completed',  # Fixed to 'Completed'
-            status='Completed',
-            rating__isnull=False
-        )
-        print(f"Debug: Found {jobs.count()} rated jobs for {self.user.email}: {jobs.values('job_id', 'rating')}")  # Debug
-        if jobs.exists():
-            avg_rating = jobs.aggregate(models.Avg('rating'))['rating__avg']
-            self.avg_rating = round(avg_rating, 1)
-            self.save()
-            print(f"Debug: Updated avg_rating to {self.avg_rating} for {self.user.email}")  # Debug
-        else:
-            self.avg_rating = 0.0
-            self.save()
-            print(f"Debug: No rated jobs, avg_rating set to {self.avg_rating} for {self.user.email}")  # Debug
+    def save(self, *args, **kwargs):
+        # The rating aggregates are only written by account.ratings' F()
+        # updates; a full save of an instance loaded earlier must not put
+        # stale values back.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(RATING_AGGREGATE_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.name}'s Professional Profile"
+class JobQuerySet(models.QuerySet):
+    def with_list_data(self):
+        """
+        Join the client and pre-compute the applicants count so that
+        JobSerializer can render a list without per-row queries.
+        """
+        applicants = JobApplication.objects.filter(
+            job_id=models.OuterRef('pk')
+        ).order_by().values('job_id').annotate(total=models.Count('*')).values('total')
+        return self.select_related('client_id').annotate(
+            applicants_total=Coalesce(models.Subquery(applicants), 0)
+        )
+
+
+class JobManager(models.Manager.from_queryset(JobQuerySet)):
+    def get_queryset(self):
+        # search_vector is only read inside the database; don't ship it with every row
+        return super().get_queryset().defer('search_vector')
+
+
 class Job(models.Model):
     STATUS_CHOICES = [
         ('Open', 'Open'),
@@ -188,6 +230,7 @@ class Job(models.Model):
         transformation=[],  # Organizes files in Cloudinary
         help_text='Upload project documents, requirements, or reference files'
     )
+    document_upload_status = models.CharField(max_length=10, choices=DOCUMENT_UPLOAD_STATUS_CHOICES, blank=True, default='')
 
     professional_id = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -220,6 +263,38 @@ class Job(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
     review = models.TextField(null=True, blank=True)
+    # Kept current by PostgreSQL on every write; see account.search
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='english') +
+            SearchVector('description', weight='B', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [
+            # Open-jobs feed: keyset pagination on (created_at, job_id) plus range filters
+            models.Index(
+                fields=['-created_at', '-job_id'],
+                name='job_open_feed_idx',
+                condition=models.Q(status='Open'),
+            ),
+            models.Index(fields=['budget'], name='job_open_budget_idx', condition=models.Q(status='Open')),
+            models.Index(fields=['deadline'], name='job_open_deadline_idx', condition=models.Q(status='Open')),
+            models.Index(fields=['client_id', 'status'], name='job_client_status_idx'),
+            models.Index(fields=['status', '-created_at'], name='job_status_created_idx'),
+            # Open-jobs search: full-text match, and trigram fallback on the title
+            GinIndex(fields=['search_vector'], name='job_search_vector_idx', condition=models.Q(status='Open')),
+            GinIndex(
+                OpClass('title', name='gin_trgm_ops'),
+                name='job_title_trgm_idx',
+                condition=models.Q(status='Open'),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -261,6 +336,23 @@ class Job(models.Model):
             return None
 # accounts/models.py
 # accounts/models.py
+class JobApplicationQuerySet(models.QuerySet):
+    def with_list_data(self):
+        """
+        Join the job, its client and the professional's profile, and
+        pre-compute the job's applicants count for JobApplicationSerializer.
+        """
+        applicants = JobApplication.objects.filter(
+            job_id=models.OuterRef('job_id')
+        ).order_by().values('job_id').annotate(total=models.Count('*')).values('total')
+        return self.select_related(
+            'job_id__client_id',
+            'professional_id__professionalprofile',
+        ).annotate(
+            job_applicants_total=Coalesce(models.Subquery(applicants), 0)
+        )
+
+
 class JobApplication(models.Model):
     STATUS_CHOICES = [
         ('Applied', 'Applied'),
@@ -288,6 +380,14 @@ class JobApplication(models.Model):
     )
     applied_at = models.DateTimeField(default=now)
 
+    objects = JobApplicationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job_id', 'professional_id', 'status'], name='jobapp_job_pro_status_idx'),
+            models.Index(fields=['professional_id', 'status'], name='jobapp_pro_status_idx'),
+        ]
+
     def __str__(self):
         return f"Application {self.application_id} for Job {self.job_id} by {self.professional_id}"
 class Payment(models.Model):
@@ -313,6 +413,11 @@ class Payment(models.Model):
     )
     created_at = models.DateTimeField(default=now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['razorpay_order_id'], name='payment_order_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.payment_type} {self.razorpay_order_id} for Application {self.job_application.application_id}"
 class PaymentRequest(models.Model):
@@ -386,6 +491,9 @@ class Complaint(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='complaint_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Complaint {self.id} by {self.user.email}"
@@ -400,6 +508,27 @@ class Conversation(models.Model):
         return f"Conversation for {self.job.title}"
 
 
+class StoredBlob(models.Model):
+    """
+    A chat attachment stored once under its SHA-256 (content-addressed mode,
+    see account.blobs). ref_count is the number of Message rows using it.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=100, unique=True)  # Path inside the message storage
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'last_used_at'], name='blob_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
@@ -411,6 +540,7 @@ class Message(models.Model):
         null=True
     )  # Store files in 'chat_files/' directory
     file_type = models.CharField(max_length=20, blank=True, null=True)  # E.g., 'image', 'document', 'text'
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='messages')
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     
@@ -418,8 +548,19 @@ class Message(models.Model):
     
     # Add this new field to store the absolute URL
     file_absolute_url = models.URLField(max_length=500, null=True, blank=True)
+    # Rendered image variants (account.previews): {variant: {'name', 'width', 'height'}}
+    variants = models.JSONField(default=dict, blank=True)
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'is_read', 'sender'], name='msg_conv_read_sender_idx'),
+            # Message history pages: id range scans within one conversation
+            models.Index(fields=['conversation', 'id'], name='msg_conv_id_idx'),
+            # serve_message_file: exact attachment path -> owning conversation
+            models.Index(fields=['file'], name='msg_file_idx'),
+            # Admin dashboard: conversations with recent messages (index-only range scan)
+            models.Index(fields=['created_at', 'conversation'], name='msg_created_conv_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.name} at {self.created_at}"
@@ -430,3 +571,241 @@ class Message(models.Model):
         if self.file and not self.file_absolute_url:
             # This will be set by the view after getting the request context
             pass
+
+
+class UnreadCounter(models.Model):
+    """
+    Materialised unread badge counts for a user, kept in step with the
+    Message and Notification tables by account.counters. Rebuild with
+    `python manage.py rebuild_unread_counters` if they ever drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='unread_counter'
+    )
+    messages = models.IntegerField(default=0)
+    notifications = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Unread counts for user {self.user_id}: {self.messages} messages, {self.notifications} notifications"
+
+
+class OutboundEmail(models.Model):
+    """
+    Email queued by request handlers and delivered by the
+    `send_queued_emails` worker (see account.emails).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(null=True, blank=True)
+    from_email = models.CharField(max_length=255, null=True, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+
+class StagedUpload(models.Model):
+    """
+    A profile or job document stored locally by the request and pushed to
+    Cloudinary by the `upload_staged_documents` worker (see
+    account.cloud_uploads).
+    """
+    TARGET_CHOICES = [
+        ('profile_verify_doc', 'Professional verification document'),
+        ('job_document', 'Job document'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('uploading', 'Uploading'),
+        ('uploaded', 'Uploaded'),
+        ('failed', 'Failed'),
+    ]
+
+    target = models.CharField(max_length=30, choices=TARGET_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    file = models.FileField(upload_to='%Y/%m/%d/', storage=staged_upload_storage, max_length=255)
+    original_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=now)
+    uploaded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='staged_status_due_idx'),
+            models.Index(fields=['target', 'object_id'], name='staged_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target} {self.object_id}: {self.original_name} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """
+    A chunked, resumable chat attachment upload (see account.uploads).
+    Chunks are written into a staging file until the upload is completed
+    and turned into a Message.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='upload_sessions')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    file_type = models.CharField(max_length=20)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received_chunks = models.JSONField(default=list)
+    sha256 = models.CharField(max_length=64, null=True, blank=True)  # Optional whole-file checksum
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    message = models.OneToOneField(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_session'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def chunk_length(self, index):
+        if index == self.total_chunks - 1:
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+    def missing_chunks(self):
+        received = set(self.received_chunks)
+        return [index for index in range(self.total_chunks) if index not in received]
+
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename} by {self.user_id} ({self.status})"
+
+
+class Skill(models.Model):
+    """
+    A normalized skill (see account.skills). Profiles and job texts are
+    matched on `key`, the lowercase, alias-resolved spelling; `name` is how
+    the skill was first written.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    name = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ProfessionalSkill(models.Model):
+    """Inverted index from a Skill to the profiles listing it, kept in sync with ProfessionalProfile.skills."""
+    # The unique constraint's (skill, profile) index serves skill lookups
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='profile_links', db_index=False)
+    profile = models.ForeignKey(ProfessionalProfile, on_delete=models.CASCADE, related_name='skill_links')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'profile'], name='unique_profile_skill'),
+        ]
+
+    def __str__(self):
+        return f"{self.profile_id}: {self.skill_id}"
+
+
+class JobMatch(models.Model):
+    """
+    One of a professional's top open jobs, as last computed by
+    account.matching. `rank` 1 is the best match.
+    """
+    # The unique constraint's (professional, rank) index serves the "jobs for you" read
+    professional = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='job_matches',
+        db_index=False
+    )
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='matches')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    matched_skills = models.JSONField(default=list)
+    computed_at = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['professional', 'rank'], name='unique_job_match_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.professional_id} #{self.rank}: job {self.job_id} ({self.score:.3f})"
+
+
+class PaymentDailyRollup(models.Model):
+    """
+    The day's Payment totals for one client, professional, payment type and
+    status, kept in step with the payments by account.rollups.
+    """
+    # Chart ranges are served by the (client|professional, status, day) indexes
+    day = models.DateField()
+    client = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='spend_rollups',
+        db_index=False
+    )
+    professional = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='earning_rollups',
+        db_index=False
+    )
+    payment_type = models.CharField(max_length=20, choices=Payment.PAYMENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'client', 'professional', 'payment_type', 'status'],
+                name='unique_payment_daily_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['client', 'status', 'day'], name='rollup_client_day_idx'),
+            models.Index(fields=['professional', 'status', 'day'], name='rollup_professional_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.payment_type}/{self.status}: {self.client_id} -> {self.professional_id} {self.total_amount}"
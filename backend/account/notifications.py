@@ -0,0 +1,112 @@
+# account/notifications.py
+"""
+Single entry point for user notifications.
+
+notify_users() stores one Notification per recipient with a single
+bulk INSERT and, once that transaction commits, updates the unread
+counters and pushes the realtime event to every notifications_<user_id>
+group in one concurrent batch on the channel layer.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import record_new_notifications
+from .models import Notification
+
+logger = logging.getLogger('django')
+
+
+def _user_ids(users):
+    """Accept users or user ids; drop duplicates but keep the order."""
+    seen = {}
+    for user in users:
+        seen.setdefault(getattr(user, 'pk', user), None)
+    return list(seen)
+
+
+def notification_group(user_id):
+    return f'notifications_{user_id}'
+
+
+def send_realtime(events, group=notification_group, handler='send_notification'):
+    """
+    Publish [(user_id, content), ...] to each user's `group(user_id)` after
+    the current transaction commits (immediately outside one). `handler` is
+    the consumer method that receives the event.
+    """
+    events = [(group(user_id), content) for user_id, content in events]
+    if events:
+        transaction.on_commit(lambda: _publish(events, handler))
+
+
+def _publish(events, handler):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    async def publish_all():
+        results = await asyncio.gather(
+            *[
+                channel_layer.group_send(group_name, {'type': handler, 'content': content})
+                for group_name, content in events
+            ],
+            return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.error(f"Failed to push {len(failures)} of {len(events)} {handler} events: {failures[0]}")
+
+    try:
+        async_to_sync(publish_all)()
+    except Exception as e:
+        logger.error(f"Failed to push {handler} events: {str(e)}")
+
+
+def notify_users(users, notification_type, title, message, data=None, payload=None):
+    """
+    Notify every user in `users` (instances or ids) and return the created
+    Notification rows.
+
+    The realtime event defaults to the notification's type, title, message
+    and data; pass `payload` to send a different body. Each recipient's event
+    carries their own notification_id, plus a timestamp unless one is given.
+    """
+    user_ids = _user_ids(users)
+    if not user_ids:
+        return []
+
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                data=data
+            )
+            for user_id in user_ids
+        ])
+        record_new_notifications(notifications)
+
+        if payload is None:
+            payload = {'type': notification_type, 'title': title, 'message': message, **(data or {})}
+        timestamp = timezone.now().isoformat()
+        send_realtime(
+            (
+                notification.user_id,
+                {'timestamp': timestamp, **payload, 'notification_id': str(notification.id)}
+            )
+            for notification in notifications
+        )
+
+    return notifications
+
+
+def notify_user(user, notification_type, title, message, data=None, payload=None):
+    """notify_users() for a single recipient; returns the Notification."""
+    return notify_users([user], notification_type, title, message, data, payload)[0]
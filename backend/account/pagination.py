@@ -0,0 +1,164 @@
+# account/pagination.py
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over a (created_at, pk) ordering, newest first.
+
+    Unlike offset pagination the cost of fetching a page does not grow with
+    how deep the client has scrolled: every page is a single index range scan
+    starting right after the last row of the previous page.
+    """
+    default_page_size = 20
+    max_page_size = 50
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def __init__(self, time_field='created_at', pk_field='pk'):
+        self.time_field = time_field
+        self.pk_field = pk_field
+        self.page_size = self.default_page_size
+
+    @staticmethod
+    def encode_cursor(created_at, pk):
+        raw = json.dumps([created_at.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            parsed = parse_datetime(created_at)
+            if parsed is None:
+                raise ValueError
+            return parsed, int(pk)
+        except (ValueError, TypeError, json.JSONDecodeError):
+            raise InvalidCursor('Invalid cursor')
+
+    def get_page_size(self, query_params):
+        value = query_params.get(self.page_size_query_param)
+        if not value:
+            return self.default_page_size
+        try:
+            page_size = int(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor('page_size must be an integer')
+        if page_size < 1:
+            raise InvalidCursor('page_size must be positive')
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, query_params):
+        """Return (rows, next_cursor); next_cursor is None on the last page."""
+        page = self.get_page_queryset(queryset, query_params)
+        return self.get_page(list(page))
+
+    async def apaginate_queryset(self, queryset, query_params):
+        """paginate_queryset() for async views."""
+        page = self.get_page_queryset(queryset, query_params)
+        return self.get_page([row async for row in page])
+
+    def get_page_queryset(self, queryset, query_params):
+        """The page as an unevaluated queryset, one row longer than page_size."""
+        self.page_size = self.get_page_size(query_params)
+
+        queryset = queryset.order_by(f'-{self.time_field}', f'-{self.pk_field}')
+        cursor = query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{self.time_field}__lt': created_at}) |
+                Q(**{self.time_field: created_at, f'{self.pk_field}__lt': pk})
+            )
+
+        # Fetch one extra row to find out whether another page exists
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        """Drop the extra row and turn it into the next cursor."""
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(
+                getattr(last, self.time_field),
+                getattr(last, self.pk_field)
+            )
+        return rows, next_cursor
+
+
+class MessageHistoryPaginator:
+    """
+    Bounded pages of a conversation's messages keyed by message id.
+
+    `before=<id>` walks back through older messages, `after=<id>` fetches
+    newer ones and no parameter returns the latest page. Rows are always
+    returned oldest first so they can be rendered as-is.
+    """
+    default_page_size = 30
+    max_page_size = 100
+    page_size_query_param = 'limit'
+
+    def __init__(self):
+        self.page_size = self.default_page_size
+
+    @staticmethod
+    def _parse_id(value, name):
+        try:
+            message_id = int(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor(f'{name} must be a message id')
+        if message_id < 1:
+            raise InvalidCursor(f'{name} must be a message id')
+        return message_id
+
+    def get_page_size(self, query_params):
+        value = query_params.get(self.page_size_query_param)
+        if not value:
+            return self.default_page_size
+        try:
+            page_size = int(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor('limit must be an integer')
+        if page_size < 1:
+            raise InvalidCursor('limit must be positive')
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, query_params):
+        """
+        Return (rows, next_before, next_after). next_before is the id to pass
+        as `before` for older messages (None when there are none); next_after
+        is the id to pass as `after` to poll for newer ones.
+        """
+        self.page_size = self.get_page_size(query_params)
+        before = query_params.get('before')
+        after = query_params.get('after')
+        if before and after:
+            raise InvalidCursor('Use either before or after, not both')
+
+        if after:
+            after_id = self._parse_id(after, 'after')
+            rows = list(queryset.filter(id__gt=after_id).order_by('id')[:self.page_size])
+            next_after = rows[-1].id if rows else after_id
+            # Anything fetched with `after` is newer than the client's history
+            return rows, None, next_after
+
+        if before:
+            queryset = queryset.filter(id__lt=self._parse_id(before, 'before'))
+
+        rows = list(queryset.order_by('-id')[:self.page_size + 1])
+        has_older = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        rows.reverse()
+        next_before = rows[0].id if rows and has_older else None
+        next_after = rows[-1].id if rows else None
+        return rows, next_before, next_after
@@ -0,0 +1,192 @@
+# account/payments.py
+"""
+Payment gateway access shared by the payment views.
+
+The Razorpay client is built once per process on top of a pooled
+requests.Session, so order creation reuses warm TLS connections instead of
+handshaking on every request, and every call has a connect/read timeout.
+PAYMENT_GATEWAY['BACKEND'] = 'fake' swaps in an offline gateway for local
+runs and load tests.
+"""
+import hashlib
+import hmac
+import logging
+import uuid
+from decimal import Decimal
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .models import JobApplication, Payment
+from .rollups import record_new_payment
+from .transactions import run_in_transaction
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'BACKEND': 'razorpay',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'POOL_MAXSIZE': 10,
+}
+
+
+def get_gateway_settings():
+    return {**DEFAULTS, **getattr(settings, 'PAYMENT_GATEWAY', {})}
+
+
+def to_paisa(amount):
+    return int(Decimal(str(amount)) * 100)
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default timeout to every request."""
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class RazorpayGateway:
+    def __init__(self, key_id, key_secret, connect_timeout, read_timeout, pool_maxsize):
+        self.key_id = key_id
+        session = TimeoutSession((connect_timeout, read_timeout))
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret))
+
+    def create_order(self, amount_in_paisa, receipt):
+        return self.client.order.create(data={
+            'amount': amount_in_paisa,
+            'currency': 'INR',
+            'receipt': receipt,
+            'payment_capture': 1  # Auto-capture payment
+        })
+
+    def verify_signature(self, order_id, payment_id, signature):
+        """Raises razorpay.errors.SignatureVerificationError on mismatch."""
+        self.client.utility.verify_payment_signature({
+            'razorpay_order_id': order_id,
+            'razorpay_payment_id': payment_id,
+            'razorpay_signature': signature
+        })
+
+
+class FakeRazorpayGateway:
+    """
+    Offline stand-in with the same interface. Orders get random ids and
+    signatures are HMAC-SHA256 over "order_id|payment_id" like Razorpay's, so
+    load-test clients can produce valid ones with sign().
+    """
+    def __init__(self, key_id, key_secret, **kwargs):
+        self.key_id = key_id or 'rzp_test_fake'
+        self.key_secret = key_secret or 'fake_secret'
+
+    def create_order(self, amount_in_paisa, receipt):
+        return {
+            'id': f'order_fake_{uuid.uuid4().hex[:14]}',
+            'entity': 'order',
+            'amount': amount_in_paisa,
+            'currency': 'INR',
+            'receipt': receipt,
+            'status': 'created',
+        }
+
+    def sign(self, order_id, payment_id):
+        return hmac.new(
+            self.key_secret.encode(),
+            f'{order_id}|{payment_id}'.encode(),
+            hashlib.sha256
+        ).hexdigest()
+
+    def verify_signature(self, order_id, payment_id, signature):
+        if not hmac.compare_digest(self.sign(order_id, payment_id), signature):
+            raise razorpay.errors.SignatureVerificationError('Razorpay Signature Verification Failed')
+
+
+GATEWAYS = {
+    'razorpay': RazorpayGateway,
+    'fake': FakeRazorpayGateway,
+}
+
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        options = get_gateway_settings()
+        _gateway = GATEWAYS[options['BACKEND']](
+            key_id=settings.RAZORPAY_KEY_ID,
+            key_secret=settings.RAZORPAY_KEY_SECRET,
+            connect_timeout=options['CONNECT_TIMEOUT'],
+            read_timeout=options['READ_TIMEOUT'],
+            pool_maxsize=options['POOL_MAXSIZE'],
+        )
+    return _gateway
+
+
+def get_or_create_order(application, payment_type, amount):
+    """
+    Return (payment, created) for the application's open order of this type.
+
+    A retried or double-submitted request gets the Payment (and gateway order)
+    already created for the same application, payment type and amount instead
+    of a second order.
+
+    The gateway call is kept out of the database transactions, so a rerun
+    after a serialization failure never places a second order and no row
+    lock is held across network I/O. The Payment is reserved first, with an
+    empty razorpay_order_id, in a short retried transaction that locks the
+    application row. Then the order is created with the Payment's id in its
+    receipt, and its id is attached in a second short transaction. A request
+    that finds the reservation without an order, because the gateway call
+    failed or is still in flight, places the order itself. If two requests
+    race there, the first order attached is kept.
+    """
+    amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    payment, created = run_in_transaction(_reserve_payment, application, payment_type, amount)
+    if payment.razorpay_order_id:
+        return payment, created
+
+    order = get_gateway().create_order(
+        to_paisa(amount),
+        receipt=f'job_{application.job_id_id}_app_{application.application_id}_{payment_type}_{payment.pk}'
+    )
+    payment = run_in_transaction(_attach_order, payment, order['id'])
+    logger.info(f"Created {payment_type} order {payment.razorpay_order_id} for application {application.application_id}")
+    return payment, created
+
+
+def _reserve_payment(application, payment_type, amount):
+    JobApplication.objects.select_for_update().filter(pk=application.pk).first()
+
+    payment = Payment.objects.filter(
+        job_application=application,
+        payment_type=payment_type,
+        amount=amount,
+        status='created'
+    ).order_by('-created_at').first()
+    if payment is not None:
+        return payment, False
+
+    payment = Payment.objects.create(
+        job_application=application,
+        payment_type=payment_type,
+        razorpay_order_id='',
+        amount=amount,
+        status='created'
+    )
+    record_new_payment(payment)
+    return payment, True
+
+
+def _attach_order(payment, order_id):
+    attached = Payment.objects.filter(pk=payment.pk, razorpay_order_id='').update(razorpay_order_id=order_id)
+    if not attached:
+        logger.warning(f"Payment {payment.pk} already had an order; dropping gateway order {order_id}")
+    return Payment.objects.get(pk=payment.pk)
@@ -0,0 +1,125 @@
+# account/previews.py
+"""
+Thumbnail and preview variants for image messages.
+
+After an image Message is committed, its variants are rendered by
+account.imaging in a process pool, so Pillow's CPU work neither blocks the
+request nor holds the GIL of the serving process. Each variant is a WebP
+file stored next to the original (<name>.<variant>.webp, keeping the
+original name so serve_message_file can map it back) and recorded in
+Message.variants, which MessageSerializer exposes as URLs:
+
+  thumbnail  THUMBNAIL_SIZE square crop, for chat lists
+  preview    scaled to fit PREVIEW_SIZE, for the message view
+
+Messages created while the pool was unavailable, or before this existed,
+are filled in by the generate_message_previews command.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .imaging import render_variants
+from .models import Message
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'WORKERS': 2,
+    'THUMBNAIL_SIZE': 256,
+    'PREVIEW_SIZE': 1280,
+    'WEBP_QUALITY': 80,
+}
+
+VARIANTS = ('thumbnail', 'preview')
+
+
+def get_preview_settings():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_IMAGE_PREVIEWS', {})}
+
+
+def variant_name(name, variant):
+    return f'{name}.{variant}.webp'
+
+
+def source_name(name):
+    """The original file a variant was rendered from, or `name` itself."""
+    for variant in VARIANTS:
+        suffix = f'.{variant}.webp'
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def variant_targets(name):
+    """{variant: (output path, size, crop)} for the stored file `name`."""
+    options = get_preview_settings()
+    storage = Message._meta.get_field('file').storage
+    return {
+        'thumbnail': (storage.path(variant_name(name, 'thumbnail')), options['THUMBNAIL_SIZE'], True),
+        'preview': (storage.path(variant_name(name, 'preview')), options['PREVIEW_SIZE'], False),
+    }
+
+
+def build_variants(name, sizes):
+    return {
+        variant: {'name': variant_name(name, variant), 'width': width, 'height': height}
+        for variant, (width, height) in sizes.items()
+    }
+
+
+_pool = None
+
+
+def get_preview_pool():
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: the serving process runs threads and an event loop
+        _pool = ProcessPoolExecutor(
+            max_workers=get_preview_settings()['WORKERS'],
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pool
+
+
+def schedule_variants(message):
+    """Queue variant rendering for an image message once the transaction commits."""
+    if message.file_type != 'image' or not message.file or not get_preview_settings()['ENABLED']:
+        return
+    transaction.on_commit(partial(_submit, message.id, message.file.name))
+
+
+def _submit(message_id, name):
+    global _pool
+    options = get_preview_settings()
+    storage = Message._meta.get_field('file').storage
+    try:
+        future = get_preview_pool().submit(
+            render_variants, storage.path(name), variant_targets(name), options['WEBP_QUALITY']
+        )
+    except BrokenProcessPool as e:
+        # A worker died; start a fresh pool for the next upload
+        _pool = None
+        logger.error(f"Could not queue previews for message {message_id}: {str(e)}")
+        return
+    except Exception as e:
+        logger.error(f"Could not queue previews for message {message_id}: {str(e)}")
+        return
+    future.add_done_callback(partial(_store_variants, message_id, name))
+
+
+def _store_variants(message_id, name, future):
+    # Runs on the pool's result thread, which has its own DB connection
+    try:
+        sizes = future.result()
+        Message.objects.filter(pk=message_id).update(variants=build_variants(name, sizes))
+    except Exception as e:
+        logger.error(f"Failed to render previews for message {message_id}: {str(e)}")
+    finally:
+        connection.close()
@@ -0,0 +1,78 @@
+# account/query_shapes.py
+"""
+Catalogue of the hot query shapes issued by the account views and consumers,
+together with the index each one is expected to use.
+
+Every entry builds a representative queryset with placeholder values.
+account.tests.QueryPlanTests seeds realistic volumes, runs ANALYZE and
+asserts each EXPLAIN uses the index, so a query or index change that stops
+matching is caught; the `check_query_plans` management command runs the
+same check against a live database.
+"""
+from django.db.models import Q
+
+from .models import Complaint, Job, JobApplication, Message, Notification, Payment
+
+
+QUERY_SHAPES = [
+    {
+        'name': 'open jobs feed',
+        'used_by': 'OpenJobsListView',
+        'index': 'job_open_feed_idx',
+        'queryset': lambda: Job.objects.filter(status='Open').order_by('-created_at', '-job_id')[:21],
+    },
+    {
+        'name': 'client jobs by status',
+        'used_by': 'ClientProjectsView, UserConversationsView, SubmitReviewView',
+        'index': 'job_client_status_idx',
+        'queryset': lambda: Job.objects.filter(client_id=1, status='Assigned'),
+    },
+    {
+        'name': 'jobs by status, newest first',
+        'used_by': 'AdminJobsView, CreateMissingConversationsView',
+        'index': 'job_status_created_idx',
+        'queryset': lambda: Job.objects.filter(status='Completed').order_by('-created_at')[:50],
+    },
+    {
+        'name': 'accepted professionals of a job',
+        'used_by': 'access.get_job_participants (chat/video consumers, conversation and file views)',
+        'index': 'jobapp_job_pro_status_idx',
+        'queryset': lambda: JobApplication.objects.filter(job_id=1, status='Accepted').values_list('professional_id', flat=True),
+    },
+    {
+        'name': 'professional applications by status',
+        'used_by': 'UserConversationsView',
+        'index': 'jobapp_pro_status_idx',
+        'queryset': lambda: JobApplication.objects.filter(professional_id=1, status='Accepted'),
+    },
+    {
+        'name': 'unread messages from the other party',
+        'used_by': 'ConversationView, UnreadMessagesCountView',
+        'index': 'msg_conv_read_sender_idx',
+        'queryset': lambda: Message.objects.filter(conversation=1, is_read=False).exclude(sender=1),
+    },
+    {
+        'name': 'message history page',
+        'used_by': 'ConversationView, MessageHistoryView',
+        'index': 'msg_conv_id_idx',
+        'queryset': lambda: Message.objects.filter(conversation=1, id__lt=1000).order_by('-id')[:31],
+    },
+    {
+        'name': 'unread notifications',
+        'used_by': 'NotificationCountView, MarkAllNotificationsReadView',
+        'index': 'notif_user_read_created_idx',
+        'queryset': lambda: Notification.objects.filter(user=1, is_read=False),
+    },
+    {
+        'name': 'payment by order id',
+        'used_by': 'VerifyPaymentView',
+        'index': 'payment_order_id_idx',
+        'queryset': lambda: Payment.objects.filter(razorpay_order_id='order_placeholder'),
+    },
+    {
+        'name': 'user complaints, newest first',
+        'used_by': 'ComplaintListCreateView',
+        'index': 'complaint_user_created_idx',
+        'queryset': lambda: Complaint.objects.filter(Q(user=1)).order_by('-created_at'),
+    },
+]
@@ -0,0 +1,136 @@
+# account/ratings.py
+"""
+Running review aggregates on ProfessionalProfile.
+
+Every professional carries rating_sum, rating_count and a 1-5 histogram
+(rating_<n>_count). record_rating() adjusts them with a single UPDATE of
+F() expressions when a client rates a job, or re-rates it, and derives
+avg_rating from the new sum and count in the same statement, so nothing
+is re-read. Two reviews of one professional landing at once still update
+the same row, and at the database's SERIALIZABLE level one of them fails
+to serialize; SubmitReviewView runs its transaction through
+run_in_transaction() so that review is saved again from the start.
+
+The aggregates count jobs that are Completed, rated, and whose application
+is Completed. recompute_rating_aggregates() rebuilds them from those rows
+in one grouped query; the rebuild_rating_aggregates command uses it to
+backfill or to check the running values.
+"""
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Cast
+
+from .models import JobApplication, ProfessionalProfile
+
+logger = logging.getLogger('django')
+
+RATINGS = range(1, 6)
+
+
+def histogram_field(rating):
+    return f'rating_{rating}_count'
+
+
+def average_expression(sum_delta, count_delta):
+    """avg_rating as of after the update, rounded to one decimal by the numeric(3, 1) cast."""
+    count = F('rating_count') + count_delta
+    total = Cast(F('rating_sum') + sum_delta, DecimalField(max_digits=12, decimal_places=2))
+    return Cast(total / count, DecimalField(max_digits=3, decimal_places=1))
+
+
+def rating_changes(rating, previous=None):
+    """Update kwargs for a job rated `rating` that was rated `previous` (None if it was not)."""
+    if previous is None:
+        return {
+            'rating_sum': F('rating_sum') + rating,
+            'rating_count': F('rating_count') + 1,
+            histogram_field(rating): F(histogram_field(rating)) + 1,
+            'avg_rating': average_expression(rating, 1),
+        }
+    if previous == rating:
+        return {}
+    return {
+        'rating_sum': F('rating_sum') + (rating - previous),
+        histogram_field(previous): F(histogram_field(previous)) - 1,
+        histogram_field(rating): F(histogram_field(rating)) + 1,
+        'avg_rating': average_expression(rating - previous, 0),
+    }
+
+
+def record_rating(job, rating, previous=None):
+    """
+    Count a client's rating of a completed job towards its professional.
+    Call inside the transaction that saves the rating, with the job row
+    locked so `previous` is the rating being replaced, and retry that
+    transaction on serialization failures. Returns False when
+    the job has no completed application.
+    """
+    professional_id = (
+        JobApplication.objects.filter(job_id=job, status='Completed')
+        .values_list('professional_id', flat=True)
+        .first()
+    )
+    if professional_id is None:
+        logger.warning(f"Job {job.job_id} was rated but has no completed application")
+        return False
+
+    changes = rating_changes(rating, previous)
+    if changes:
+        ProfessionalProfile.objects.filter(user_id=professional_id).update(**changes)
+    return True
+
+
+def rating_histogram(profile):
+    return {str(rating): getattr(profile, histogram_field(rating)) for rating in RATINGS}
+
+
+def rated_totals():
+    """{professional id: aggregate field values} computed from the rated jobs."""
+    rated = JobApplication.objects.filter(
+        status='Completed',
+        job_id__status='Completed',
+        job_id__rating__isnull=False,
+    )
+    rows = rated.values('professional_id').order_by().annotate(
+        rating_sum=Sum('job_id__rating'),
+        rating_count=Count('pk'),
+        **{histogram_field(rating): Count('pk', filter=Q(job_id__rating=rating)) for rating in RATINGS}
+    )
+    totals = {}
+    for row in rows:
+        professional_id = row.pop('professional_id')
+        # Rounded half up, like the numeric(3, 1) cast in average_expression()
+        average = Decimal(row['rating_sum']) / row['rating_count']
+        row['avg_rating'] = float(average.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
+        totals[professional_id] = row
+    return totals
+
+
+def recompute_rating_aggregates(fix=True):
+    """
+    Compare every profile's running aggregates with the rated jobs and, if
+    `fix`, overwrite the ones that differ. Returns (profiles checked,
+    profiles that differed).
+    """
+    totals = rated_totals()
+    empty = {
+        'avg_rating': 0.0, 'rating_sum': 0, 'rating_count': 0,
+        **{histogram_field(rating): 0 for rating in RATINGS},
+    }
+    fields = list(empty)
+
+    checked = differed = 0
+    profiles = ProfessionalProfile.objects.values('user_id', *fields)
+    for current in profiles.iterator(chunk_size=2000):
+        checked += 1
+        professional_id = current.pop('user_id')
+        expected = totals.get(professional_id, empty)
+        if all(current[field] == expected[field] for field in fields):
+            continue
+        differed += 1
+        logger.info(f"Rating aggregates of professional {professional_id} were {current}, expected {expected}")
+        if fix:
+            ProfessionalProfile.objects.filter(user_id=professional_id).update(**expected)
+    return checked, differed
@@ -0,0 +1,214 @@
+# account/rollups.py
+"""
+Daily payment ledger rollups.
+
+PaymentDailyRollup holds the sum and count of the Payments created each
+day, per client, professional, payment type and status. Payments are
+bucketed by the TIME_ZONE date of created_at, so a payment stays on its
+day as it moves from 'created' to 'completed'.
+
+record_new_payment() counts an order when get_or_create_order() creates it,
+and record_payment_completed() moves it into the 'completed' bucket when
+VerifyPaymentView completes it. Both are UPDATEs of F() expressions made in
+the caller's transaction, so the rollups change exactly when the payment
+does. Concurrent payments landing in one bucket update the same row, and at
+the database's SERIALIZABLE level all but one of them fail to serialize:
+callers run the whole transaction through run_in_transaction()
+(account.transactions) so it is re-run. rebuild_payment_rollups() recomputes
+the table from the payments in one grouped query; the
+rebuild_payment_rollups command uses it to backfill or to check the table.
+
+The spend and earnings charts and the transaction history totals read a
+user's completed rollups: a range costs at most one row per day, type and
+counterparty, however many payments it covers.
+"""
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import JobApplication, Payment, PaymentDailyRollup
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'DEFAULT_RANGE_DAYS': 30,
+    'MAX_RANGE_DAYS': 366,
+}
+
+KEY_FIELDS = ('day', 'client_id', 'professional_id', 'payment_type', 'status')
+
+
+class InvalidRange(ValueError):
+    pass
+
+
+def get_rollup_settings():
+    return {**DEFAULTS, **getattr(settings, 'PAYMENT_ROLLUPS', {})}
+
+
+def rollup_key(payment, status):
+    """The rollup bucket `payment` is counted in while it has `status`."""
+    client_id, professional_id = JobApplication.objects.filter(
+        pk=payment.job_application_id
+    ).values_list('job_id__client_id', 'professional_id').get()
+    return {
+        'day': timezone.localdate(payment.created_at),
+        'client_id': client_id,
+        'professional_id': professional_id,
+        'payment_type': payment.payment_type,
+        'status': status,
+    }
+
+
+def _adjust(key, amount, count, create=True):
+    changes = {
+        'total_amount': F('total_amount') + amount,
+        'payment_count': F('payment_count') + count,
+    }
+    rollups = PaymentDailyRollup.objects.filter(**key)
+    if rollups.update(**changes) or not create:
+        return
+    # First payment in this bucket. A concurrent insert of the same row wins
+    # the conflict, and the update below then adds to it.
+    PaymentDailyRollup.objects.bulk_create([PaymentDailyRollup(**key)], ignore_conflicts=True)
+    rollups.update(**changes)
+
+
+def record_new_payment(payment):
+    """Count a newly created payment. Call in the (retried) transaction that creates it."""
+    _adjust(rollup_key(payment, payment.status), payment.amount, 1)
+
+
+def record_payment_completed(payment, previous_status='created'):
+    """
+    Move a payment from its `previous_status` bucket to the 'completed' one.
+    Call in the (retried) transaction that completes it, once the status
+    change is known to have happened exactly once.
+    """
+    previous = rollup_key(payment, previous_status)
+    # A payment created before the rollups were built has nothing to move out of
+    _adjust(previous, -payment.amount, -1, create=False)
+    PaymentDailyRollup.objects.filter(**previous, payment_count=0).delete()
+    _adjust({**previous, 'status': 'completed'}, payment.amount, 1)
+
+
+def ledger_totals():
+    """{bucket key tuple: (total amount, payment count)} computed from the payments."""
+    rows = (
+        Payment.objects
+        .annotate(day=TruncDate('created_at'))
+        .values_list('day', 'job_application__job_id__client_id', 'job_application__professional_id',
+                     'payment_type', 'status')
+        .order_by()
+        .annotate(total_amount=Sum('amount'), payment_count=Count('pk'))
+    )
+    return {tuple(row[:5]): (row[5], row[6]) for row in rows}
+
+
+def stored_totals():
+    rows = PaymentDailyRollup.objects.filter(payment_count__gt=0).values_list(
+        *KEY_FIELDS, 'total_amount', 'payment_count'
+    )
+    return {tuple(row[:5]): (row[5], row[6]) for row in rows.iterator(chunk_size=5000)}
+
+
+def rebuild_payment_rollups(fix=True):
+    """
+    Compare the rollups with the payments and, if `fix` and any bucket
+    differs, replace the table. Returns (buckets expected, buckets that
+    differed).
+    """
+    with transaction.atomic():
+        if fix and connection.vendor == 'postgresql':
+            # Holds off live rollup updates until the rebuilt rows are committed.
+            # Payments completed meanwhile are either visible to the grouped query
+            # below or wait here and are applied on top of the rebuilt rows.
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {PaymentDailyRollup._meta.db_table} IN EXCLUSIVE MODE')
+
+        expected = ledger_totals()
+        current = stored_totals()
+        differed = [key for key in expected.keys() | current.keys() if expected.get(key) != current.get(key)]
+        for key in differed[:20]:
+            logger.info(f"Payment rollup {key} was {current.get(key)}, expected {expected.get(key)}")
+
+        if fix and differed:
+            PaymentDailyRollup.objects.all().delete()
+            PaymentDailyRollup.objects.bulk_create(
+                [
+                    PaymentDailyRollup(**dict(zip(KEY_FIELDS, key)), total_amount=total, payment_count=count)
+                    for key, (total, count) in expected.items()
+                ],
+                batch_size=2000
+            )
+    return len(expected), len(differed)
+
+
+def parse_date_range(start, end):
+    """(start, end) dates from YYYY-MM-DD query values, defaulting to the last DEFAULT_RANGE_DAYS days."""
+    options = get_rollup_settings()
+    try:
+        end = date.fromisoformat(end) if end else timezone.localdate()
+        start = date.fromisoformat(start) if start else end - timedelta(days=options['DEFAULT_RANGE_DAYS'] - 1)
+    except ValueError:
+        raise InvalidRange('start and end must be dates in YYYY-MM-DD format')
+    if start > end:
+        raise InvalidRange('start must not be after end')
+    if (end - start).days >= options['MAX_RANGE_DAYS']:
+        raise InvalidRange(f"The range cannot be longer than {options['MAX_RANGE_DAYS']} days")
+    return start, end
+
+
+def completed_rollups(**owner):
+    """A client's (client_id=...) or professional's (professional_id=...) completed rollups."""
+    return PaymentDailyRollup.objects.filter(status='completed', **owner)
+
+
+def payment_totals(**owner):
+    totals = completed_rollups(**owner).aggregate(
+        total_amount=Sum('total_amount'),
+        payment_count=Sum('payment_count'),
+    )
+    return {
+        'total_amount': totals['total_amount'] or Decimal('0.00'),
+        'payment_count': totals['payment_count'] or 0,
+    }
+
+
+def daily_series(start, end, **owner):
+    """
+    Completed payment totals for every day from `start` to `end`, days
+    without payments included as zeros, with per-type amounts and the
+    range's totals.
+    """
+    rows = (
+        completed_rollups(**owner)
+        .filter(day__range=(start, end))
+        .values_list('day', 'payment_type')
+        .order_by()
+        .annotate(amount=Sum('total_amount'), count=Sum('payment_count'))
+    )
+    empty_types = {payment_type: Decimal('0.00') for payment_type, _ in Payment.PAYMENT_TYPE_CHOICES}
+    days = {
+        start + timedelta(days=offset): {'amount': Decimal('0.00'), 'count': 0, 'by_type': dict(empty_types)}
+        for offset in range((end - start).days + 1)
+    }
+    for day, payment_type, amount, count in rows:
+        point = days[day]
+        point['amount'] += amount
+        point['count'] += count
+        point['by_type'][payment_type] = point['by_type'].get(payment_type, Decimal('0.00')) + amount
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total_amount': sum((point['amount'] for point in days.values()), Decimal('0.00')),
+        'payment_count': sum(point['count'] for point in days.values()),
+        'series': [{'date': day.isoformat(), **point} for day, point in days.items()],
+    }
@@ -0,0 +1,122 @@
+# account/search.py
+"""
+Ranked full-text search over open jobs (PostgreSQL only).
+
+Job.search_vector is a generated tsvector column, title weighted 'A' and
+description 'B', that PostgreSQL keeps current on every write and that
+job_search_vector_idx (GIN) indexes. search_open_jobs() matches the query
+against it with websearch_to_tsquery(), so quoted phrases, "or" and
+-exclusions work, and orders the hits by ts_rank, so a title match ranks
+above a description-only one.
+
+When nothing matches, usually because of a typo, it falls back to trigram
+word similarity against the title, served by job_title_trgm_idx (GIN,
+gin_trgm_ops). Both paths read one index and rank a bounded set of rows
+(at most MAX_RANKED for full-text), so a search stays in the low
+milliseconds however many jobs exist.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import F
+
+DEFAULTS = {
+    'CONFIG': 'english',
+    'MIN_QUERY_LENGTH': 2,
+    'MAX_QUERY_LENGTH': 200,
+    'MAX_RANKED': 1000,
+    'TRIGRAM_FALLBACK': True,
+    'TRIGRAM_THRESHOLD': 0.5,
+}
+
+SEARCH_MODES = ('fulltext', 'trigram')
+
+
+def get_job_search_settings():
+    return {**DEFAULTS, **getattr(settings, 'JOB_SEARCH', {})}
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+def clean_search_text(text):
+    options = get_job_search_settings()
+    text = ' '.join((text or '').split())
+    if len(text) < options['MIN_QUERY_LENGTH']:
+        raise InvalidSearch(f"q must be at least {options['MIN_QUERY_LENGTH']} characters")
+    return text[:options['MAX_QUERY_LENGTH']]
+
+
+def parse_page(value):
+    try:
+        page = int(value or 1)
+    except (TypeError, ValueError):
+        page = 0
+    if page < 1:
+        raise InvalidSearch('page must be a positive integer')
+    return page
+
+
+def fulltext_matches(queryset, text):
+    """
+    Jobs whose search_vector matches `text`, best ranked first. Only the
+    newest MAX_RANKED matches are ranked: a common word can match a large
+    share of all jobs, and ranking every one of them would cost far more
+    than the page it produces.
+    """
+    options = get_job_search_settings()
+    query = SearchQuery(text, search_type='websearch', config=options['CONFIG'])
+    candidates = (
+        queryset.filter(search_vector=query)
+        .order_by('-created_at', '-job_id')
+        .values('pk')[:options['MAX_RANKED']]
+    )
+    return (
+        queryset.filter(pk__in=candidates)
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .order_by('-rank', '-job_id')
+    )
+
+
+def trigram_matches(queryset, text):
+    """
+    Jobs with a title word similar to `text` (pg_trgm's %> operator), closest
+    first. Run inside _trigram_page(), which sets the similarity threshold.
+    """
+    return (
+        queryset.filter(title__trigram_word_similar=text)
+        .annotate(rank=TrigramWordSimilarity(text, 'title'))
+        .order_by('-rank', '-job_id')
+    )
+
+
+async def asearch_open_jobs(queryset, text, limit, offset=0, mode=None):
+    """
+    Return (jobs, mode, has_more) for one page of results. Without a mode
+    the full-text search runs first and the trigram one only when it has no
+    match at all; later pages pass back the mode the first page reported.
+    """
+    if mode not in (None, *SEARCH_MODES):
+        raise InvalidSearch(f"mode must be one of {', '.join(SEARCH_MODES)}")
+
+    if mode != 'trigram':
+        jobs = [job async for job in fulltext_matches(queryset, text)[offset:offset + limit + 1]]
+        if jobs or mode == 'fulltext' or offset or not get_job_search_settings()['TRIGRAM_FALLBACK']:
+            return jobs[:limit], 'fulltext', len(jobs) > limit
+
+    jobs = await _trigram_page(queryset, text, offset, offset + limit + 1)
+    return jobs[:limit], 'trigram', len(jobs) > limit
+
+
+@sync_to_async
+def _trigram_page(queryset, text, start, stop):
+    # The %> operator compares against this setting; SET LOCAL keeps it to this query
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(get_job_search_settings()['TRIGRAM_THRESHOLD'])]
+            )
+        return list(trigram_matches(queryset, text)[start:stop])
@@ -14,6 +14,9 @@ from rest_framework import serializers
 from .models import Message
 import urllib.parse
 from .models import Notification
+from .skills import normalize_skill
+from .ratings import rating_histogram
+from .file_serving import message_file_url
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,10 +27,11 @@ class MessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.SerializerMethodField()
     sender_role = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
-        fields = ['id', 'sender', 'sender_name', 'sender_role', 'content', 'file_url', 'file_type', 'created_at', 'is_read']
+        fields = ['id', 'sender', 'sender_name', 'sender_role', 'content', 'file_url', 'file_type', 'variants', 'created_at', 'is_read']
 
     def get_sender_name(self, obj):
         return obj.sender.name if hasattr(obj.sender, 'name') else str(obj.sender)
@@ -36,27 +40,41 @@ class MessageSerializer(serializers.ModelSerializer):
         return obj.sender.role if hasattr(obj.sender, 'role') else 'unknown'
 
     def get_file_url(self, obj):
-        if obj.file_absolute_url:
+        if obj.file:
+            # Built from the file name: older rows stored a static /media/ URL
+            return message_file_url(obj.file.name, self.context.get('request'))
+        elif obj.file_absolute_url:
             return obj.file_absolute_url
-        elif obj.file:
-            request = self.context.get('request')
-            if request:
-                # Build absolute URI for local files
-                file_url = f'/media/message/{obj.file.name}'
-                return request.build_absolute_uri(file_url)
-            return f'/media/message/{obj.file.name}'
         return None
 
+    def get_variants(self, obj):
+        # Smaller renditions of image attachments, e.g. {'thumbnail': {'url', 'width', 'height'}}
+        request = self.context.get('request')
+        variants = {}
+        for variant, info in (obj.variants or {}).items():
+            variants[variant] = {
+                'url': message_file_url(info['name'], request),
+                'width': info['width'],
+                'height': info['height'],
+            }
+        return variants
+
 class ConversationSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
     job_title = serializers.CharField(source='job.title', read_only=True)
-    client_id = serializers.IntegerField(source='job.client_id.id', read_only=True, allow_null=True)
-    professional_id = serializers.IntegerField(source='job.professional_id.id', read_only=True, allow_null=True)
+    client_id = serializers.IntegerField(source='job.client_id_id', read_only=True, allow_null=True)
+    professional_id = serializers.IntegerField(source='job.professional_id_id', read_only=True, allow_null=True)
 
     class Meta:
         model = Conversation
         fields = ['id', 'job', 'job_title', 'client_id', 'professional_id', 'messages', 'created_at']
 
+    def get_messages(self, obj):
+        # Only the page of messages the view attached (latest page or latest
+        # message); full history is served by MessageHistoryView.
+        messages = getattr(obj, 'latest_messages', [])
+        return MessageSerializer(messages, many=True, context=self.context).data
+
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -205,6 +223,7 @@ class UserSerializer(serializers.ModelSerializer):
 class ProfessionalProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     verify_doc_url = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     
     class Meta:
         model = ProfessionalProfile
@@ -218,14 +237,22 @@ class ProfessionalProfileSerializer(serializers.ModelSerializer):
             'verify_doc',        # Cloudinary field
             'verify_doc_url',    # URL for the document
             'avg_rating',
+            'rating_count',
+            'rating_histogram',
             'user',
             'verify_doc',
+            'verify_doc_upload_status',
             'denial_reason',
         ]
+        read_only_fields = ['verify_doc_upload_status', 'avg_rating', 'rating_count']
     def get_verify_doc_url(self, obj):
         """Return the full URL of the verification document if it exists"""
         return obj.get_verify_doc_url()
 
+    def get_rating_histogram(self, obj):
+        """Number of reviews per star rating, {'1': n, ..., '5': n}"""
+        return rating_histogram(obj)
+
     def validate_verify_doc(self, value):
         """Validate the uploaded verification document"""
         if value:
@@ -285,8 +312,14 @@ class ProfessionalProfileSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Each skill must be a non-empty string")
             if len(skill.strip()) > 50:
                 raise serializers.ValidationError("Each skill cannot exceed 50 characters")
-        
-        return [skill.strip() for skill in value]
+            if not normalize_skill(skill):
+                raise serializers.ValidationError("Each skill must contain letters or digits")
+
+        # Keep one spelling of each skill ("React", "react.js")
+        skills = {}
+        for skill in value:
+            skills.setdefault(normalize_skill(skill), skill.strip())
+        return list(skills.values())
 
     def validate_portfolio_links(self, value):
         """Validate portfolio links"""
@@ -376,13 +409,18 @@ class JobSerializer(serializers.ModelSerializer):
             'review',
             'document',      # NEW: Include the document field
             'document_url',
+            'document_upload_status',
         ]
-        read_only_fields = ['job_id', 'status','document_url','created_at', 'client_id', 'client_name', 'applicants_count', 'rating']
+        read_only_fields = ['job_id', 'status','document_url','document_upload_status','created_at', 'client_id', 'client_name', 'applicants_count', 'rating']
 
     def get_client_id(self, obj):
         return UserSerializer(obj.client_id).data
 
     def get_applicants_count(self, obj):
+        # Querysets built with Job.objects.with_list_data() carry the count
+        applicants_total = getattr(obj, 'applicants_total', None)
+        if applicants_total is not None:
+            return applicants_total
         return obj.applications.count()
     def get_document_url(self, obj):
   
@@ -481,6 +519,17 @@ class JobSerializer(serializers.ModelSerializer):
         # Save the instance
         instance.save()
         return instance
+
+
+class JobMatchSerializer(JobSerializer):
+    """A JobSerializer row from RecommendedJobsView, with its match score and shared skills."""
+    match_score = serializers.FloatField(read_only=True)
+    matched_skills = serializers.JSONField(read_only=True)
+
+    class Meta(JobSerializer.Meta):
+        fields = JobSerializer.Meta.fields + ['match_score', 'matched_skills']
+
+
 class JobApplicationSerializer(serializers.ModelSerializer):
     professional_id = serializers.PrimaryKeyRelatedField(
         queryset=CustomUser.objects.filter(role='professional'),
@@ -499,7 +548,8 @@ class JobApplicationSerializer(serializers.ModelSerializer):
 
     def get_professional_details(self, obj):
         try:
-            profile = ProfessionalProfile.objects.get(user=obj.professional_id)
+            # Uses the joined profile when the queryset came from with_list_data()
+            profile = obj.professional_id.professionalprofile
             profile_data = ProfessionalProfileSerializer(profile).data
             user_data = UserSerializer(obj.professional_id).data
             return {**profile_data, 'user': user_data}
@@ -507,7 +557,11 @@ class JobApplicationSerializer(serializers.ModelSerializer):
             return {'user': UserSerializer(obj.professional_id).data}
 
     def get_job_details(self, obj):
-        return JobSerializer(obj.job_id).data
+        job = obj.job_id
+        job_applicants_total = getattr(obj, 'job_applicants_total', None)
+        if job_applicants_total is not None:
+            job.applicants_total = job_applicants_total
+        return JobSerializer(job).data
 
     def validate(self, data):
         job = data['job_id']
@@ -0,0 +1,52 @@
+# account/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .access import invalidate_job_participants
+from .blobs import add_reference, drop_reference
+from .authentication import invalidate_cached_user
+from .counters import record_new_messages, record_new_notifications
+from .models import CustomUser, JobApplication, Message, Notification, ProfessionalProfile
+from .skills import sync_profile_skills
+
+
+@receiver(post_save, sender=Message)
+def count_new_message(sender, instance, created, **kwargs):
+    if created:
+        record_new_messages([instance])
+
+
+@receiver(post_save, sender=Message)
+def reference_blob(sender, instance, created, **kwargs):
+    if created and instance.blob_id:
+        add_reference(instance.blob_id)
+
+
+@receiver(post_delete, sender=Message)
+def release_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        drop_reference(instance.blob_id)
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created:
+        record_new_notifications([instance])
+
+
+@receiver(post_save, sender=JobApplication)
+@receiver(post_delete, sender=JobApplication)
+def drop_cached_job_participants(sender, instance, **kwargs):
+    invalidate_job_participants(instance.job_id_id)
+
+
+@receiver(post_save, sender=ProfessionalProfile)
+def index_profile_skills(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'skills' in update_fields:
+        sync_profile_skills(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.id)
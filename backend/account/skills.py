@@ -0,0 +1,104 @@
+# account/skills.py
+"""
+Normalized skill taxonomy.
+
+ProfessionalProfile.skills stays the list the professional typed. Every
+entry is normalized to a key (lowercase, single-spaced, common aliases
+resolved, so "ReactJS" and "react.js" are both "react") and recorded as a
+Skill, and ProfessionalSkill rows map each Skill to the profiles that list
+it. sync_profile_skills() keeps those rows in step with the JSON list; it
+runs from a post_save signal and from the rebuild_skill_index command.
+
+Jobs have no skill list: skill_ids_in_text() finds known skill keys in a
+job's title and description, which is what account.matching scores.
+"""
+import re
+
+from django.db import transaction
+
+from .models import ProfessionalSkill, Skill
+
+# Longest skill phrase looked up in job texts, in words ("machine learning")
+MAX_SKILL_WORDS = 3
+
+ALIASES = {
+    'js': 'javascript',
+    'ts': 'typescript',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'angularjs': 'angular',
+    'nodejs': 'node.js',
+    'node': 'node.js',
+    'nextjs': 'next.js',
+    'expressjs': 'express',
+    'express.js': 'express',
+    'py': 'python',
+    'golang': 'go',
+    'postgres': 'postgresql',
+    'mongo': 'mongodb',
+    'k8s': 'kubernetes',
+    'ml': 'machine learning',
+    'ui/ux': 'ui ux design',
+    'ux/ui': 'ui ux design',
+    'amazon web services': 'aws',
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9+#./]*[a-z0-9+#]')
+
+
+def normalize_skill(name):
+    """The taxonomy key for a skill as typed, or '' if nothing is left of it."""
+    key = ' '.join(TOKEN_RE.findall(str(name).lower()))
+    return ALIASES.get(key, key)[:50]
+
+
+def get_or_create_skills(names):
+    """Map each name to its Skill, creating the missing ones. Returns {key: Skill}."""
+    first_spelling = {}
+    for name in names:
+        key = normalize_skill(name)
+        if key:
+            first_spelling.setdefault(key, name.strip()[:50])
+
+    skills = {skill.key: skill for skill in Skill.objects.filter(key__in=first_spelling)}
+    missing = [Skill(key=key, name=name) for key, name in first_spelling.items() if key not in skills]
+    if missing:
+        Skill.objects.bulk_create(missing, ignore_conflicts=True)
+        skills.update(
+            (skill.key, skill) for skill in Skill.objects.filter(key__in=[skill.key for skill in missing])
+        )
+    return skills
+
+
+def sync_profile_skills(profile):
+    """Make the profile's ProfessionalSkill rows match its skills list."""
+    wanted = {skill.id for skill in get_or_create_skills(profile.skills or []).values()}
+    with transaction.atomic():
+        current = set(ProfessionalSkill.objects.filter(profile=profile).values_list('skill_id', flat=True))
+        if current - wanted:
+            ProfessionalSkill.objects.filter(profile=profile, skill_id__in=current - wanted).delete()
+        if wanted - current:
+            ProfessionalSkill.objects.bulk_create(
+                [ProfessionalSkill(profile=profile, skill_id=skill_id) for skill_id in wanted - current],
+                ignore_conflicts=True
+            )
+
+
+def text_phrases(text):
+    """Every run of 1 to MAX_SKILL_WORDS words in `text`, normalized like a skill."""
+    words = TOKEN_RE.findall((text or '').lower())
+    for size in range(1, MAX_SKILL_WORDS + 1):
+        for start in range(len(words) - size + 1):
+            phrase = ' '.join(words[start:start + size])
+            yield ALIASES.get(phrase, phrase)
+
+
+def skill_ids_in_text(text, skill_ids_by_key):
+    """Ids of the skills, from a {key: id} map, whose key appears in `text`."""
+    return {
+        skill_ids_by_key[phrase]
+        for phrase in text_phrases(text)
+        if phrase in skill_ids_by_key
+    }
@@ -3,6 +3,8 @@ from django.core.files.storage import FileSystemStorage
 from django.conf import settings
 import os
 
+from .file_serving import message_file_url
+
 class LocalFileStorage(FileSystemStorage):
     """
     Custom storage for conversation files that stores files locally
@@ -23,10 +25,11 @@ class LocalFileStorage(FileSystemStorage):
         """Return the URL where the file can be retrieved."""
         if name is None:
             return name
-        
-        # Ensure the URL starts with our base URL
-        url = super().url(name)
-        if not url.startswith('/media/message/'):
-            # If the file path doesn't include the full structure, construct it properly
-            return f'/media/message/{name}'
-        return url
\ No newline at end of file
+
+        # Always through serve_message_file, which checks the user may see it
+        return message_file_url(name)
+
+
+def staged_upload_storage():
+    """Local storage for documents waiting to be pushed to Cloudinary (account.cloud_uploads)."""
+    return FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'staged'))
@@ -1,3 +1,762 @@
-from django.test import TestCase
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    Complaint, Conversation, CustomUser, Job, JobApplication, Message, Notification, Payment, PaymentDailyRollup,
+    ProfessionalProfile, StagedUpload, StoredBlob
+)
+from .blobs import collect_garbage, recount_references, store_blob
+from .chat_buffer import MessageWriteBuffer
+from .cloud_uploads import (
+    FakeCloudinaryUploader, claim_batch, drain_staged_uploads, purge_uploaded, stage_document, upload_batch
+)
+from .counters import compute_unread_counts, get_unread_counts, record_messages_read
+from .file_serving import file_etag, parse_range, serve_file
+from .job_events import job_state_snapshot, publish_job_states
+from .payments import FakeRazorpayGateway, get_or_create_order
+from .query_shapes import QUERY_SHAPES
+from .ratings import rated_totals, rating_changes, rating_histogram, recompute_rating_aggregates
+from .rollups import (
+    ledger_totals, payment_totals, rebuild_payment_rollups, record_payment_completed, stored_totals
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListQueryCountTests(TestCase):
+    """
+    The job list endpoints render through with_list_data(), so their query
+    count must not grow with the number of rows listed.
+    """
+    MANY = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        cls.professional = CustomUser.objects.create_user(
+            'pro@example.com', 'Pro', password='pass', role='professional'
+        )
+        ProfessionalProfile.objects.create(user=cls.professional, skills=['python'])
+
+    def setUp(self):
+        cache.clear()
+
+    def create_jobs(self, count, status='Open'):
+        return [
+            Job.objects.create(
+                client_id=self.client_user,
+                title=f'Job {index}',
+                description='Build a thing',
+                budget=1000,
+                deadline=date.today() + timedelta(days=30),
+                status=status,
+            )
+            for index in range(count)
+        ]
+
+    def create_professional(self, index):
+        user = CustomUser.objects.create_user(
+            f'pro{index}@example.com', f'Pro {index}', password='pass', role='professional'
+        )
+        ProfessionalProfile.objects.create(user=user, skills=['django'])
+        return user
+
+    def assertConstantQueries(self, queries, url, user, add_rows, count_rows):
+        """GET `url` with one row and with MANY rows, in `queries` queries each time."""
+        add_rows(1)
+        self.client.get(url, **auth(user))  # resolves and caches the token's user
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, **auth(user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count_rows(response.json()), 1)
+
+        add_rows(self.MANY - 1)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, **auth(user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count_rows(response.json()), self.MANY)
+
+    def test_open_jobs(self):
+        self.assertConstantQueries(
+            1, '/api/open-jobs/', self.professional,
+            lambda count: self.create_jobs(count),
+            lambda data: len(data['results']),
+        )
+
+    def test_client_projects(self):
+        def add_rows(count):
+            for job in self.create_jobs(count, status='Assigned'):
+                JobApplication.objects.create(job_id=job, professional_id=self.professional, status='Accepted')
+
+        self.assertConstantQueries(
+            1, '/api/client-project/', self.client_user,
+            add_rows,
+            lambda data: len(data['active']),
+        )
+
+    def test_job_applications(self):
+        job = self.create_jobs(1)[0]
+        professionals = iter(range(self.MANY))
+
+        def add_rows(count):
+            for _ in range(count):
+                JobApplication.objects.create(job_id=job, professional_id=self.create_professional(next(professionals)))
+
+        self.assertConstantQueries(
+            2, f'/api/job-applications/{job.job_id}/', self.client_user,
+            add_rows,
+            lambda data: len(data['applications']),
+        )
+
+    def test_professional_job_applications(self):
+        def add_rows(count):
+            for job in self.create_jobs(count):
+                JobApplication.objects.create(job_id=job, professional_id=self.professional)
+
+        self.assertConstantQueries(
+            1, '/api/professional-job-applications/', self.professional,
+            add_rows,
+            lambda data: len(data['applications']),
+        )
+
+
+class JobStateTests(TestCase):
+    """Applicants only ever see their own application of a job; its client sees all of them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        cls.job = Job.objects.create(
+            client_id=cls.client_user, title='Job', description='Build a thing', budget=1000,
+            deadline=date.today() + timedelta(days=30),
+        )
+        cls.applicants = [
+            CustomUser.objects.create_user(f'pro{index}@example.com', f'Pro {index}', password='pass', role='professional')
+            for index in range(3)
+        ]
+        for applicant in cls.applicants:
+            JobApplication.objects.create(job_id=cls.job, professional_id=applicant)
+
+    def application_emails(self, state):
+        return {application['professional_email'] for application in state['applications']}
+
+    def test_snapshot(self):
+        self.assertEqual(
+            self.application_emails(job_state_snapshot(self.client_user)[0]),
+            {applicant.email for applicant in self.applicants}
+        )
+        for applicant in self.applicants:
+            self.assertEqual(self.application_emails(job_state_snapshot(applicant)[0]), {applicant.email})
+
+    def test_published_states(self):
+        with mock.patch('account.job_events.send_realtime') as send_realtime:
+            publish_job_states([self.job.job_id])
+        events = dict(send_realtime.call_args.args[0])
+        self.assertEqual(len(events), 1 + len(self.applicants))
+        self.assertEqual(len(events[self.client_user.id]['job']['applications']), len(self.applicants))
+        for applicant in self.applicants:
+            self.assertEqual(self.application_emails(events[applicant.id]['job']), {applicant.email})
+
+
+class UnreadCounterTests(TestCase):
+    """The unread counters follow messages and notifications once their transaction commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        cls.professional = CustomUser.objects.create_user(
+            'pro@example.com', 'Pro', password='pass', role='professional'
+        )
+        job = Job.objects.create(
+            client_id=cls.client_user, professional_id=cls.professional, title='Job', description='Build a thing',
+            budget=1000, deadline=date.today() + timedelta(days=30), status='Assigned',
+        )
+        cls.conversation = Conversation.objects.create(job=job)
+
+    def send(self, sender, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(count):
+                Message.objects.create(conversation=self.conversation, sender=sender, content=f'hello {index}')
+
+    def assertMatchesSourceTables(self, user):
+        expected = compute_unread_counts([user.id]).get(user.id, {'messages': 0, 'notifications': 0})
+        self.assertEqual(get_unread_counts(user), expected)
+
+    def test_messages_count_for_the_other_participant(self):
+        self.send(self.professional, 3)
+        self.send(self.client_user, 1)
+        self.assertEqual(get_unread_counts(self.client_user)['messages'], 3)
+        self.assertEqual(get_unread_counts(self.professional)['messages'], 1)
+        self.assertMatchesSourceTables(self.client_user)
+        self.assertMatchesSourceTables(self.professional)
+
+    def test_not_counted_until_commit(self):
+        get_unread_counts(self.client_user)  # creates the counter row
+        with self.captureOnCommitCallbacks() as callbacks:
+            Message.objects.create(conversation=self.conversation, sender=self.professional, content='hello')
+        self.assertEqual(get_unread_counts(self.client_user)['messages'], 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_unread_counts(self.client_user)['messages'], 1)
+
+    def test_read_never_goes_below_zero(self):
+        self.send(self.professional, 2)
+        Message.objects.filter(conversation=self.conversation).update(is_read=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_messages_read(self.client_user.id, 5)
+        self.assertEqual(get_unread_counts(self.client_user)['messages'], 0)
+        self.assertMatchesSourceTables(self.client_user)
+
+    def test_notifications(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(2):
+                Notification.objects.create(user=self.professional, notification_type='message', title='New', message='hi')
+        self.assertEqual(get_unread_counts(self.professional)['notifications'], 2)
+        self.assertMatchesSourceTables(self.professional)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class MessageWriteBufferTests(TransactionTestCase):
+    """
+    Buffered chat messages get their ids from the INSERT and are confirmed to
+    their room. A TransactionTestCase, because the buffer writes through
+    database_sync_to_async, which closes the connection TestCase would wrap.
+    """
+
+    def setUp(self):
+        self.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        job = Job.objects.create(
+            client_id=self.client_user, title='Job', description='Build a thing',
+            budget=1000, deadline=date.today() + timedelta(days=30),
+        )
+        self.conversation = Conversation.objects.create(job=job)
+
+    def run_buffer(self, contents, flushes=1, max_attempts=2):
+        """Append `contents`, flush `flushes` times; returns (pending messages, room events)."""
+        async def scenario():
+            layer = get_channel_layer()
+            channel = await layer.new_channel()
+            await layer.group_add('room', channel)
+            buffer = MessageWriteBuffer(max_batch=100, flush_interval=60, max_attempts=max_attempts)
+            pending = [
+                await buffer.append(self.conversation.id, self.client_user, content, 'room', 'text')
+                for content in contents
+            ]
+            for _ in range(flushes):
+                await buffer.flush()
+            events = []
+            while True:
+                try:
+                    events.append(await asyncio.wait_for(layer.receive(channel), 0.05))
+                except asyncio.TimeoutError:
+                    return pending, [event['message'] for event in events]
+
+        return async_to_sync(scenario)()
+
+    def test_ids_assigned_at_flush(self):
+        pending, events = self.run_buffer(['one', 'two', 'three'])
+        saved = list(Message.objects.order_by('id').values_list('id', 'content'))
+        self.assertEqual([content for _, content in saved], ['one', 'two', 'three'])
+        self.assertEqual(
+            [(event['event'], event['temp_id'], event['id']) for event in events],
+            [('message_saved', item.temp_id, message_id) for item, (message_id, _) in zip(pending, saved)]
+        )
+
+    def test_failing_row_is_dropped_after_retries(self):
+        write = MessageWriteBuffer._write
+
+        def fail_on_bad(messages):
+            if any(message.content == 'bad' for message in messages):
+                raise ValueError('bad row')
+            write(messages)
+
+        with mock.patch.object(MessageWriteBuffer, '_write', staticmethod(fail_on_bad)):
+            pending, events = self.run_buffer(['ok', 'bad', 'also ok'], flushes=2, max_attempts=2)
+
+        self.assertEqual(list(Message.objects.order_by('id').values_list('content', flat=True)), ['ok', 'also ok'])
+        self.assertEqual(
+            sorted((event['event'], event['temp_id']) for event in events),
+            sorted([
+                ('message_saved', pending[0].temp_id),
+                ('message_failed', pending[1].temp_id),
+                ('message_saved', pending[2].temp_id),
+            ])
+        )
+
+
+class ByteRangeTests(SimpleTestCase):
+    """Range requests on message files: partial content, suffixes and unsatisfiable ranges."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'file.txt')
+        with open(self.path, 'wb') as f:
+            f.write(b'0123456789')
+
+    def get(self, **headers):
+        request = RequestFactory().get('/', headers=headers)
+        with override_settings(FILE_SERVING={'MODE': 'python'}):
+            return serve_file(request, self.path, 'file.txt')
+
+    def test_parse_range(self):
+        cases = [
+            ('bytes=0-3', (0, 3)),
+            ('bytes=5-', (5, 9)),
+            ('bytes=5-100', (5, 9)),
+            ('bytes=-3', (7, 9)),
+            ('bytes=-100', (0, 9)),
+            ('bytes=-0', False),
+            ('bytes=10-', False),
+            ('bytes=10-20', False),
+            ('bytes=5-2', False),
+            (None, None),
+            ('bytes=-', None),
+            ('bytes=0-1,4-5', None),
+            ('items=0-3', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 10), expected)
+        self.assertIs(parse_range('bytes=-5', 0), False)
+
+    def test_partial_content(self):
+        response = self.get(Range='bytes=-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 6-9/10')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(b''.join(response.streaming_content), b'6789')
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_if_range(self):
+        etag = file_etag(os.stat(self.path))
+        response = self.get(Range='bytes=0-1', **{'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+        response = self.get(Range='bytes=0-1', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+
+@override_settings(CHAT_FILE_STORAGE={'CONTENT_ADDRESSED': True, 'GC_GRACE_PERIOD': 3600})
+class BlobStorageTests(TestCase):
+    """Content-addressed attachments are stored once and only collected when nothing uses them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        job = Job.objects.create(
+            client_id=cls.client_user, title='Job', description='Build a thing',
+            budget=1000, deadline=date.today() + timedelta(days=30),
+        )
+        cls.conversation = Conversation.objects.create(job=job)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = FileSystemStorage(location=directory.name)
+        patcher = mock.patch('account.blobs.message_storage', return_value=self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def age(self, blob=None, name=None):
+        """Move a blob's last use, or a stored file's mtime, to before the grace period."""
+        past = timezone.now() - timedelta(hours=2)
+        if blob is not None:
+            StoredBlob.objects.filter(pk=blob.pk).update(last_used_at=past)
+        if name is not None:
+            os.utime(self.storage.path(name), (past.timestamp(), past.timestamp()))
+
+    def attach(self, blob):
+        return Message.objects.create(
+            conversation=self.conversation, sender=self.client_user, content='', file=blob.name, blob=blob
+        )
+
+    def test_same_content_stored_once(self):
+        first = store_blob(ContentFile(b'hello'), 'a.txt')
+        second = store_blob(ContentFile(b'hello'), 'b.TXT')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(StoredBlob.objects.count(), 1)
+        self.assertEqual(self.storage.listdir(os.path.dirname(first.name))[1], [os.path.basename(first.name)])
+
+    def test_references_follow_messages(self):
+        blob = store_blob(ContentFile(b'hello'), 'a.txt')
+        message = self.attach(blob)
+        self.attach(blob)
+        self.assertEqual(StoredBlob.objects.get(pk=blob.pk).ref_count, 2)
+        message.delete()
+        self.assertEqual(StoredBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+    def test_gc_keeps_referenced_blob(self):
+        blob = store_blob(ContentFile(b'hello'), 'a.txt')
+        self.attach(blob)
+        # A drifted counter must not be enough to delete a file in use
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=0)
+        self.age(blob, blob.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_garbage(), (0, 0))
+        self.assertTrue(StoredBlob.objects.filter(pk=blob.pk).exists())
+        self.assertTrue(self.storage.exists(blob.name))
+        recount_references()
+        self.assertEqual(StoredBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+    def test_gc_removes_unreferenced_blobs_and_orphans(self):
+        unused = store_blob(ContentFile(b'unused'), 'a.txt')
+        recent = store_blob(ContentFile(b'recent'), 'b.txt')
+        self.age(unused, unused.name)
+        old_orphan = self.storage.save('cas/00/00/old.txt', ContentFile(b'old'))
+        new_orphan = self.storage.save('cas/00/00/new.txt', ContentFile(b'new'))
+        self.age(name=old_orphan)
+
+        self.assertEqual(collect_garbage(dry_run=True), (1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_garbage(), (1, 1))
+
+        self.assertEqual(list(StoredBlob.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertFalse(self.storage.exists(unused.name))
+        self.assertFalse(self.storage.exists(old_orphan))
+        self.assertTrue(self.storage.exists(new_orphan))
+        self.assertTrue(self.storage.exists(recent.name))
+
+
+class StagedUploadTests(TestCase):
+    """
+    Staged documents are swapped into their record by the worker, and no
+    Cloudinary resource is left behind that the record does not point at.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user('pro@example.com', 'Pro', password='pass', role='professional')
+        cls.profile = ProfessionalProfile.objects.create(user=user, skills=['python'])
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cloud_root = os.path.join(directory.name, 'cloud')
+        field = StagedUpload._meta.get_field('file')
+        for patcher in (
+            mock.patch.object(field, 'storage', FileSystemStorage(location=os.path.join(directory.name, 'staged'))),
+            mock.patch('account.cloud_uploads.get_uploader', return_value=FakeCloudinaryUploader(self.cloud_root)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stage(self, content):
+        return stage_document(self.profile, 'profile_verify_doc', SimpleUploadedFile('doc.pdf', content))
+
+    def cloud_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.cloud_root)
+            for root, _, files in os.walk(self.cloud_root) for name in files
+        )
+
+    def stored_document(self):
+        profile = ProfessionalProfile.objects.get(pk=self.profile.pk)
+        return profile.verify_doc, profile.verify_doc_upload_status
+
+    def test_upload_replaces_previous_document(self):
+        first = self.stage(b'one')
+        self.assertEqual(self.stored_document()[1], 'pending')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_staged_uploads(), (1, 0))
+        document, status = self.stored_document()
+        self.assertEqual(status, 'uploaded')
+        self.assertEqual(self.cloud_files(), [f'{document.public_id}.pdf'])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.file.name), ('uploaded', ''))
+
+        self.stage(b'two')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_staged_uploads(), (1, 0))
+        replacement, status = self.stored_document()
+        self.assertNotEqual(replacement.public_id, document.public_id)
+        self.assertEqual(self.cloud_files(), [f'{replacement.public_id}.pdf'])
+
+    def test_superseded_upload_is_destroyed(self):
+        self.stage(b'one')
+        claimed = claim_batch(10)
+        self.stage(b'two')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(upload_batch(claimed), (1, 0))
+        self.assertEqual(self.stored_document(), (None, 'pending'))
+        self.assertEqual(self.cloud_files(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_staged_uploads(), (1, 0))
+        document, status = self.stored_document()
+        self.assertEqual(status, 'uploaded')
+        self.assertEqual(self.cloud_files(), [f'{document.public_id}.pdf'])
+
+    def test_failed_swap_destroys_upload(self):
+        staged = self.stage(b'one')
+        with mock.patch('account.cloud_uploads._swap_in', side_effect=DatabaseError('boom')):
+            self.assertEqual(drain_staged_uploads(), (0, 1))
+
+        self.assertEqual(self.cloud_files(), [])
+        self.assertEqual(self.stored_document(), (None, 'pending'))
+        staged.refresh_from_db()
+        self.assertEqual((staged.status, staged.attempts, staged.last_error), ('pending', 1, 'boom'))
+        self.assertGreater(staged.next_attempt_at, timezone.now())
+        self.assertTrue(staged.file.storage.exists(staged.file.name))
+
+    @override_settings(CLOUDINARY_UPLOADS={'KEEP_UPLOADED': 3600})
+    def test_purge_uploaded(self):
+        old = timezone.now() - timedelta(hours=2)
+
+        def row(status, uploaded_at):
+            return StagedUpload.objects.create(
+                target='profile_verify_doc', object_id=self.profile.pk, original_name='doc.pdf',
+                status=status, uploaded_at=uploaded_at, created_at=old,
+            )
+
+        expired = row('uploaded', old)
+        kept = [row('uploaded', timezone.now()), row('failed', old), row('pending', None)]
+        self.assertEqual(purge_uploaded(), 1)
+        self.assertFalse(StagedUpload.objects.filter(pk=expired.pk).exists())
+        self.assertEqual(StagedUpload.objects.count(), len(kept))
+
+
+class RatingAggregateTests(TestCase):
+    """A professional's running rating aggregates match their rated jobs through ratings and re-ratings."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        professional = CustomUser.objects.create_user('pro@example.com', 'Pro', password='pass', role='professional')
+        cls.profile = ProfessionalProfile.objects.create(user=professional, skills=['python'])
+        cls.jobs = []
+        for index in range(2):
+            job = Job.objects.create(
+                client_id=cls.client_user, title=f'Job {index}', description='Build a thing', budget=1000,
+                deadline=date.today() + timedelta(days=30), status='Completed',
+            )
+            JobApplication.objects.create(job_id=job, professional_id=professional, status='Completed')
+            cls.jobs.append(job)
+
+    def rate(self, job, rating):
+        with mock.patch('account.views.publish_job_states'):
+            response = self.client.post(
+                '/api/submit-review/', {'job_id': job.job_id, 'rating': rating},
+                content_type='application/json', **auth(self.client_user)
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def assertAggregates(self, rating_sum, rating_count, avg_rating, histogram):
+        profile = ProfessionalProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual(
+            (profile.rating_sum, profile.rating_count, profile.avg_rating),
+            (rating_sum, rating_count, avg_rating)
+        )
+        self.assertEqual(rating_histogram(profile), {str(rating): histogram.get(rating, 0) for rating in range(1, 6)})
+        self.assertEqual(recompute_rating_aggregates(fix=False), (1, 0))
+
+    def test_rating_changes(self):
+        self.assertEqual(set(rating_changes(4)), {'rating_sum', 'rating_count', 'rating_4_count', 'avg_rating'})
+        self.assertEqual(rating_changes(4, 4), {})
+        self.assertEqual(set(rating_changes(1, 4)), {'rating_sum', 'rating_1_count', 'rating_4_count', 'avg_rating'})
+
+    def test_rating_and_rerating(self):
+        self.rate(self.jobs[0], 5)
+        self.assertAggregates(5, 1, 5.0, {5: 1})
+        self.rate(self.jobs[1], 4)
+        self.assertAggregates(9, 2, 4.5, {5: 1, 4: 1})
+        self.rate(self.jobs[1], 1)
+        self.assertAggregates(6, 2, 3.0, {5: 1, 1: 1})
+        self.rate(self.jobs[1], 1)
+        self.assertAggregates(6, 2, 3.0, {5: 1, 1: 1})
+
+    def test_recompute_fixes_drift(self):
+        self.rate(self.jobs[0], 3)
+        ProfessionalProfile.objects.filter(pk=self.profile.pk).update(rating_sum=100, rating_3_count=0)
+
+        self.assertEqual(recompute_rating_aggregates(fix=False), (1, 1))
+        self.assertEqual(ProfessionalProfile.objects.get(pk=self.profile.pk).rating_sum, 100)
+        self.assertEqual(recompute_rating_aggregates(), (1, 1))
+        self.assertAggregates(3, 1, 3.0, {3: 1})
+        self.assertEqual(rated_totals()[self.profile.pk]['rating_sum'], 3)
+
+
+class PaymentRollupTests(TestCase):
+    """Orders are placed once per open payment, and the daily rollups follow the payment ledger."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+        cls.professional = CustomUser.objects.create_user('pro@example.com', 'Pro', password='pass', role='professional')
+        job = Job.objects.create(
+            client_id=cls.client_user, title='Job', description='Build a thing', budget=1000,
+            deadline=date.today() + timedelta(days=30),
+        )
+        cls.application = JobApplication.objects.create(job_id=job, professional_id=cls.professional, status='Accepted')
+
+    def setUp(self):
+        self.gateway = mock.Mock(wraps=FakeRazorpayGateway(None, None))
+        patcher = mock.patch('account.payments.get_gateway', return_value=self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rollups(self):
+        """{(status, payment_type): (total, count)} of the stored rollups; every payment is on one day."""
+        return {(status, payment_type): totals for (_, _, _, payment_type, status), totals in stored_totals().items()}
+
+    def complete(self, payment):
+        Payment.objects.filter(pk=payment.pk).update(status='completed')
+        payment.status = 'completed'
+        record_payment_completed(payment)
+
+    def test_order_placed_once(self):
+        payment, created = get_or_create_order(self.application, 'initial', 500)
+        again, created_again = get_or_create_order(self.application, 'initial', '500.00')
+
+        self.assertEqual((created, created_again), (True, False))
+        self.assertEqual(again.pk, payment.pk)
+        self.assertTrue(payment.razorpay_order_id.startswith('order_fake_'))
+        self.assertEqual(self.gateway.create_order.call_count, 1)
+        self.assertEqual(self.rollups(), {('created', 'initial'): (Decimal('500.00'), 1)})
+
+    def test_failed_order_is_placed_on_retry(self):
+        self.gateway.create_order.side_effect = ConnectionError('gateway down')
+        with self.assertRaises(ConnectionError):
+            get_or_create_order(self.application, 'initial', 500)
+        reserved = Payment.objects.get()
+        self.assertEqual(reserved.razorpay_order_id, '')
+
+        self.gateway.create_order.side_effect = None
+        payment, created = get_or_create_order(self.application, 'initial', 500)
+        self.assertEqual((payment.pk, created), (reserved.pk, False))
+        self.assertTrue(payment.razorpay_order_id)
+        self.assertEqual(self.rollups(), {('created', 'initial'): (Decimal('500.00'), 1)})
+
+    def test_completed_payment_moves_bucket(self):
+        initial, _ = get_or_create_order(self.application, 'initial', 500)
+        get_or_create_order(self.application, 'remaining', 300)
+        self.complete(initial)
+
+        self.assertEqual(self.rollups(), {
+            ('completed', 'initial'): (Decimal('500.00'), 1),
+            ('created', 'remaining'): (Decimal('300.00'), 1),
+        })
+        self.assertFalse(PaymentDailyRollup.objects.filter(status='created', payment_type='initial').exists())
+        self.assertEqual(
+            payment_totals(client_id=self.client_user.id),
+            {'total_amount': Decimal('500.00'), 'payment_count': 1}
+        )
+        self.assertEqual(stored_totals(), ledger_totals())
+
+    def test_rebuild_against_ledger(self):
+        initial, _ = get_or_create_order(self.application, 'initial', 500)
+        self.complete(initial)
+        get_or_create_order(self.application, 'remaining', 300)
+        # A payment made before the rollups existed, and a drifted bucket
+        Payment.objects.create(
+            job_application=self.application, payment_type='initial', razorpay_order_id='order_old',
+            amount=Decimal('50.00'), status='failed', created_at=timezone.now() - timedelta(days=3),
+        )
+        PaymentDailyRollup.objects.filter(status='completed').update(total_amount=Decimal('1.00'))
+
+        self.assertEqual(rebuild_payment_rollups(fix=False), (3, 2))
+        self.assertNotEqual(stored_totals(), ledger_totals())
+        self.assertEqual(rebuild_payment_rollups(), (3, 2))
+        self.assertEqual(stored_totals(), ledger_totals())
+        self.assertEqual(rebuild_payment_rollups(fix=False), (3, 0))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL')
+class QueryPlanTests(TestCase):
+    """
+    Every catalogued hot query shape (account.query_shapes) must use its
+    index once the tables hold a realistic spread of rows, with the planner
+    free to choose a sequential scan instead.
+    """
+    USERS = 500
+    JOBS = 10000
+    ROWS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(3)
+        now = timezone.now()
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f'user{index}@example.com', name=f'User {index}', password='!',
+                       role='client' if index % 2 else 'professional')
+            for index in range(cls.USERS)
+        ])
+        clients = [user for user in users if user.role == 'client']
+        professionals = [user for user in users if user.role == 'professional']
+
+        jobs = Job.objects.bulk_create([
+            Job(
+                client_id=rng.choice(clients),
+                title=f'Job {index}',
+                description='Build a thing',
+                budget=rng.randint(100, 10000),
+                deadline=date.today() + timedelta(days=rng.randint(1, 90)),
+                status=rng.choice(['Open', 'Assigned', 'Completed', 'Completed']),
+                created_at=now - timedelta(minutes=index),
+            )
+            for index in range(cls.JOBS)
+        ])
+        applications = JobApplication.objects.bulk_create([
+            JobApplication(
+                job_id=rng.choice(jobs),
+                professional_id=rng.choice(professionals),
+                status=rng.choice(['Applied', 'Accepted', 'Rejected', 'Completed']),
+            )
+            for _ in range(cls.ROWS)
+        ])
+        conversations = Conversation.objects.bulk_create([Conversation(job=job) for job in jobs[:cls.JOBS // 5]])
+        Message.objects.bulk_create([
+            Message(conversation=rng.choice(conversations), sender=rng.choice(users),
+                    content='hello', is_read=rng.random() < 0.8)
+            for _ in range(cls.ROWS)
+        ])
+        Notification.objects.bulk_create([
+            Notification(user=rng.choice(users), notification_type='message', title='New message',
+                         message='hello', is_read=rng.random() < 0.8)
+            for _ in range(cls.ROWS)
+        ])
+        Payment.objects.bulk_create([
+            Payment(job_application=rng.choice(applications), payment_type='initial',
+                    razorpay_order_id=f'order_{index}', amount=500, status='completed')
+            for index in range(cls.ROWS)
+        ])
+        Complaint.objects.bulk_create([
+            Complaint(user=rng.choice(users), description='Late delivery') for _ in range(cls.ROWS)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_query_shapes_use_their_indexes(self):
+        for shape in QUERY_SHAPES:
+            with self.subTest(shape['name']):
+                plan = shape['queryset']().explain()
+                self.assertIn(shape['index'], plan, f"{shape['name']} ({shape['used_by']}) plan:\n{plan}")
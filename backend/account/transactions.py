@@ -0,0 +1,81 @@
+# account/transactions.py
+"""
+Transactions that are retried on serialization failures.
+
+The database runs at SERIALIZABLE (default_transaction_isolation in
+DATABASES['default']['OPTIONS']). Concurrent transactions updating the same
+row, such as an unread counter, a professional's rating aggregates or a
+payment rollup, cannot all commit there: PostgreSQL aborts the later ones
+with SQLSTATE 40001 (or 40P01 on a deadlock), and they must be run again
+from the start. run_in_transaction() does that for a function that holds
+the whole transaction.
+
+Transactions that only apply commutative F() increments, like the unread
+counters, can pass read_committed=True instead: at READ COMMITTED an UPDATE
+that finds its row changed by a concurrent commit re-applies itself to the
+new version, so hot rows don't have to be retried over and over.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF': 0.02,  # seconds; the n-th retry waits up to n times this
+}
+
+# serialization_failure, deadlock_detected
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+def get_retry_settings():
+    return {**DEFAULTS, **getattr(settings, 'TRANSACTION_RETRY', {})}
+
+
+def is_serialization_failure(error):
+    cause = error.__cause__
+    return getattr(cause, 'pgcode', None) in RETRYABLE_SQLSTATES
+
+
+@contextmanager
+def _atomic(read_committed):
+    with transaction.atomic():
+        if read_committed and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Has to be the transaction's first statement
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL READ COMMITTED')
+        yield
+
+
+def run_in_transaction(func, *args, read_committed=False, **kwargs):
+    """
+    Call `func` inside transaction.atomic() and return its result, running
+    it again in a fresh transaction when it fails with a serialization
+    failure, up to MAX_ATTEMPTS times. `func` must not have side effects
+    outside the database; use transaction.on_commit() for those. With
+    `read_committed` the transaction runs at READ COMMITTED.
+
+    Inside an enclosing atomic block the transaction belongs to the caller
+    and cannot be restarted here, so `func` runs once and a failure
+    propagates to whoever owns the outer transaction.
+    """
+    if connection.in_atomic_block:
+        with transaction.atomic():
+            return func(*args, **kwargs)
+
+    options = get_retry_settings()
+    for attempt in range(1, options['MAX_ATTEMPTS'] + 1):
+        try:
+            with _atomic(read_committed):
+                return func(*args, **kwargs)
+        except OperationalError as e:
+            if attempt == options['MAX_ATTEMPTS'] or not is_serialization_failure(e):
+                raise
+            logger.info(f"Serialization failure in {func.__qualname__}, retrying (attempt {attempt}): {str(e)}")
+            time.sleep(random.uniform(0, options['BACKOFF'] * attempt))
@@ -0,0 +1,292 @@
+# account/uploads.py
+"""
+Chunked, resumable uploads for chat attachments.
+
+A client opens an UploadSession with the file's name, type and size, PUTs
+each chunk with an X-Chunk-SHA256 header and finally completes the session.
+Chunks are streamed from the request into a staging file at their offset, so
+neither the whole file nor a whole chunk is held in memory, and a client that
+lost its connection asks for the session status and re-sends only the
+missing chunks. Completing moves the staging file into LocalFileStorage and
+creates the chat Message.
+
+With content-addressed storage (account.blobs) completing an upload whose
+verified content is already stored links the message to the existing blob
+and discards the staged copy. The client always sends every byte: whether a
+file is stored already is never revealed, and a claimed sha256 alone never
+grants access to stored content.
+"""
+import hashlib
+import logging
+import os
+import shutil
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import content_addressed, store_blob
+from .file_serving import message_file_url
+from .models import Message, UploadSession
+from .previews import schedule_variants
+from .transactions import run_in_transaction
+
+logger = logging.getLogger('django')
+
+ALLOWED_FILE_TYPES = {
+    'image': ['image/jpeg', 'image/png', 'image/gif'],
+    'document': ['application/pdf', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
+}
+
+DEFAULTS = {
+    'MAX_FILE_SIZE': 100 * 1024 * 1024,
+    'CHUNK_SIZE': 1024 * 1024,
+    'SESSION_TTL': 60 * 60 * 24,
+    'STAGING_DIR': os.path.join(settings.MEDIA_ROOT, 'uploads'),
+}
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    pass
+
+
+def get_upload_settings():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_UPLOADS', {})}
+
+
+def get_file_type(content_type):
+    """'image' or 'document' for an allowed content type, otherwise None."""
+    for file_type, content_types in ALLOWED_FILE_TYPES.items():
+        if content_type in content_types:
+            return file_type
+    return None
+
+
+def staging_path(session):
+    return os.path.join(get_upload_settings()['STAGING_DIR'], f'{session.id}.part')
+
+
+class StagedFile(File):
+    """Lets FileSystemStorage move the staging file into place instead of copying it."""
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def open_session(job, user, filename, content_type, size, sha256=None):
+    options = get_upload_settings()
+    file_type = get_file_type(content_type)
+    if file_type is None:
+        raise UploadError('Unsupported file type')
+    if size <= 0:
+        raise UploadError('File is empty')
+    if size > options['MAX_FILE_SIZE']:
+        raise UploadError(f"File size exceeds {options['MAX_FILE_SIZE'] // (1024 * 1024)}MB limit")
+
+    session = UploadSession.objects.create(
+        job=job,
+        user=user,
+        filename=os.path.basename(filename)[:255] or 'upload',
+        content_type=content_type,
+        file_type=file_type,
+        total_size=size,
+        chunk_size=options['CHUNK_SIZE'],
+        sha256=sha256.lower() if sha256 else None,
+    )
+    os.makedirs(options['STAGING_DIR'], exist_ok=True)
+    with open(staging_path(session), 'wb') as f:
+        f.truncate(size)
+    return session
+
+
+def write_chunk(session, index, stream, expected_sha256):
+    """
+    Stream chunk `index` from `stream` into the staging file and record it
+    once its SHA-256 matches. Re-sending a chunk simply overwrites it.
+    """
+    if session.status != 'active':
+        raise UploadError('Upload is already completed')
+    if not 0 <= index < session.total_chunks:
+        raise UploadError('Chunk index out of range')
+    if not expected_sha256:
+        raise UploadError('X-Chunk-SHA256 header is required')
+
+    length = session.chunk_length(index)
+    digest = hashlib.sha256()
+    remaining = length
+    with open(staging_path(session), 'r+b') as f:
+        f.seek(index * session.chunk_size)
+        while remaining > 0:
+            block = stream.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            f.write(block)
+            remaining -= len(block)
+        if remaining == 0 and stream.read(1):
+            raise UploadError(f'Chunk {index} is larger than {length} bytes')
+
+    if remaining:
+        raise UploadError(f'Chunk {index} is incomplete: expected {length} bytes')
+    if digest.hexdigest() != expected_sha256.lower():
+        raise UploadError(f'Checksum mismatch for chunk {index}')
+
+    with transaction.atomic():
+        # Concurrent chunk uploads must not overwrite each other's progress
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if index not in session.received_chunks:
+            session.received_chunks = sorted(session.received_chunks + [index])
+            session.save(update_fields=['received_chunks', 'updated_at'])
+    return session
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_message_file(file, filename, sha256=None):
+    """
+    Save `file` into the Message.file storage. Returns (stored name, StoredBlob),
+    the blob being None unless content-addressed storage is on.
+    """
+    if content_addressed():
+        blob = store_blob(file, filename, sha256)
+        return blob.name, blob
+    field = Message._meta.get_field('file')
+    name = field.generate_filename(None, filename)
+    return field.storage.save(name, file, max_length=field.max_length), None
+
+
+def create_file_message(request, conversation, stored_name, file_type, blob=None):
+    """Create the chat Message for an already stored file in a single INSERT."""
+    message = Message.objects.create(
+        conversation=conversation,
+        sender=request.user,
+        file=stored_name,
+        file_type=file_type,
+        blob=blob,
+        file_absolute_url=message_file_url(stored_name, request),
+        content=''
+    )
+    schedule_variants(message)
+    return message
+
+
+def broadcast_file_message(job_id, message):
+    async_to_sync(get_channel_layer().group_send)(
+        f'chat_{job_id}',
+        {
+            'type': 'chat_message',
+            'message': {
+                'id': message.id,
+                'sender': message.sender.id,
+                'sender_name': message.sender.name,
+                'sender_role': message.sender.role,
+                'content': message.content,
+                'file_url': message.file_absolute_url,
+                'file_type': message.file_type,
+                'created_at': message.created_at.isoformat(),
+                'is_read': False
+            }
+        }
+    )
+
+
+def complete_session(request, session, conversation):
+    """
+    Verify the upload, move it into place and create its Message.
+
+    The transaction is re-run on serialization failures. Storing the file
+    moves the staging file into storage, outside the transaction, so a run
+    that rolls back, and a failed upload, moves it back to the staging path.
+    That leaves no file in storage without a Message, and completing can be
+    tried again. A content-addressed blob that was new is copied back
+    instead, because a concurrent upload of the same bytes may already use
+    it; if nothing does, gc_message_blobs removes it after its grace period.
+    """
+    stored = []
+    path = staging_path(session)
+    try:
+        message, created = run_in_transaction(_complete_session, request, session.pk, conversation, path, stored)
+    except Exception:
+        _unstore(stored, path)
+        raise
+    if not created:
+        return message, False
+
+    # Left behind when the content was already stored
+    if os.path.exists(path):
+        os.remove(path)
+
+    logger.info(f"Completed chunked upload {session.id}: message_id={message.id}, size={session.total_size}")
+    return message, True
+
+
+def _complete_session(request, session_id, conversation, path, stored):
+    # Files stored by a run that rolled back go back to staging first
+    _unstore(stored, path)
+    session = UploadSession.objects.select_for_update().get(pk=session_id)
+    if session.status == 'completed':
+        return session.message, False
+
+    missing = session.missing_chunks()
+    if missing:
+        raise UploadError(f'Missing chunks: {missing[:20]}')
+
+    if not os.path.exists(path):
+        raise UploadError('The uploaded data is no longer available; start a new upload')
+    checksum = _file_sha256(path) if session.sha256 or content_addressed() else None
+    if session.sha256 and checksum != session.sha256:
+        raise UploadError('Checksum mismatch for the complete file')
+
+    # Deduplicated only now, by the hash of the bytes actually received
+    with open(path, 'rb') as f:
+        stored_name, blob = store_message_file(
+            StagedFile(f, name=session.filename), session.filename, sha256=checksum
+        )
+    stored.append((stored_name, blob))
+    message = create_file_message(request, conversation, stored_name, session.file_type, blob=blob)
+
+    session.status = 'completed'
+    session.message = message
+    session.save(update_fields=['status', 'message', 'updated_at'])
+    return message, True
+
+
+def _unstore(stored, path):
+    """Put the staged bytes that `stored` moved into storage back at `path`."""
+    storage = Message._meta.get_field('file').storage
+    while stored:
+        name, blob = stored.pop()
+        if os.path.exists(path):
+            # The staging file was never moved: a deduplicated blob, or a copy
+            if blob is None:
+                storage.delete(name)
+        elif blob is None:
+            shutil.move(storage.path(name), path)
+        else:
+            # The blob file may be shared by now; copy it and leave it to gc_message_blobs
+            shutil.copyfile(storage.path(name), path)
+        logger.info(f"Undid storing {name}; its upload transaction rolled back")
+
+
+def expired_sessions():
+    ttl = get_upload_settings()['SESSION_TTL']
+    return UploadSession.objects.filter(status='active', updated_at__lt=timezone.now() - timedelta(seconds=ttl))
+
+
+def discard_session(session):
+    try:
+        os.remove(staging_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
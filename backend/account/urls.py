@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import RegisterView, LoginView, LogoutView, VerifyOTPView, ForgotPasswordView, ResetPasswordView, AcceptJobApplicationView, JobDetailView, RequestVerificationView, ProfessionalJobApplicationsView, SubmitReviewView,  ConversationView, UnreadMessagesCountView, CreateMissingConversationsView, FileUploadView,FileRecoveryView
-from .views import CheckAuthView,  ProfessionalProfileView, JobCreateView, OpenJobsListView, ApplyToJobView, ClientProjectsView, JobApplicationsListView,  VerifyPaymentView, ClientPendingPaymentsView, ClientTransactionHistoryView,  ProfessionalTransactionHistoryView, UserConversationsView, CheckJobStatesView, WebSocketAuthTokenView
-from .views import PaymentTotalView,ResendOTPView,TokenRefreshView
+from .views import RegisterView, LoginView, LogoutView, VerifyOTPView, ForgotPasswordView, ResetPasswordView, AcceptJobApplicationView, JobDetailView, RequestVerificationView, ProfessionalJobApplicationsView, SubmitReviewView,  ConversationView, UnreadMessagesCountView, CreateMissingConversationsView, FileUploadView,FileRecoveryView, MessageHistoryView
+from .views import UploadSessionCreateView, UploadSessionView, UploadChunkView, UploadCompleteView
+from .views import CheckAuthView,  ProfessionalProfileView, JobCreateView, OpenJobsListView, SearchOpenJobsView, RecommendedJobsView, ApplyToJobView, ClientProjectsView, JobApplicationsListView,  VerifyPaymentView, ClientPendingPaymentsView, ClientTransactionHistoryView,  ProfessionalTransactionHistoryView, ClientSpendChartView, ProfessionalEarningsChartView, UserConversationsView, CheckJobStatesView, WebSocketAuthTokenView
+from .views import PaymentTotalView,ResendOTPView,TokenRefreshView, serve_message_file
 from account.views import (
     NotificationListView,
     NotificationCountView,
@@ -22,6 +23,8 @@ urlpatterns = [
     path('profile/', ProfessionalProfileView.as_view(), name='professional-profile'),
     path('jobs/', JobCreateView.as_view(), name='job-create'),
     path('open-jobs/', OpenJobsListView.as_view(), name='open-jobs-list'),
+    path('open-jobs/search/', SearchOpenJobsView.as_view(), name='open-jobs-search'),
+    path('jobs/for-you/', RecommendedJobsView.as_view(), name='recommended-jobs'),
     path('apply-to-job/', ApplyToJobView.as_view(), name='apply_to_job'),
     path('client-project/', ClientProjectsView.as_view(), name='client_projects'),
     path('job-applications/<int:job_id>/', JobApplicationsListView.as_view(), name='job_applications'),
@@ -34,13 +37,21 @@ urlpatterns = [
     path('submit-review/', SubmitReviewView.as_view(), name='submit-review'),
     path('client/transactions/', ClientTransactionHistoryView.as_view(), name='client-transactions'),
     path('professional/transactions/', ProfessionalTransactionHistoryView.as_view(), name='professional-transactions'),
+    path('client/spending/', ClientSpendChartView.as_view(), name='client-spending'),
+    path('professional/earnings/', ProfessionalEarningsChartView.as_view(), name='professional-earnings'),
     path('conversations/', UserConversationsView.as_view(), name='user_conversations'),
     path('conversations/job/<int:job_id>/', ConversationView.as_view(), name='conversation'),
+    path('conversations/job/<int:job_id>/messages/', MessageHistoryView.as_view(), name='message-history'),
     path('conversations/unread-count/', UnreadMessagesCountView.as_view(), name='unread_messages_count'),
     path('create-missing-conversations/', CreateMissingConversationsView.as_view(), name='create_missing_conversations'),
     path('check-job-states/', CheckJobStatesView.as_view(), name='check_job_states'),
     path('ws-auth-token/', WebSocketAuthTokenView.as_view(), name='ws-auth-token'),
     path('conversations/job/<int:job_id>/file/', FileUploadView.as_view(), name='file-upload'),
+    path('conversations/job/<int:job_id>/uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('conversations/job/<int:job_id>/uploads/<uuid:upload_id>/', UploadSessionView.as_view(), name='upload-session'),
+    path('conversations/job/<int:job_id>/uploads/<uuid:upload_id>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('conversations/job/<int:job_id>/uploads/<uuid:upload_id>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
+    path('media/message/<path:file_path>', serve_message_file, name='serve_message_file'),
     path('conversations/file-recovery/', FileRecoveryView.as_view(), name='file-recovery'),
     path('payments/total/', PaymentTotalView.as_view(), name='payment-total'),
     path('resend-otp/', ResendOTPView.as_view(), name='resend-otp'),
@@ -24,13 +24,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 import jwt
-from django.db.models import Sum
+from django.db.models import Sum, Prefetch, F
 from django.conf import settings
 import logging
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import AllowAny
-from .serializers import UserSerializer,JobSerializer,JobApplicationSerializer
-from django.core.mail import send_mail
+from .serializers import UserSerializer,JobSerializer,JobApplicationSerializer,JobMatchSerializer
+from .emails import queue_email
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 import razorpay
@@ -45,7 +45,7 @@ from django.shortcuts import get_object_or_404
 from .models import Complaint
 
 from django.db.models import Q
-from .models import Conversation, Message
+from .models import Conversation, Message, UploadSession
 from .serializers import ConversationSerializer, MessageSerializer
 # Add this to account/views.py
 from django.contrib.auth import get_user_model
@@ -55,6 +55,27 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from .models import Notification
 from .serializers import NotificationSerializer
+from .pagination import KeysetPaginator, MessageHistoryPaginator, InvalidCursor
+from .filters import filter_open_jobs, InvalidFilter
+from .search import asearch_open_jobs, clean_search_text, parse_page, InvalidSearch
+from .counters import aget_unread_counts, record_messages_read, record_notifications_read
+from .async_views import AsyncAPIView
+from .authentication import CustomJWTAuthentication
+from .access import is_job_participant, invalidate_job_participants
+from .payments import get_gateway, get_or_create_order, to_paisa
+from .notifications import notify_user
+from .ratings import record_rating
+from .transactions import run_in_transaction
+from .rollups import daily_series, parse_date_range, payment_totals, record_payment_completed, InvalidRange
+from admin_app.stats import get_dashboard_stats
+from .job_events import job_state_snapshot, publish_job_states
+from .cloud_uploads import discard_staged, stage_document, staged_uploads_enabled
+from django.core.files.uploadedfile import UploadedFile
+from .uploads import (
+    UploadError, broadcast_file_message, complete_session, create_file_message,
+    get_file_type, open_session, store_message_file, write_chunk
+)
+from django.db import transaction
 # accounts/views.py
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.http import JsonResponse
@@ -115,21 +136,20 @@ class TokenRefreshView(APIView):
             logger.error(f'Token refresh error: {str(e)}')
             return Response({'error': 'Token refresh failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
-    serializer_class = NotificationSerializer
     
-    def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user)
+    async def get(self, request):
+        notifications = [
+            notification async for notification in Notification.objects.filter(user=request.user)
+        ]
+        return Response(NotificationSerializer(notifications, many=True).data)
 
-class NotificationCountView(APIView):
+class NotificationCountView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request):
-        unread_count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
+    async def get(self, request):
+        unread_count = (await aget_unread_counts(request.user))['notifications']
         
         return Response({"unread_count": unread_count})
 
@@ -142,8 +162,11 @@ class MarkNotificationReadView(APIView):
         if notification_id:
             try:
                 notification = Notification.objects.get(id=notification_id, user=request.user)
-                notification.is_read = True
-                notification.save()
+                if not notification.is_read:
+                    with transaction.atomic():
+                        notification.is_read = True
+                        notification.save(update_fields=['is_read'])
+                        record_notifications_read(request.user.id, 1)
                 return Response({"success": True}, status=status.HTTP_200_OK)
             except Notification.DoesNotExist:
                 return Response(
@@ -160,16 +183,17 @@ class MarkAllNotificationsReadView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        with transaction.atomic():
+            marked = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+            record_notifications_read(request.user.id, marked)
         return Response({"success": True}, status=status.HTTP_200_OK)
 
 
 class PaymentTotalView(APIView):
     permission_classes = [IsAdminUser]
     def get(self, request):
-        total_payments = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
         return Response({
-            'total_payments': total_payments
+            'total_payments': get_dashboard_stats()['total_payments']
         }, status=status.HTTP_200_OK)
 logger = logging.getLogger('django')
 CustomUser = get_user_model()
@@ -210,30 +234,20 @@ class FileUploadView(APIView):
     def post(self, request, job_id):
         try:
             logger.info(f"FileUploadView accessed: job_id={job_id}, user={request.user.email}")
-            logger.info(f"Request FILES: {request.FILES}")
             
             file = request.FILES.get('file')
             if not file:
                 logger.error("No file provided in request")
                 return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-            max_size = 5 * 1024 * 1024  # 5MB
+            max_size = 5 * 1024 * 1024  # 5MB; larger files go through the chunked upload endpoints
             if file.size > max_size:
                 logger.error(f"File size exceeds limit: {file.size} bytes")
                 return Response({'error': 'File size exceeds 5MB limit'}, status=status.HTTP_400_BAD_REQUEST)
 
-            allowed_types = {
-                'image': ['image/jpeg', 'image/png', 'image/gif'],
-                'document': ['application/pdf', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
-            }
-            
             logger.info(f"File content type: {file.content_type}")
-            file_type = None
-            if file.content_type in allowed_types['image']:
-                file_type = 'image'
-            elif file.content_type in allowed_types['document']:
-                file_type = 'document'
-            else:
+            file_type = get_file_type(file.content_type)
+            if file_type is None:
                 logger.error(f"Unsupported file type: {file.content_type}")
                 return Response({'error': 'Unsupported file type'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -245,61 +259,20 @@ class FileUploadView(APIView):
                 logger.error(f"Job not found: job_id={job_id}")
                 return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            if request.user != job.client_id:
-                application = JobApplication.objects.filter(
-                    job_id=job,
-                    professional_id=request.user,
-                    status='Accepted'
-                ).first()
-                if not application:
+            if not is_job_participant(request.user, job.job_id):
                     logger.error(f"Unauthorized file upload: user={request.user.email}, job_id={job_id}")
                     return Response(
                         {'error': 'You are not authorized to send files in this conversation'},
                         status=status.HTTP_403_FORBIDDEN
                     )
 
-            # Create the message with the file
-            message = Message.objects.create(
-                conversation=conversation,
-                sender=request.user,
-                file=file,
-                file_type=file_type,
-                content=''
-            )
+            # Store the file first so the message is written once, with its absolute URL
+            stored_name, blob = store_message_file(file, file.name)
+            message = create_file_message(request, conversation, stored_name, file_type, blob=blob)
             logger.info(f"Created message with file: message_id={message.id}, file_type={file_type}")
-            
-            # Set the absolute URL for the local file
-            if message.file:
-                file_url = f'/media/message/{message.file.name}'
-                message.file_absolute_url = request.build_absolute_uri(file_url)
-                message.save(update_fields=['file_absolute_url'])
-                logger.info(f"Set file absolute URL: {message.file_absolute_url}")
 
             # Send WebSocket notification
-            from channels.layers import get_channel_layer
-            from asgiref.sync import async_to_sync
-            channel_layer = get_channel_layer()
-            room_group_name = f'chat_{job_id}'
-            
-            message_data = {
-                'id': message.id,
-                'sender': message.sender.id,
-                'sender_name': message.sender.name,
-                'sender_role': message.sender.role,
-                'content': message.content,
-                'file_url': message.file_absolute_url,
-                'file_type': message.file_type,
-                'created_at': message.created_at.isoformat(),
-                'is_read': False
-            }
-            
-            async_to_sync(channel_layer.group_send)(
-                room_group_name,
-                {
-                    'type': 'chat_message',
-                    'message': message_data
-                }
-            )
+            broadcast_file_message(job_id, message)
             
             serializer = MessageSerializer(message, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -307,6 +280,118 @@ class FileUploadView(APIView):
         except Exception as e:
             logger.error(f"File upload error: {str(e)}")
             return Response({'error': f"Failed to upload file: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _upload_participant_job(request, job_id):
+    """Return (job, error_response) for the chunked upload views."""
+    try:
+        job = Job.objects.get(job_id=job_id)
+    except Job.DoesNotExist:
+        return None, Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_job_participant(request.user, job.job_id):
+        return None, Response(
+            {'error': 'You are not authorized to send files in this conversation'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return job, None
+
+
+def _upload_session_data(session):
+    return {
+        'upload_id': str(session.id),
+        'status': session.status,
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'received_chunks': session.received_chunks,
+        'missing_chunks': session.missing_chunks(),
+    }
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Start a chunked upload: POST {filename, content_type, size, sha256?}.
+    Then PUT every chunk and POST .../complete/.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, job_id):
+        job, error = _upload_participant_job(request, job_id)
+        if error:
+            return error
+
+        filename = request.data.get('filename')
+        content_type = request.data.get('content_type')
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({'error': 'size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not filename or not content_type:
+            return Response({'error': 'filename and content_type are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = open_session(job, request.user, filename, content_type, size, request.data.get('sha256'))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Started chunked upload {session.id}: job_id={job_id}, size={size}")
+        return Response(_upload_session_data(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """GET the progress of an upload so an interrupted client can resume it."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id, upload_id):
+        session = get_object_or_404(UploadSession, id=upload_id, job_id=job_id, user=request.user)
+        return Response(_upload_session_data(session), status=status.HTTP_200_OK)
+
+
+class UploadChunkView(APIView):
+    """PUT the raw bytes of one chunk, with its SHA-256 in X-Chunk-SHA256."""
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, job_id, upload_id, index):
+        session = get_object_or_404(UploadSession, id=upload_id, job_id=job_id, user=request.user)
+        # A user removed from the job must not keep writing to the staging disk
+        job, error = _upload_participant_job(request, job_id)
+        if error:
+            return error
+        try:
+            # Read from the underlying HttpRequest so the body is streamed, not parsed
+            session = write_chunk(session, index, request._request, request.headers.get('X-Chunk-SHA256'))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'index': index,
+            'received_chunks': len(session.received_chunks),
+            'total_chunks': session.total_chunks,
+        }, status=status.HTTP_200_OK)
+
+
+class UploadCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, job_id, upload_id):
+        session = get_object_or_404(UploadSession, id=upload_id, job_id=job_id, user=request.user)
+        job, error = _upload_participant_job(request, job_id)
+        if error:
+            return error
+
+        conversation, created = Conversation.objects.get_or_create(job=job)
+        try:
+            message, created = complete_session(request, session, conversation)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if created:
+            broadcast_file_message(job_id, message)
+        serializer = MessageSerializer(message, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
 class FileRecoveryView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -319,22 +404,17 @@ class FileRecoveryView(APIView):
             # Check permissions
             conversation = message.conversation
             job = conversation.job
-            if not (request.user == job.client_id or JobApplication.objects.filter(
-                job_id=job, professional_id=request.user, status='Accepted'
-            ).exists()):
+            if not is_job_participant(request.user, job.job_id):
                 return Response({'error': 'Not authorized'}, status=403)
             
-            # If the file exists but URL is missing
-            if message.file and not message.file_absolute_url:
-                file_url = request.build_absolute_uri(message.file.url)
-                message.file_absolute_url = file_url
-                message.save(update_fields=['file_absolute_url'])
+            # If the file exists, its URL is rebuilt (older rows stored a static /media/ URL)
+            if message.file:
+                file_url = message_file_url(message.file.name, request)
+                if message.file_absolute_url != file_url:
+                    message.file_absolute_url = file_url
+                    message.save(update_fields=['file_absolute_url'])
                 return Response({'success': True, 'new_url': file_url})
                 
-            # If file exists and URL is present
-            elif message.file and message.file_absolute_url:
-                return Response({'success': True, 'new_url': message.file_absolute_url})
-                
             # File is missing
             else:
                 return Response({'error': 'File not found'}, status=404)
@@ -365,33 +445,70 @@ class ConversationView(APIView):
         try:
             job = Job.objects.get(job_id=job_id)
             
-            if request.user != job.client_id:
-                application = JobApplication.objects.filter(
-                    job_id=job,
-                    professional_id=request.user,
-                    status='Accepted'
-                ).first()
-                
-                if not application:
-                    return Response(
-                        {'error': 'You are not authorized to access this conversation'},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
+            if not is_job_participant(request.user, job.job_id):
+                return Response(
+                    {'error': 'You are not authorized to access this conversation'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
             
             conversation, created = Conversation.objects.get_or_create(job=job)
             
-            Message.objects.filter(
-                conversation=conversation,
-                is_read=False
-            ).exclude(sender=request.user).update(is_read=True)
+            with transaction.atomic():
+                marked = Message.objects.filter(
+                    conversation=conversation,
+                    is_read=False
+                ).exclude(sender=request.user).update(is_read=True)
+                record_messages_read(request.user.id, marked)
             
-            serializer = ConversationSerializer(conversation)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-            serializer = MessageSerializer(messages, many=True, context={'request': request})
-            return Response(serializer.data)  
+            # Only the latest page is returned; older messages are fetched
+            # through MessageHistoryView with the `before` cursor.
+            paginator = MessageHistoryPaginator()
+            messages, next_before, next_after = paginator.paginate_queryset(
+                Message.objects.filter(conversation=conversation).select_related('sender'),
+                {}
+            )
+            conversation.latest_messages = messages
+            
+            serializer = ConversationSerializer(conversation, context={'request': request})
+            return Response({
+                **serializer.data,
+                'next_before': next_before,
+                'next_after': next_after
+            }, status=status.HTTP_200_OK)
         except Job.DoesNotExist:
             return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class MessageHistoryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        try:
+            job = Job.objects.get(job_id=job_id)
+        except Job.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if not is_job_participant(request.user, job.job_id):
+            return Response(
+                {'error': 'You are not authorized to access this conversation'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        paginator = MessageHistoryPaginator()
+        try:
+            messages, next_before, next_after = paginator.paginate_queryset(
+                Message.objects.filter(conversation__job=job).select_related('sender'),
+                request.query_params
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = MessageSerializer(messages, many=True, context={'request': request})
+        return Response({
+            'messages': serializer.data,
+            'next_before': next_before,
+            'next_after': next_after
+        }, status=status.HTTP_200_OK)
+
 class UserConversationsView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -412,6 +529,16 @@ class UserConversationsView(APIView):
             )
             conversations = Conversation.objects.filter(job__in=jobs)
         
+        # The conversation list only shows a preview, so fetch just the
+        # latest message of each conversation.
+        conversations = conversations.select_related('job').prefetch_related(
+            Prefetch(
+                'messages',
+                queryset=Message.objects.select_related('sender').order_by('-id')[:1],
+                to_attr='latest_messages'
+            )
+        )
+        
         debug_info = {
             'user_id': user.id,
             'user_email': user.email,
@@ -421,65 +548,33 @@ class UserConversationsView(APIView):
             'job_ids': [job.job_id for job in jobs]
         }
         
-        serializer = ConversationSerializer(conversations, many=True)
+        serializer = ConversationSerializer(conversations, many=True, context={'request': request})
         
         return Response({
             'conversations': serializer.data,
             'debug_info': debug_info
         }, status=status.HTTP_200_OK)
 
-class UnreadMessagesCountView(APIView):
+class UnreadMessagesCountView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request):
-        user = request.user
-        
-        if user.role == 'client':
-            jobs = Job.objects.filter(client_id=user)
-            conversations = Conversation.objects.filter(job__in=jobs)
-        else:
-           
-            jobs = Job.objects.filter(professional_id=user)
-            conversations = Conversation.objects.filter(job__in=jobs)
-        
-        unread_count = Message.objects.filter(
-            conversation__in=conversations,
-            is_read=False
-        ).exclude(sender=user).count()
+    async def get(self, request):
+        unread_count = (await aget_unread_counts(request.user))['messages']
         
         return Response({'unread_count': unread_count}, status=status.HTTP_200_OK)
 
 class CheckJobStatesView(APIView):
+    """
+    Full job-state snapshot for resyncing; live changes arrive as job_state
+    events on the notifications socket (see account.job_events).
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         user = request.user
         
-        if user.role == 'client':
-            jobs = Job.objects.filter(client_id=user)
-        else:
-            applications = JobApplication.objects.filter(professional_id=user)
-            jobs = Job.objects.filter(job_id__in=applications.values('job_id'))
-        
-        job_states = []
-        for job in jobs:
-            applications = JobApplication.objects.filter(job_id=job)
-            job_states.append({
-                'job_id': job.job_id,
-                'title': job.title,
-                'status': job.status,
-                'applications': [
-                    {
-                        'application_id': app.application_id,
-                        'professional_id': app.professional_id.id,
-                        'professional_email': app.professional_id.email,
-                        'status': app.status
-                    } for app in applications
-                ]
-            })
-        
         return Response({
-            'job_states': job_states,
+            'job_states': job_state_snapshot(user),
             'user_role': user.role
         }, status=status.HTTP_200_OK)
 
@@ -527,6 +622,8 @@ class RequestVerificationView(APIView):
             profile = ProfessionalProfile.objects.get(user=request.user)
             
             # Check if document exists and is accessible
+            if not profile.verify_doc and profile.verify_doc_upload_status == 'pending':
+                return Response({'error': 'Your verification document is still uploading. Please try again shortly.'}, status=status.HTTP_400_BAD_REQUEST)
             if not profile.verify_doc:
                 return Response({'error': 'Please upload a verification document first'}, status=status.HTTP_400_BAD_REQUEST)
             
@@ -551,18 +648,22 @@ class RequestVerificationView(APIView):
             return Response({'message': 'Verification request sent to admin'}, status=status.HTTP_200_OK)
         except ProfessionalProfile.DoesNotExist:
             return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
-class ClientProjectsView(APIView):
+class ClientProjectsView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         user = request.user
         if user.role != 'client':
             return Response({'error': 'Only clients can view their projects'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Categorize jobs by status
-        pending_jobs = Job.objects.filter(client_id=user, status='Open')
-        active_jobs = Job.objects.filter(client_id=user, status='Assigned')
-        completed_jobs = Job.objects.filter(client_id=user, status='Completed')
+        # Categorize jobs by status, fetched in one query
+        jobs_by_status = {'Open': [], 'Assigned': [], 'Completed': []}
+        client_jobs = Job.objects.with_list_data().filter(client_id=user, status__in=list(jobs_by_status))
+        async for job in client_jobs:
+            jobs_by_status[job.status].append(job)
+        pending_jobs = jobs_by_status['Open']
+        active_jobs = jobs_by_status['Assigned']
+        completed_jobs = jobs_by_status['Completed']
 
         # Serialize each category
         pending_serializer = JobSerializer(pending_jobs, many=True)
@@ -575,22 +676,18 @@ class ClientProjectsView(APIView):
             'completed': completed_serializer.data
         }, status=status.HTTP_200_OK)
 
-class CheckAuthView(APIView):
+class CheckAuthView(AsyncAPIView):
     permission_classes = [AllowAny]
+    authentication_classes = []  # Only the access_token cookie counts here
     
-    def get(self, request):
+    async def get(self, request):
         try:
             access_token = request.COOKIES.get('access_token')
             if not access_token:
                 return Response({'isAuthenticated': False})
             
-            from rest_framework_simplejwt.tokens import AccessToken
             token = AccessToken(access_token)
-            user_id = token.get('user_id')
-            
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            user = User.objects.get(id=user_id)
+            user = await CustomJWTAuthentication().aget_user(token)
             
             return Response({
                 'isAuthenticated': True,
@@ -825,8 +922,10 @@ class ProfessionalProfileView(APIView):
             return Response({'error': 'Profile already exists'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Test Cloudinary configuration before processing if file is uploaded
-            if 'verify_doc' in request.FILES:
+            # Test Cloudinary configuration before processing if file is uploaded.
+            # Staged uploads reach Cloudinary from the worker instead.
+            staged = staged_uploads_enabled()
+            if 'verify_doc' in request.FILES and not staged:
                 try:
                     import cloudinary.api
                     cloudinary.api.ping()
@@ -841,7 +940,10 @@ class ProfessionalProfileView(APIView):
             # Create profile with serializer
             serializer = ProfessionalProfileSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
+                document = serializer.validated_data.pop('verify_doc', None) if staged else None
                 profile = serializer.save(user=user)
+                if document:
+                    stage_document(profile, 'profile_verify_doc', document)
                 
                 logger.info(f"Profile created successfully for user {user.id}")
                 if profile.verify_doc:
@@ -878,8 +980,10 @@ class ProfessionalProfileView(APIView):
         try:
             profile = ProfessionalProfile.objects.get(user=user)
             
-            # Test Cloudinary configuration before processing if file is uploaded
-            if 'verify_doc' in request.FILES:
+            # Test Cloudinary configuration before processing if file is uploaded.
+            # Staged uploads reach Cloudinary from the worker instead.
+            staged = staged_uploads_enabled()
+            if 'verify_doc' in request.FILES and not staged:
                 try:
                     import cloudinary.api
                     cloudinary.api.ping()
@@ -893,7 +997,10 @@ class ProfessionalProfileView(APIView):
             
             serializer = ProfessionalProfileSerializer(profile, data=request.data, partial=True, context={'request': request})
             if serializer.is_valid():
+                document = serializer.validated_data.pop('verify_doc', None) if staged else None
                 updated_profile = serializer.save()
+                if document:
+                    stage_document(updated_profile, 'profile_verify_doc', document)
                 
                 logger.info(f"Profile updated successfully for user {user.id}")
                 if updated_profile.verify_doc:
@@ -964,7 +1071,11 @@ class JobCreateView(APIView):
 
             serializer = JobSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
+                staged = staged_uploads_enabled()
+                document = serializer.validated_data.pop('document', None) if staged else None
                 job = serializer.save(client_id=request.user)
+                if document:
+                    stage_document(job, 'job_document', document)
                 
                 # Log successful creation
                 logger.info(f"Job created successfully with ID: {job.job_id}")
@@ -985,10 +1096,10 @@ class JobCreateView(APIView):
                 {'error': 'An unexpected error occurred while creating the job'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-class OpenJobsListView(APIView):
+class OpenJobsListView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         # Ensure only clients can access this view
         if request.user.role == 'client':
             return Response(
@@ -996,10 +1107,82 @@ class OpenJobsListView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-       
-        open_jobs = Job.objects.filter(status='Open')
-        serializer = JobSerializer(open_jobs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPaginator(pk_field='job_id')
+        try:
+            open_jobs = filter_open_jobs(Job.objects.with_list_data().filter(status='Open'), request.query_params)
+            jobs, next_cursor = await paginator.apaginate_queryset(open_jobs, request.query_params)
+        except (InvalidFilter, InvalidCursor) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = JobSerializer(jobs, many=True)
+        return Response({
+            'results': serializer.data,
+            'next_cursor': next_cursor,
+            'page_size': paginator.page_size
+        }, status=status.HTTP_200_OK)
+
+class SearchOpenJobsView(AsyncAPIView):
+    """
+    Ranked search over open jobs: ?q=<text>, optionally with the open-jobs
+    filters. Results are ordered by relevance and paged with `page`;
+    `mode` tells whether they came from the full-text index or the trigram
+    fallback and is passed back when fetching the next page.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        if request.user.role == 'client':
+            return Response(
+                {'error': 'Only Professional  can view open jobs'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        paginator = KeysetPaginator(pk_field='job_id')
+        filters = request.query_params.copy()
+        filters.pop('q', None)
+        try:
+            text = clean_search_text(request.query_params.get('q'))
+            page_size = paginator.get_page_size(request.query_params)
+            page = parse_page(request.query_params.get('page'))
+            open_jobs = filter_open_jobs(Job.objects.with_list_data().filter(status='Open'), filters)
+            jobs, mode, has_more = await asearch_open_jobs(
+                open_jobs, text, page_size, offset=(page - 1) * page_size,
+                mode=request.query_params.get('mode') or None
+            )
+        except (InvalidSearch, InvalidFilter, InvalidCursor) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = JobSerializer(jobs, many=True)
+        return Response({
+            'results': serializer.data,
+            'mode': mode,
+            'page': page,
+            'next_page': page + 1 if has_more else None,
+            'page_size': page_size
+        }, status=status.HTTP_200_OK)
+
+class RecommendedJobsView(AsyncAPIView):
+    """
+    "Jobs for you": the professional's stored top matches (see
+    account.matching) that are still open, best first.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        if request.user.role != 'professional':
+            return Response(
+                {'error': 'Only professionals have job recommendations'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        jobs = (
+            Job.objects.with_list_data()
+            .filter(matches__professional=request.user, status='Open')
+            .annotate(match_score=F('matches__score'), matched_skills=F('matches__matched_skills'))
+            .order_by('matches__rank')
+        )
+        serializer = JobMatchSerializer([job async for job in jobs], many=True)
+        return Response({'results': serializer.data}, status=status.HTTP_200_OK)
 
 class ApplyToJobView(generics.CreateAPIView):
     queryset = JobApplication.objects.all()
@@ -1009,6 +1192,7 @@ class ApplyToJobView(generics.CreateAPIView):
     def perform_create(self, serializer):
         # Save the application
         application = serializer.save(professional_id=self.request.user)
+        publish_job_states([application.job_id_id])
         
         # Get job and client details
         job = application.job_id
@@ -1036,47 +1220,27 @@ class ApplyToJobView(generics.CreateAPIView):
             }
         }
         
+        # Persistent notification plus real-time push to the client's notification group
         try:
-            # Create persistent notification
-            Notification.objects.create(
-                user=client,
+            notify_user(
+                client,
                 notification_type='job_application',
                 title=f'New application for {job.title}',
                 message=f'{self.request.user.name} has applied for your job: {job.title}',
-                data=notification_data
-            )
-        except Exception as e:
-            print(f"Failed to create notification record: {str(e)}")
-        
-        # Send real-time notification via WebSocket
-        channel_layer = get_channel_layer()
-        
-        # Prepare notification data
-        ws_notification_data = {
-            'type': 'job_application',
-            'job_id': job.job_id,
-            'job_title': job.title,
-            'professional_id': self.request.user.id,
-            'professional_name': self.request.user.name,
-            'professional_email': self.request.user.email,
-            'application_id': application.application_id,
-            'timestamp': timezone.now().isoformat(),
-            'notification_id': str(application.application_id),
-            'profile_data': notification_data['profile_data']
-        }
-        
-        # Send notification to client's notification group
-        try:
-            async_to_sync(channel_layer.group_send)(
-                f'notifications_{client.id}',
-                {
-                    'type': 'send_notification',
-                    'content': ws_notification_data
+                data=notification_data,
+                payload={
+                    'type': 'job_application',
+                    'job_id': job.job_id,
+                    'job_title': job.title,
+                    'professional_id': self.request.user.id,
+                    'professional_name': self.request.user.name,
+                    'professional_email': self.request.user.email,
+                    'application_id': application.application_id,
+                    'profile_data': notification_data['profile_data']
                 }
             )
-            print(f"Sent WebSocket notification to client {client.id} about new application {application.application_id}")
         except Exception as e:
-            print(f"Failed to send WebSocket notification: {str(e)}")
+            logger.error(f"Failed to create notification: {str(e)}")
 
 # Update your JobDetailView in views.py to support file uploads for editing
 
@@ -1140,7 +1304,16 @@ class JobDetailView(APIView):
                 serializer = JobSerializer(job, data=request.data, partial=True, context={'request': request})
             
             if serializer.is_valid():
+                if 'document' in serializer.validated_data:
+                    # A new document or its removal replaces any still waiting to upload
+                    discard_staged('job_document', job.job_id)
+                    job.document_upload_status = ''
+                document = None
+                if staged_uploads_enabled() and isinstance(serializer.validated_data.get('document'), UploadedFile):
+                    document = serializer.validated_data.pop('document')
                 updated_job = serializer.save()
+                if document:
+                    stage_document(updated_job, 'job_document', document)
                 
                 # Log successful update
                 logger.info(f"Job {job_id} updated successfully")
@@ -1204,12 +1377,12 @@ class JobApplicationsListView(APIView):
     def get(self, request, job_id):
         try:
             job = Job.objects.get(job_id=job_id)
-            if request.user != job.client_id:
+            if job.client_id_id != request.user.id:
                 return Response(
                     {'error': 'You are not authorized to view applications for this job'},
                     status=status.HTTP_403_FORBIDDEN
                 )
-            applications = JobApplication.objects.filter(job_id=job)
+            applications = JobApplication.objects.with_list_data().filter(job_id=job)
             serializer = JobApplicationSerializer(applications, many=True)
             print('Serialized Applications:', serializer.data)  # Debug
             return Response({
@@ -1260,41 +1433,24 @@ class AcceptJobApplicationView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Initialize Razorpay client
-            client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-
             # Determine initial payment amount (advance_payment or 50% of budget)
             if job.advance_payment is not None:
                 amount = job.advance_payment
             else:
-                amount = job.budget * 0.5  # Default to 50% of budget
-            amount_in_paisa = int(amount * 100)  # Convert to paisa
+                amount = job.budget * Decimal('0.5')  # Default to 50% of budget
 
-            # Create Razorpay order
-            order_data = {
-                'amount': amount_in_paisa,
-                'currency': 'INR',
-                'receipt': f'job_{job.job_id}_app_{application_id}_initial',
-                'payment_capture': 1  # Auto-capture payment
-            }
-            razorpay_order = client.order.create(data=order_data)
-
-            # Create Payment record
-            payment = Payment.objects.create(
-                job_application=application,
-                payment_type='initial',
-                razorpay_order_id=razorpay_order['id'],
-                amount=amount,
-                status='created'
-            )
+            # Create (or reuse) the Razorpay order and Payment record
+            payment, created = get_or_create_order(application, 'initial', amount)
+            amount_in_paisa = to_paisa(payment.amount)
             conversation, created = Conversation.objects.get_or_create(job=job)
+            invalidate_job_participants(job.job_id)
             # Return order details for frontend
             return Response({
                 'message': 'Proceed to initial payment',
-                'order_id': razorpay_order['id'],
+                'order_id': payment.razorpay_order_id,
                 'amount': amount_in_paisa,
                 'currency': 'INR',
-                'key': settings.RAZORPAY_KEY_ID,
+                'key': get_gateway().key_id,
                 'name': 'Your Company Name',
                 'description': f'Initial Payment for Job: {job.title}',
                 'application_id': application_id,
@@ -1318,7 +1474,6 @@ from .serializers import JobApplicationSerializer
 
 # views.py - Enhanced Professional Job Applications View
 
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from .models import Notification
@@ -1333,7 +1488,7 @@ class ProfessionalJobApplicationsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        applications = JobApplication.objects.filter(professional_id=request.user)
+        applications = JobApplication.objects.with_list_data().filter(professional_id=request.user)
         serializer = JobApplicationSerializer(applications, many=True, context={'request': request})
         return Response({
             'applications': serializer.data
@@ -1343,8 +1498,8 @@ class ProfessionalJobApplicationsView(APIView):
         """Send notification and email when project is completed"""
         try:
             # Create notification for client
-            Notification.objects.create(
-                user=client,
+            notify_user(
+                client,
                 notification_type='job_status',
                 title='Project Completed! 🎉',
                 message=f'Your project "{job.title}" has been marked as completed by {professional.name}.',
@@ -1462,14 +1617,13 @@ class ProfessionalJobApplicationsView(APIView):
             The Team
             """
             
-            # Send email
-            send_mail(
+            # Queue email
+            queue_email(
                 subject=subject,
                 message=plain_message,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[client.email],
                 html_message=html_message,
-                fail_silently=False
             )
             
             print(f"✅ Completion notification and email sent to {client.email}")
@@ -1538,45 +1692,20 @@ class ProfessionalJobApplicationsView(APIView):
                         status=status.HTTP_200_OK
                     )
 
-                # Initialize Razorpay client
-                client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-
-                # Convert to paisa with proper rounding
-                amount_in_paisa = int(remaining_amount * 100)
-                
-                # Debug logging
-                print(f"Debug: amount_in_paisa={amount_in_paisa}")
-
-                # Create Razorpay order for remaining payment
-                order_data = {
-                    'amount': amount_in_paisa,
-                    'currency': 'INR',
-                    'receipt': f'job_{job.job_id}_app_{application_id}_remaining',
-                    'payment_capture': 1
-                }
-                razorpay_order = client.order.create(data=order_data)
-
-                # Create Payment record
-                payment = Payment.objects.create(
-                    job_application=application,
-                    payment_type='remaining',
-                    razorpay_order_id=razorpay_order['id'],
-                    amount=remaining_amount,
-                    status='created'
-                )
+                # Create (or reuse) the Razorpay order for the remaining payment
+                payment, created = get_or_create_order(application, 'remaining', remaining_amount)
 
                 # Create PaymentRequest for client
-                payment_request = PaymentRequest.objects.create(
+                payment_request, request_created = PaymentRequest.objects.get_or_create(
                     payment=payment,
-                    client=job.client_id,
-                    status='pending'
+                    defaults={'client': job.client_id, 'status': 'pending'}
                 )
 
                 # 📧 Send payment request notification and email to client
                 try:
                     # Create notification for payment request
-                    Notification.objects.create(
-                        user=job.client_id,
+                    notify_user(
+                        job.client_id,
                         notification_type='payment',
                         title='Payment Request - Project Completion',
                         message=f'{request.user.name} has completed your project "{job.title}" and is requesting the remaining payment of ₹{remaining_amount}.',
@@ -1606,12 +1735,11 @@ class ProfessionalJobApplicationsView(APIView):
                     Thank you!
                     """
                     
-                    send_mail(
+                    queue_email(
                         subject=payment_subject,
                         message=payment_message,
                         from_email=settings.DEFAULT_FROM_EMAIL,
                         recipient_list=[job.client_id.email],
-                        fail_silently=True
                     )
                     
                 except Exception as e:
@@ -1639,11 +1767,12 @@ class ProfessionalJobApplicationsView(APIView):
                 job.status = 'Open'
                 application.save()
                 job.save()
+                invalidate_job_participants(job.job_id)
                 
                 # 📧 Send cancellation notification to client
                 try:
-                    Notification.objects.create(
-                        user=job.client_id,
+                    notify_user(
+                        job.client_id,
                         notification_type='job_status',
                         title='Project Cancelled',
                         message=f'{request.user.name} has cancelled your project "{job.title}". The project is now open for new applications.',
@@ -1671,12 +1800,11 @@ class ProfessionalJobApplicationsView(APIView):
                     The Team
                     """
                     
-                    send_mail(
+                    queue_email(
                         subject=cancellation_subject,
                         message=cancellation_message,
                         from_email=settings.DEFAULT_FROM_EMAIL,
                         recipient_list=[job.client_id.email],
-                        fail_silently=True
                     )
                     
                 except Exception as e:
@@ -1712,15 +1840,11 @@ class VerifyPaymentView(APIView):
 
             if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature, application_id, payment_type]):
                 return Response({'error': 'Missing payment details'}, status=status.HTTP_400_BAD_REQUEST)
+            if payment_type not in ('initial', 'remaining'):
+                return Response({'error': 'Invalid payment type'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Verify payment signature
-            client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-            params_dict = {
-                'razorpay_order_id': razorpay_order_id,
-                'razorpay_payment_id': razorpay_payment_id,
-                'razorpay_signature': razorpay_signature
-            }
-            client.utility.verify_payment_signature(params_dict)
+            get_gateway().verify_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature)
 
             # Get payment and application
             payment = get_object_or_404(Payment, razorpay_order_id=razorpay_order_id)
@@ -1734,39 +1858,24 @@ class VerifyPaymentView(APIView):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-            # Check if payment is already processed
-            if payment.status != 'created':
+            # Re-run from the start if a concurrent payment landing in the same
+            # rollup bucket makes the transaction fail to serialize
+            completed = run_in_transaction(
+                self.complete_payment, payment.pk, application.pk, payment_type,
+                razorpay_payment_id, razorpay_signature
+            )
+            if completed is None:
                 return Response(
                     {'error': 'Payment already processed'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-
-            # Update payment record
-            payment.razorpay_payment_id = razorpay_payment_id
-            payment.razorpay_signature = razorpay_signature
-            payment.status = 'completed'
-            payment.save()
-
-            # Update based on payment type
+            payment, application, job = completed
             if payment_type == 'initial':
-                # Initial payment: Accept application and assign job
-                application.status = 'Accepted'
-                job.status = 'Assigned'
-                job.professional_id = application.professional_id
-                application.save()
-                job.save()
-                # Reject other applications
-                JobApplication.objects.filter(job_id=job, status='Applied').exclude(application_id=application_id).update(status='Rejected')
                 message = 'Initial payment verified and application accepted successfully'
-            elif payment_type == 'remaining':
-                # Remaining payment: Complete the job
-                application.status = 'Completed'
-                job.status = 'Completed'
-                application.save()
-                job.save()
-                message = 'Remaining payment verified and job completed successfully'
             else:
-                return Response({'error': 'Invalid payment type'}, status=status.HTTP_400_BAD_REQUEST)
+                message = 'Remaining payment verified and job completed successfully'
+            invalidate_job_participants(job.job_id)
+            publish_job_states([job.job_id])
             # Add this to the VerifyPaymentView class in views.py
 # Inside the post method, after payment verification is successful
 
@@ -1781,44 +1890,26 @@ class VerifyPaymentView(APIView):
                 'client_id': request.user.id
             }
 
-            # Create persistent notification in database
-            notification = Notification.objects.create(
-                user=professional,
-                notification_type='payment',
-                title=f"{'Initial' if payment_type == 'initial' else 'Final'} payment received",
-                message=f"{request.user.name} has made the {'initial' if payment_type == 'initial' else 'final'} payment for job: {job.title}",
-                data=notification_data,
-                is_read=False
-            )
-
-            # Send real-time notification via WebSocket
+            # Persistent notification plus real-time push to the professional
             try:
-                channel_layer = get_channel_layer()
-                
-                # Prepare notification data
-                ws_notification_data = {
-                    'type': 'payment',
-                    'payment_type': payment_type,
-                    'job_id': job.job_id,
-                    'job_title': job.title,
-                    'client_id': request.user.id,
-                    'client_name': request.user.name,
-                    'amount': str(payment.amount),
-                    'timestamp': timezone.now().isoformat(),
-                    'notification_id': str(notification.id)
-                }
-                
-                # Send notification to professional's notification group
-                async_to_sync(channel_layer.group_send)(
-                    f'notifications_{professional.id}',
-                    {
-                        'type': 'send_notification',
-                        'content': ws_notification_data
+                notify_user(
+                    professional,
+                    notification_type='payment',
+                    title=f"{'Initial' if payment_type == 'initial' else 'Final'} payment received",
+                    message=f"{request.user.name} has made the {'initial' if payment_type == 'initial' else 'final'} payment for job: {job.title}",
+                    data=notification_data,
+                    payload={
+                        'type': 'payment',
+                        'payment_type': payment_type,
+                        'job_id': job.job_id,
+                        'job_title': job.title,
+                        'client_id': request.user.id,
+                        'client_name': request.user.name,
+                        'amount': str(payment.amount)
                     }
                 )
-                print(f"Sent WebSocket notification to professional {professional.id} about payment {payment.id}")
             except Exception as e:
-                print(f"Failed to send WebSocket notification: {str(e)}")
+                logger.error(f"Failed to send payment notification: {str(e)}")
             return Response({'message': message}, status=status.HTTP_200_OK)
 
         except razorpay.errors.SignatureVerificationError:
@@ -1829,6 +1920,45 @@ class VerifyPaymentView(APIView):
             return Response({'error': 'Application not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': f'Payment verification failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def complete_payment(self, payment_id, application_id, payment_type, razorpay_payment_id, razorpay_signature):
+        """
+        Complete the payment and move the application and job on in one
+        transaction. Returns (payment, application, job), or None if the
+        payment was already processed.
+        """
+        # Locked so a payment verified twice at once is completed, and counted, only once
+        payment = Payment.objects.select_for_update().get(pk=payment_id)
+        if payment.status != 'created':
+            return None
+
+        # Update payment record
+        payment.razorpay_payment_id = razorpay_payment_id
+        payment.razorpay_signature = razorpay_signature
+        payment.status = 'completed'
+        payment.save()
+        record_payment_completed(payment)
+
+        application = JobApplication.objects.select_related('job_id', 'professional_id').get(
+            application_id=application_id
+        )
+        job = application.job_id
+        if payment_type == 'initial':
+            # Initial payment: Accept application and assign job
+            application.status = 'Accepted'
+            job.status = 'Assigned'
+            job.professional_id = application.professional_id
+            application.save()
+            job.save()
+            # Reject other applications
+            JobApplication.objects.filter(job_id=job, status='Applied').exclude(application_id=application_id).update(status='Rejected')
+        else:
+            # Remaining payment: Complete the job
+            application.status = 'Completed'
+            job.status = 'Completed'
+            application.save()
+            job.save()
+        return payment, application, job
 # accounts/views.py
 class SubmitReviewView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1856,26 +1986,28 @@ class SubmitReviewView(APIView):
         if len(review) > 500:
             return Response({'error': 'Review cannot exceed 500 characters'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            job = Job.objects.get(job_id=job_id, client_id=user, status='Completed')
-        except Job.DoesNotExist:
+        # Re-run from the start if a concurrent review of the same professional
+        # makes the aggregate update fail to serialize
+        job = run_in_transaction(self.save_rating, user, job_id, rating, review)
+        if job is None:
             return Response({'error': 'Job not found or not completed'}, status=status.HTTP_404_NOT_FOUND)
+        publish_job_states([job.job_id])
+
+        return Response({'message': 'Rating and review submitted successfully'}, status=status.HTTP_200_OK)
+
+    def save_rating(self, user, job_id, rating, review):
+        # Locked so a concurrent re-rating can't be counted against a stale previous rating
+        job = Job.objects.select_for_update().filter(job_id=job_id, client_id=user, status='Completed').first()
+        if job is None:
+            return None
 
         # Save both rating and review
+        previous_rating = job.rating
         job.rating = rating
         job.review = review if review else None  # Save as None if empty
-        job.save()
-
-        # Update professional's avg_rating
-        try:
-            application = JobApplication.objects.get(job_id=job, status='Completed')
-            professional_profile = ProfessionalProfile.objects.get(user=application.professional_id)
-            professional_profile.update_avg_rating()
-        except (JobApplication.DoesNotExist, ProfessionalProfile.DoesNotExist) as e:
-            print(f"Debug: Failed to update avg_rating: {str(e)}")
-            pass
-
-        return Response({'message': 'Rating and review submitted successfully'}, status=status.HTTP_200_OK)
+        job.save(update_fields=['rating', 'review'])
+        record_rating(job, rating, previous_rating)
+        return job
 
 class ClientTransactionHistoryView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1889,13 +2021,16 @@ class ClientTransactionHistoryView(APIView):
                 )
 
             # Fetch all payments associated with the client's jobs
-            client_jobs = Job.objects.filter(client_id=request.user)
-            job_applications = JobApplication.objects.filter(job_id__in=client_jobs).select_related('job_id', 'professional_id')
-            payments = Payment.objects.filter(job_application__in=job_applications).order_by('-created_at')
+            payments = Payment.objects.filter(job_application__job_id__client_id=request.user).select_related(
+                'job_application__job_id__client_id', 'job_application__professional_id'
+            ).order_by('-created_at')
 
-            # Serialize the payments
+            # Serialize the payments; the totals come from the daily rollups
             serializer = PaymentSerializer(payments, many=True, context={'request': request})
-            return Response({'transactions': serializer.data}, status=status.HTTP_200_OK)
+            return Response({
+                'transactions': serializer.data,
+                'totals': payment_totals(client_id=request.user.id),
+            }, status=status.HTTP_200_OK)
 
         except Exception as e:
             print(f"Error in ClientTransactionHistoryView: {str(e)}")
@@ -1916,12 +2051,16 @@ class ProfessionalTransactionHistoryView(APIView):
                 )
 
             # Fetch payments where the user is the professional in the job application
-            job_applications = JobApplication.objects.filter(professional_id=request.user).select_related('job_id', 'job_id__client_id')
-            payments = Payment.objects.filter(job_application__in=job_applications).order_by('-created_at')
+            payments = Payment.objects.filter(job_application__professional_id=request.user).select_related(
+                'job_application__job_id__client_id', 'job_application__professional_id'
+            ).order_by('-created_at')
 
-            # Serialize the payments
+            # Serialize the payments; the totals come from the daily rollups
             serializer = PaymentSerializer(payments, many=True, context={'request': request})
-            return Response({'transactions': serializer.data}, status=status.HTTP_200_OK)
+            return Response({
+                'transactions': serializer.data,
+                'totals': payment_totals(professional_id=request.user.id),
+            }, status=status.HTTP_200_OK)
 
         except Exception as e:
             print(f"Error in ProfessionalTransactionHistoryView: {str(e)}")
@@ -1929,6 +2068,32 @@ class ProfessionalTransactionHistoryView(APIView):
                 {'error': f'Internal server error: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+class ClientSpendChartView(APIView):
+    """Daily completed-payment spend of the client between ?start= and ?end= (YYYY-MM-DD)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'client':
+            return Response({'error': 'Only clients can view spending'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            start, end = parse_date_range(request.query_params.get('start'), request.query_params.get('end'))
+        except InvalidRange as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(daily_series(start, end, client_id=request.user.id), status=status.HTTP_200_OK)
+
+class ProfessionalEarningsChartView(APIView):
+    """Daily completed-payment earnings of the professional between ?start= and ?end= (YYYY-MM-DD)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'professional':
+            return Response({'error': 'Only professionals can view earnings'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            start, end = parse_date_range(request.query_params.get('start'), request.query_params.get('end'))
+        except InvalidRange as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(daily_series(start, end, professional_id=request.user.id), status=status.HTTP_200_OK)
 from django.http import HttpResponse, Http404, FileResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
@@ -1939,8 +2104,10 @@ from rest_framework.response import Response
 import os
 from pathlib import Path
 from .models import Message, JobApplication
+from .file_serving import message_file_url, serve_file
+from .previews import source_name
 
-@api_view(['GET'])
+@api_view(['GET', 'HEAD'])
 @permission_classes([IsAuthenticated])
 def serve_message_file(request, file_path):
     """
@@ -1948,49 +2115,26 @@ def serve_message_file(request, file_path):
     """
     try:
         # Reconstruct the full file path
-        full_path = os.path.join(settings.MEDIA_ROOT, 'message', file_path)
-        
+        media_root = Path(settings.MEDIA_ROOT, 'message').resolve()
+        full_path = (media_root / file_path).resolve()
+
         # Security check - ensure the path is within our media directory
-        media_path = Path(settings.MEDIA_ROOT).resolve()
-        file_path_resolved = Path(full_path).resolve()
-        
-        if not str(file_path_resolved).startswith(str(media_path)):
-            raise Http404("File not found")
-        
-        if not os.path.exists(full_path):
+        if media_root not in full_path.parents or not full_path.is_file():
             raise Http404("File not found")
-        
-        # Find the message that owns this file
-        # Extract the filename from the path
-        filename = os.path.basename(file_path)
-        message = Message.objects.filter(file__icontains=filename).first()
-        
-        if not message:
-            raise Http404("File not found")
-        
-        # Check permissions
-        conversation = message.conversation
-        job = conversation.job
-        
+
+        # Message.file stores the path relative to the message storage, so the
+        # owning jobs are found with an exact, indexed lookup. A deduplicated
+        # file can belong to messages in several jobs.
+        relative_path = full_path.relative_to(media_root).as_posix()
+        job_ids = Message.objects.filter(file=source_name(relative_path)).values_list(
+            'conversation__job_id', flat=True
+        ).distinct()
+
         # User must be either the client or an accepted professional
-        if request.user != job.client_id:
-            application = JobApplication.objects.filter(
-                job_id=job,
-                professional_id=request.user,
-                status='Accepted'
-            ).first()
-            if not application:
-                raise Http404("File not found")
-        
-        # Serve the file
-        return FileResponse(
-            open(full_path, 'rb'),
-            as_attachment=False,
-            filename=os.path.basename(full_path)
-        )
-        
+        if not any(is_job_participant(request.user, job_id) for job_id in job_ids):
+            raise Http404("File not found")
+
+        return serve_file(request._request, str(full_path), relative_path)
+
     except Exception as e:
         raise Http404("File not found")
-
-# Add this to your account/urls.py
-# path('media/message/<path:file_path>', views.serve_message_file, name='serve_message_file'),
\ No newline at end of file
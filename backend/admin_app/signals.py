@@ -0,0 +1,25 @@
+# admin_app/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from account.models import Complaint, CustomUser, Job, JobApplication, Payment, ProfessionalProfile
+
+from .stats import invalidate_dashboard_stats
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=ProfessionalProfile)
+@receiver(post_delete, sender=ProfessionalProfile)
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+@receiver(post_save, sender=JobApplication)
+@receiver(post_delete, sender=JobApplication)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def drop_dashboard_stats(sender, **kwargs):
+    # After commit, so a refresh in between can't cache the old figures again
+    transaction.on_commit(invalidate_dashboard_stats)
@@ -0,0 +1,180 @@
+# admin_app/stats.py
+"""
+Admin dashboard statistics.
+
+get_dashboard_stats() returns one snapshot with the figures that
+UserCountsView, JobCountsView and PaymentTotalView serve. It is cached for
+REFRESH_INTERVAL seconds and dropped whenever a user, profile, complaint,
+job, application or payment is saved or deleted (see admin_app.signals).
+Messages don't invalidate it, since they arrive far too often; the active
+conversations count may lag by up to REFRESH_INTERVAL.
+
+A snapshot costs one conditional-aggregate query per table instead of one
+count() per figure. Tables with more than ESTIMATE_THRESHOLD rows, going
+by the planner's estimate, aren't scanned at all: their figures come from
+pg_class.reltuples and the column's most-common-value frequencies in
+pg_stats, so a refresh takes constant time however large they grow. Such
+figures are listed under 'estimated' in the snapshot.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from account.models import Complaint, CustomUser, Job, JobApplication, Message, PaymentDailyRollup, ProfessionalProfile
+
+DEFAULTS = {
+    'REFRESH_INTERVAL': 60,
+    'ESTIMATE_THRESHOLD': 1_000_000,
+    'ACTIVE_CONVERSATION_DAYS': 30,
+}
+
+CACHE_KEY = 'admin_dashboard_stats'
+
+# JobApplication statuses counted as active: not yet decided, or in progress
+ACTIVE_APPLICATION_STATUSES = ('Applied', 'Accepted')
+
+
+def get_stats_settings():
+    return {**DEFAULTS, **getattr(settings, 'ADMIN_DASHBOARD_STATS', {})}
+
+
+def invalidate_dashboard_stats():
+    cache.delete(CACHE_KEY)
+
+
+def get_dashboard_stats():
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(CACHE_KEY, stats, get_stats_settings()['REFRESH_INTERVAL'])
+    return stats
+
+
+def estimated_rows(model):
+    """The planner's row estimate for the model's table (0 if it was never analyzed)."""
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
+
+
+def estimated_value_counts(model, field_name, rows):
+    """{value: estimated rows} for a low-cardinality column, from pg_stats' most common values."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT most_common_vals::text::text[], most_common_freqs
+            FROM pg_stats
+            WHERE schemaname = current_schema() AND tablename = %s AND attname = %s
+            """,
+            [model._meta.db_table, model._meta.get_field(field_name).column]
+        )
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return {}
+    return {value: round(rows * frequency) for value, frequency in zip(*row)}
+
+
+class Snapshot:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.figures = {}
+        self.estimated = []
+
+    def is_large(self, model):
+        rows = estimated_rows(model)
+        return rows if rows > self.threshold else None
+
+    def estimate(self, **figures):
+        self.figures.update(figures)
+        self.estimated.extend(figures)
+
+
+def _user_figures(snapshot):
+    rows = snapshot.is_large(CustomUser)
+    if not rows:
+        snapshot.figures.update(CustomUser.objects.aggregate(
+            professionals=Count('pk', filter=Q(role='professional')),
+            clients=Count('pk', filter=Q(role='client')),
+            verified_professionals=Count(
+                'pk', filter=Q(role='professional', professionalprofile__verify_status='Verified')
+            ),
+        ))
+        return
+
+    roles = estimated_value_counts(CustomUser, 'role', rows)
+    snapshot.estimate(professionals=roles.get('professional', 0), clients=roles.get('client', 0))
+    profiles = snapshot.is_large(ProfessionalProfile)
+    if profiles:
+        verified = estimated_value_counts(ProfessionalProfile, 'verify_status', profiles)
+        snapshot.estimate(verified_professionals=verified.get('Verified', 0))
+    else:
+        snapshot.figures['verified_professionals'] = ProfessionalProfile.objects.filter(
+            verify_status='Verified', user__role='professional'
+        ).count()
+
+
+def _complaint_figures(snapshot):
+    rows = snapshot.is_large(Complaint)
+    if rows:
+        snapshot.estimate(pending_complaints=estimated_value_counts(Complaint, 'status', rows).get('PENDING', 0))
+        return
+    snapshot.figures.update(Complaint.objects.aggregate(pending_complaints=Count('pk', filter=Q(status='PENDING'))))
+
+
+def _job_figures(snapshot):
+    rows = snapshot.is_large(Job)
+    if rows:
+        snapshot.estimate(total_jobs=rows, completed_jobs=estimated_value_counts(Job, 'status', rows).get('Completed', 0))
+        return
+    snapshot.figures.update(Job.objects.aggregate(
+        total_jobs=Count('pk'),
+        completed_jobs=Count('pk', filter=Q(status='Completed')),
+    ))
+
+
+def _application_figures(snapshot):
+    rows = snapshot.is_large(JobApplication)
+    if rows:
+        statuses = estimated_value_counts(JobApplication, 'status', rows)
+        snapshot.estimate(active_applications=sum(statuses.get(value, 0) for value in ACTIVE_APPLICATION_STATUSES))
+        return
+    snapshot.figures.update(JobApplication.objects.aggregate(
+        active_applications=Count('pk', filter=Q(status__in=ACTIVE_APPLICATION_STATUSES)),
+    ))
+
+
+def _conversation_figures(snapshot, days):
+    # Bounded by msg_created_conv_idx to the window's messages
+    since = timezone.now() - timedelta(days=days)
+    snapshot.figures.update(Message.objects.filter(created_at__gte=since).aggregate(
+        active_conversations=Count('conversation', distinct=True),
+    ))
+
+
+def _payment_figures(snapshot):
+    # From the daily rollups (account.rollups): a row per day and pair of users, not per payment
+    total = PaymentDailyRollup.objects.filter(status='completed').aggregate(total=Sum('total_amount'))['total']
+    snapshot.figures['total_payments'] = total or 0
+
+
+def compute_dashboard_stats():
+    options = get_stats_settings()
+    snapshot = Snapshot(options['ESTIMATE_THRESHOLD'])
+    _user_figures(snapshot)
+    _complaint_figures(snapshot)
+    _job_figures(snapshot)
+    _application_figures(snapshot)
+    _conversation_figures(snapshot, options['ACTIVE_CONVERSATION_DAYS'])
+    _payment_figures(snapshot)
+    return {
+        **snapshot.figures,
+        'estimated': snapshot.estimated,
+        'computed_at': timezone.now().isoformat(),
+    }
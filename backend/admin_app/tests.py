@@ -1,3 +1,43 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from account.models import CustomUser, Job
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AdminJobsQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user('client@example.com', 'Client', password='pass', role='client')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_jobs(self, count):
+        for status in ('Open', 'Assigned', 'Completed'):
+            Job.objects.bulk_create([
+                Job(
+                    client_id=self.client_user,
+                    title=f'{status} job {index}',
+                    description='Build a thing',
+                    budget=1000,
+                    deadline=date.today() + timedelta(days=30),
+                    status=status,
+                )
+                for index in range(count)
+            ])
+
+    def test_query_count_does_not_grow_with_jobs(self):
+        # One query per status list, however many jobs each holds
+        for total in (1, 15):
+            Job.objects.all().delete()
+            self.create_jobs(total)
+            with self.assertNumQueries(3):
+                response = self.client.get('/api/admin/jobs/')
+            self.assertEqual(response.status_code, 200)
+            for key in ('pending', 'active', 'completed'):
+                self.assertEqual(len(response.json()[key]), total)
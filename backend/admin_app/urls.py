@@ -5,7 +5,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from account.views import health_check
 import os
-from .views import AdminVerifyProfessionalView,AdminVerificationRequestsView,BlockUnblockUserView,AdminJobsView,ListUsersView,UserCountsView,JobCountsView
+from .views import AdminVerifyProfessionalView,AdminVerificationRequestsView,BlockUnblockUserView,AdminJobsView,ListUsersView,UserCountsView,JobCountsView,WebSocketMetricsView
 
 urlpatterns = [
 path('admin/verify-professional/<int:professional_id>/', AdminVerifyProfessionalView.as_view(), name='admin_verify_professional'),
@@ -15,5 +15,6 @@ path('admin/jobs/', AdminJobsView.as_view(), name='admin-jobs'),
 path('users/', ListUsersView.as_view(), name='list-users'),
 path('users/counts/', UserCountsView.as_view(), name='user-counts'),
     path('jobs/counts/', JobCountsView.as_view(), name='job-counts'),
+path('admin/websocket-metrics/', WebSocketMetricsView.as_view(), name='websocket-metrics'),
  
 ]
\ No newline at end of file
@@ -12,11 +12,13 @@ from .serializers import  UserBlockSerializer,AdminVerificationSerializer
 from account.models import Complaint,Job,JobApplication,Conversation,ProfessionalProfile
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Q
-from datetime import datetime, timedelta
 import logging
 from account.serializers import JobSerializer
+from account.authentication import invalidate_cached_user
+from account.heartbeat import get_cluster_metrics
+from .stats import get_dashboard_stats
 logger = logging.getLogger(__name__)
-from django.core.mail import send_mail
+from account.emails import queue_email
 # Create your views here.
 class ListUsersView(APIView):
     permission_classes = [AllowAny]
@@ -38,6 +40,9 @@ class BlockUnblockUserView(APIView):
         serializer = UserBlockSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            # Also dropped by the post_save signal; explicit so the block
+            # takes effect on the user's very next request.
+            invalidate_cached_user(user.id)
             action = 'blocked' if user.is_blocked else 'unblocked'
             return Response({'message': f'User has been {action} successfully.'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -45,37 +50,22 @@ class BlockUnblockUserView(APIView):
 class UserCountsView(APIView):
     permission_classes = [IsAdminUser]
     def get(self, request):
-        professional_count = CustomUser.objects.filter(role='professional').count()
-        client_count = CustomUser.objects.filter(role='client').count()
-        pending_complaints = Complaint.objects.filter(status='Pending').count()
-        verified_professionals = CustomUser.objects.filter(
-            role='professional', 
-            professionalprofile__verify_status='Verified'
-        ).count()
+        stats = get_dashboard_stats()
         return Response({
-            'professionals': professional_count,
-            'clients': client_count,
-            'pending_complaints': pending_complaints,
-            'verified_professionals': verified_professionals
+            'professionals': stats['professionals'],
+            'clients': stats['clients'],
+            'pending_complaints': stats['pending_complaints'],
+            'verified_professionals': stats['verified_professionals']
         }, status=status.HTTP_200_OK)
 class JobCountsView(APIView):
     permission_classes = [IsAdminUser]
     def get(self, request):
-        total_jobs = Job.objects.count()
-        completed_jobs = Job.objects.filter(status='Completed').count()
-        active_applications = JobApplication.objects.filter(
-            status__in=['Pending', 'Accepted']
-        ).count()
-        # Active conversations: Conversations with messages in the last 30 days
-        recent_threshold = datetime.now() - timedelta(days=30)
-        active_conversations = Conversation.objects.filter(
-            messages__created_at__gte=recent_threshold
-        ).distinct().count()
+        stats = get_dashboard_stats()
         return Response({
-            'total_jobs': total_jobs,
-            'completed_jobs': completed_jobs,
-            'active_applications': active_applications,
-            'active_conversations': active_conversations
+            'total_jobs': stats['total_jobs'],
+            'completed_jobs': stats['completed_jobs'],
+            'active_applications': stats['active_applications'],
+            'active_conversations': stats['active_conversations']
         }, status=status.HTTP_200_OK)
 class AdminVerificationRequestsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -201,12 +191,11 @@ class AdminVerifyProfessionalView(APIView):
                 
                 # Send notification email (optional)
                 try:
-                    send_mail(
+                    queue_email(
                         subject="Verification Status Update - Approved! 🎉",
                         message=f"Dear {professional_user.name},\n\nGreat news! Your professional verification has been approved by our admin team.\n\nYou now have access to all professional features on our platform.\n\nBest regards,\nThe Team",
                         from_email=settings.DEFAULT_FROM_EMAIL,
                         recipient_list=[professional_user.email],
-                        fail_silently=True,
                     )
                     logger.info(f"Verification approval email sent to {professional_user.email}")
                 except Exception as e:
@@ -234,12 +223,11 @@ class AdminVerifyProfessionalView(APIView):
                 
                 # Send notification email (optional)
                 try:
-                    send_mail(
+                    queue_email(
                         subject="Verification Status Update",
                         message=f"Dear {professional_user.name},\n\nYour verification request has been reviewed.\n\nStatus: Not Verified\nReason: {denial_reason}\n\nPlease review the feedback and submit a new verification request with the required corrections.\n\nBest regards,\nThe Team",
                         from_email=settings.DEFAULT_FROM_EMAIL,
                         recipient_list=[professional_user.email],
-                        fail_silently=True,
                     )
                     logger.info(f"Verification denial email sent to {professional_user.email}")
                 except Exception as e:
@@ -268,9 +256,10 @@ class AdminJobsView(APIView):
        
         # Categorize jobs by status
          # Categorize jobs by status
-        pending_jobs = Job.objects.filter( status='Open')
-        active_jobs = Job.objects.filter( status='Assigned')
-        completed_jobs = Job.objects.filter(status='Completed')
+        jobs = Job.objects.with_list_data()
+        pending_jobs = jobs.filter(status='Open')
+        active_jobs = jobs.filter(status='Assigned')
+        completed_jobs = jobs.filter(status='Completed')
 
         # Serialize each category
         pending_serializer = JobSerializer(pending_jobs, many=True)
@@ -281,4 +270,12 @@ class AdminJobsView(APIView):
             'pending': pending_serializer.data,
             'active': active_serializer.data,
             'completed': completed_serializer.data
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class WebSocketMetricsView(APIView):
+    """Chat socket heartbeat counters, as last published by each worker process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cluster_metrics(), status=status.HTTP_200_OK)
@@ -17,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -197,16 +198,37 @@ LOGGING = {
 
 # Email Settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
+# Outbox: handlers queue OutboundEmail rows, `manage.py send_queued_emails` delivers them
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,  # seconds, doubled on every failed attempt
+    'MAX_BACKOFF': 3600,
+    'LEASE_TIMEOUT': 300,  # reclaim rows left 'sending' by a crashed worker
+    'POLL_INTERVAL': 5,
+    # Also send each email once its transaction commits. Turn off where the
+    # send_queued_emails worker runs (docker-compose's email-worker service).
+    'SEND_ON_COMMIT': os.getenv('EMAIL_SEND_ON_COMMIT', 'True') == 'True',
+}
+
 # Razorpay Settings
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
 
+# Payment gateway client (account.payments); BACKEND 'fake' runs the payment flow offline
+PAYMENT_GATEWAY = {
+    'BACKEND': os.getenv('PAYMENT_GATEWAY', 'razorpay'),
+    'CONNECT_TIMEOUT': 3.05,  # seconds
+    'READ_TIMEOUT': 10,
+    'POOL_MAXSIZE': 10,
+}
+
 # Cloudinary Storage
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME'),
@@ -221,6 +243,22 @@ cloudinary.config(
     secure=True
 )
 
+# Profile and job documents are kept locally by the request and pushed to
+# Cloudinary by the upload_staged_documents worker (account.cloud_uploads).
+# BACKEND 'fake' stores them under MEDIA_ROOT/fake_cloudinary instead.
+CLOUDINARY_UPLOADS = {
+    # Needs the upload_staged_documents worker (docker-compose's upload-worker)
+    'STAGED': os.getenv('CLOUDINARY_STAGED_UPLOADS', 'False') == 'True',
+    'BACKEND': os.getenv('CLOUDINARY_UPLOAD_BACKEND', 'cloudinary'),
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,  # seconds, doubled after every failed attempt
+    'MAX_BACKOFF': 3600,
+    'LEASE_TIMEOUT': 300,
+    'POLL_INTERVAL': 5,
+    'KEEP_UPLOADED': 86400,  # seconds before uploaded rows are purged; must outlast the retries
+}
+
 # Media Settings
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -232,6 +270,84 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+# Chunked, resumable chat attachment uploads (account.uploads). Chunks are
+# streamed to disk, so MAX_FILE_SIZE does not affect worker memory.
+CHAT_UPLOADS = {
+    'MAX_FILE_SIZE': int(os.getenv('CHAT_UPLOAD_MAX_FILE_SIZE', 100 * 1024 * 1024)),
+    'CHUNK_SIZE': 1024 * 1024,
+    'SESSION_TTL': 60 * 60 * 24,  # seconds an unfinished upload can be resumed
+    'STAGING_DIR': os.path.join(MEDIA_ROOT, 'uploads'),
+}
+
+# Content-addressed chat attachments (account.blobs): each distinct file is
+# stored once under its SHA-256; gc_message_blobs deletes unreferenced ones
+# after GC_GRACE_PERIOD seconds.
+CHAT_FILE_STORAGE = {
+    'CONTENT_ADDRESSED': os.getenv('CHAT_FILES_CONTENT_ADDRESSED', 'False') == 'True',
+    'GC_GRACE_PERIOD': 60 * 60,
+}
+
+# WebP thumbnail / preview renditions of chat images (account.previews),
+# rendered in a pool of WORKERS processes after each image upload.
+CHAT_IMAGE_PREVIEWS = {
+    'ENABLED': os.getenv('CHAT_IMAGE_PREVIEWS', 'True') == 'True',
+    'WORKERS': int(os.getenv('CHAT_IMAGE_PREVIEW_WORKERS', 2)),
+    'THUMBNAIL_SIZE': 256,
+    'PREVIEW_SIZE': 1280,
+    'WEBP_QUALITY': 80,
+}
+
+# How serve_message_file hands attachment bytes to the client
+# (account.file_serving): 'python' streams them from Django, 'x-accel'
+# (nginx) and 'x-sendfile' (Apache/lighttpd) let the web server send them.
+FILE_SERVING = {
+    'MODE': os.getenv('FILE_SERVING_MODE', 'python'),
+    'INTERNAL_PREFIX': os.getenv('FILE_SERVING_INTERNAL_PREFIX', '/protected/message/'),
+    'CACHE_MAX_AGE': 60 * 60,
+}
+
+# Open-jobs search (account.search): PostgreSQL full-text search with a
+# trigram fallback on the title for queries that match nothing.
+JOB_SEARCH = {
+    'CONFIG': 'english',  # text search configuration of Job.search_vector
+    'MIN_QUERY_LENGTH': 2,
+    'MAX_QUERY_LENGTH': 200,
+    'MAX_RANKED': 1000,  # only the newest N matches of a query are ranked
+    'TRIGRAM_FALLBACK': os.getenv('JOB_SEARCH_TRIGRAM_FALLBACK', 'True') == 'True',
+    'TRIGRAM_THRESHOLD': 0.5,  # pg_trgm word similarity needed to match a title
+}
+
+# "Jobs for you" matching (account.matching), recomputed by the
+# compute_job_matches command, e.g. from cron every few minutes.
+JOB_MATCHING = {
+    'TOP_K': 20,  # matches stored per professional
+    'MIN_SCORE': 0.05,  # cosine similarity below which a job is not a match
+    'JOB_BLOCK_SIZE': 1024,  # jobs scored per matrix product
+    'INSERT_BATCH_SIZE': 2000,
+}
+
+# Admin dashboard figures (admin_app.stats): cached for REFRESH_INTERVAL
+# seconds; tables larger than ESTIMATE_THRESHOLD rows are counted from the
+# planner's statistics instead of scanned.
+ADMIN_DASHBOARD_STATS = {
+    'REFRESH_INTERVAL': 60,
+    'ESTIMATE_THRESHOLD': int(os.getenv('ADMIN_STATS_ESTIMATE_THRESHOLD', 1_000_000)),
+    'ACTIVE_CONVERSATION_DAYS': 30,
+}
+
+# Daily payment rollups (account.rollups) behind the spending and earnings
+# charts; rebuilt from the payments by the rebuild_payment_rollups command.
+PAYMENT_ROLLUPS = {
+    'DEFAULT_RANGE_DAYS': 30,  # chart range when no ?start= is given
+    'MAX_RANGE_DAYS': 366,
+}
+
+# Transactions re-run on serialization failures (account/transactions.py)
+TRANSACTION_RETRY = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF': 0.02,  # seconds; the n-th retry waits up to n times this
+}
+
 # Redis/Channels Settings
 CHANNEL_LAYERS = {
     'default': {
@@ -244,4 +360,29 @@ CHANNEL_LAYERS = {
             'group_expiry': 300,
         },
     },
-}
\ No newline at end of file
+}
+
+# Shared cache (job-participant lookups, etc.); separate Redis db from the channel layer
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://:{os.getenv("REDIS_PASSWORD")}@{os.getenv("REDIS_HOST")}:{os.getenv("REDIS_PORT")}/1',
+        'TIMEOUT': 300,
+    },
+}
+
+# Chat socket heartbeats: one shared timing wheel per process (account.heartbeat)
+CHAT_HEARTBEAT = {
+    'ENABLED': os.getenv('CHAT_HEARTBEAT', 'True') == 'True',
+    'INTERVAL': 30,  # seconds between heartbeats on a socket
+    'TICK': 1,  # wheel resolution in seconds
+    'IDLE_TIMEOUT': 120,  # close after this long without any client frame; 0 disables
+}
+
+# Chat write-behind: broadcast first, persist messages in batches
+CHAT_WRITE_BEHIND = {
+    'ENABLED': os.getenv('CHAT_WRITE_BEHIND', 'False') == 'True',
+    'MAX_BATCH': 100,
+    'FLUSH_INTERVAL': 0.5,  # seconds
+    'MAX_ATTEMPTS': 3,  # failed batch writes before messages are written one by one
+}
@@ -18,9 +18,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from django.conf import settings
-from django.conf.urls.static import static
 from account.views import health_check
-import os
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -30,16 +28,15 @@ urlpatterns = [
    path('health/', health_check, name='health_check'),
 ]
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    
-    # CRITICAL: Add specific handling for message files
     from django.views.static import serve
     from django.urls import re_path
-    
-    # Serve message files specifically
+
+    # Chat attachments are only served by account.views.serve_message_file,
+    # which checks the user may see them; chunked uploads and staged
+    # documents are never served.
     urlpatterns += [
-        re_path(r'^media/message/(?P<path>.*)$', serve, {
-            'document_root': os.path.join(settings.BASE_DIR, 'media', 'message'),
+        re_path(r'^media/(?!(?:message|uploads|staged)/)(?P<path>.*)$', serve, {
+            'document_root': settings.MEDIA_ROOT,
         }),
     ]
 else:
@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from account.emails import queue_email
 from django.conf import settings
 import random
 from django.utils import timezone
@@ -10,5 +10,5 @@ def send_otp_email(user):
     from_email = settings.EMAIL_HOST_USER
     recipient_list = [user.email]
     
-    # Send only one email
-    send_mail(subject, message, from_email, recipient_list)
\ No newline at end of file
+    # Queued for the outbox worker so sign-up does not wait on SMTP
+    queue_email(subject, message, recipient_list, from_email=from_email)
\ No newline at end of file
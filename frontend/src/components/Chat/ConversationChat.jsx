@@ -6,6 +6,7 @@ import './ConversationChat.css';
 import { AuthContext } from '../../context/AuthContext';
 
 const baseUrl = import.meta.env.VITE_API_URL;
+const CHUNKED_UPLOAD_THRESHOLD = 5 * 1024 * 1024;
 
 // Helper function to get WebSocket URL from HTTP URL
 const getWebSocketUrl = (httpUrl) => {
@@ -44,6 +45,8 @@ function ConversationChat() {
   const { jobId } = useParams();
   const [job, setJob] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [newMessage, setNewMessage] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -84,14 +87,14 @@ function ConversationChat() {
     console.log('Processing URL:', url); // Debug log
     
     // If it's already a full URL (starts with http/https), return as is
-    if (url.startsWith('https')) {
+    if (/^https?:\/\//.test(url)) {
       console.log('hello')
       console.log('starting with http ',url)
       return url;
     }
     
-    // If it starts with /media/, construct full URL with baseUrl
-    if (url.startsWith('/media/')) {
+    // If it starts with /api/media/ (served by serve_message_file), construct full URL with baseUrl
+    if (url.startsWith('/api/media/')) {
       console.log('starting with media',url)
       return `${baseUrl}${url}`;
     }
@@ -153,7 +156,7 @@ function ConversationChat() {
     try {
       
       // First try the original URL
-      const response = await fetch(originalUrl, { method: 'HEAD' });
+      const response = await fetch(originalUrl, { method: 'HEAD', credentials: 'include' });
       if (response.ok) {
         window.open(originalUrl, '_blank');
         
@@ -245,6 +248,7 @@ function ConversationChat() {
           professional_id: response.data.professional_id || null,
         });
         setMessages(response.data.messages || []);
+        setOlderCursor(response.data.next_before || null);
         setLoading(false);
       } catch (err) {
         console.error('Fetch error:', err);
@@ -263,6 +267,23 @@ function ConversationChat() {
     fetchConversation();
   }, [jobId]);
 
+  const loadOlderMessages = async () => {
+    if (!olderCursor || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const response = await axios.get(`${baseUrl}/api/conversations/job/${jobId}/messages/`, {
+        params: { before: olderCursor },
+        withCredentials: true,
+      });
+      setMessages((prev) => [...(response.data.messages || []), ...prev]);
+      setOlderCursor(response.data.next_before || null);
+    } catch (err) {
+      console.error('Failed to load older messages:', err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   useEffect(() => {
     let ws = null;
     let reconnectTimer = null;
@@ -314,8 +335,19 @@ function ConversationChat() {
               const data = JSON.parse(event.data);
               console.log('Received WebSocket message:', data);
 
-              if (data.event === 'user_joined' || data.event === 'user_left') {
+              if (data.type === 'heartbeat') {
+                // Answer so the server does not count the socket as idle
+                ws.send(JSON.stringify({ type: 'heartbeat_response' }));
+              } else if (data.event === 'user_joined' || data.event === 'user_left') {
                 console.log(`User ${data.event}:`, data);
+              } else if (data.event === 'message_saved') {
+                // A buffered message was written: swap its temporary id for the real one
+                setMessages((prev) =>
+                  prev.map((msg) => (msg.id === data.temp_id ? { ...msg, id: data.id, pending: false } : msg))
+                );
+              } else if (data.event === 'message_failed') {
+                setMessages((prev) => prev.filter((msg) => msg.id !== data.temp_id));
+                setSocketError('A message could not be saved. Please send it again.');
               } else if (data.error) {
                 setSocketError(data.error);
                 console.error('WebSocket error message:', data.error);
@@ -416,13 +448,53 @@ function ConversationChat() {
     }
   };
 
+  // Large files go through the resumable upload endpoints: every chunk is sent
+  // with its SHA-256, and after a failure only the chunks the server is
+  // missing are sent again.
+  const uploadInChunks = async (file) => {
+    const uploadsUrl = `${baseUrl}/api/conversations/job/${jobId}/uploads/`;
+    const { data: session } = await axios.post(
+      uploadsUrl,
+      { filename: file.name, content_type: file.type, size: file.size },
+      { withCredentials: true }
+    );
+    const sessionUrl = `${uploadsUrl}${session.upload_id}/`;
+
+    let missing = session.missing_chunks;
+    for (let attempt = 0; missing.length > 0; attempt++) {
+      try {
+        for (const index of missing) {
+          const chunk = await file
+            .slice(index * session.chunk_size, (index + 1) * session.chunk_size)
+            .arrayBuffer();
+          const digest = await crypto.subtle.digest('SHA-256', chunk);
+          const checksum = Array.from(new Uint8Array(digest))
+            .map((byte) => byte.toString(16).padStart(2, '0'))
+            .join('');
+          await axios.put(`${sessionUrl}chunks/${index}/`, chunk, {
+            withCredentials: true,
+            headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': checksum },
+          });
+        }
+        missing = [];
+      } catch (error) {
+        if (attempt >= 3) throw error;
+        console.warn('Chunk upload failed, resuming:', error.message);
+        const { data: status } = await axios.get(sessionUrl, { withCredentials: true });
+        missing = status.missing_chunks;
+      }
+    }
+
+    return axios.post(`${sessionUrl}complete/`, {}, { withCredentials: true });
+  };
+
   const handleFileUpload = async (e) => {
     const file = e.target.files[0];
     if (!file || !socketConnected) return;
 
-    const maxSize = 10 * 1024 * 1024;
+    const maxSize = 100 * 1024 * 1024;
     if (file.size > maxSize) {
-      setSocketError('File size exceeds 10MB limit');
+      setSocketError('File size exceeds 100MB limit');
       e.target.value = null;
       return;
     }
@@ -440,19 +512,23 @@ function ConversationChat() {
       return;
     }
 
-    const formData = new FormData();
-    formData.append('file', file);
-    
     try {
       console.log('Uploading file:', file.name);
-      const response = await axios.post(
-        `${baseUrl}/api/conversations/job/${jobId}/file/`,
-        formData,
-        {
-          withCredentials: true,
-          headers: { 'Content-Type': 'multipart/form-data' },
-        }
-      );
+      let response;
+      if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        response = await uploadInChunks(file);
+      } else {
+        const formData = new FormData();
+        formData.append('file', file);
+        response = await axios.post(
+          `${baseUrl}/api/conversations/job/${jobId}/file/`,
+          formData,
+          {
+            withCredentials: true,
+            headers: { 'Content-Type': 'multipart/form-data' },
+          }
+        );
+      }
       console.log('File uploaded:', response.data);
       addSystemMessage(`File "${file.name}" uploaded successfully`);
     } catch (error) {
@@ -580,6 +656,13 @@ function ConversationChat() {
       )}
 
       <div className="messages-container">
+        {olderCursor && (
+          <div className="date-divider">
+            <button onClick={loadOlderMessages} disabled={loadingOlder}>
+              {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+            </button>
+          </div>
+        )}
         {Object.keys(messageGroups).length === 0 ? (
           <div className="no-messages">
             <p>No messages yet</p>
@@ -613,7 +696,7 @@ function ConversationChat() {
                       {message.file_type === 'image' && message.file_url ? (
                         <div className="message-image">
                           <img
-                            src={getValidFileUrl(message.file_url)}
+                            src={getValidFileUrl(message.variants?.thumbnail?.url || message.file_url)}
                             alt="Uploaded image"
                             style={{ maxWidth: '200px', borderRadius: '8px', cursor: 'pointer' }}
                             onClick={() => openImageModal(getValidFileUrl(message.file_url))}
@@ -6,6 +6,8 @@ import { AuthContext } from '../../context/AuthContext';
 import './ProfessionalJobView.css';
 
 const baseUrl = import.meta.env.VITE_API_URL;
+const MIN_SEARCH_LENGTH = 2;
+const SEARCH_DEBOUNCE_MS = 300;
 
 // Updated File Display Component for Job Documents
 const JobDocumentAttachment = ({ documentData, documentInfo }) => {
@@ -318,10 +320,16 @@ function ProfessionalJobs() {
   const { user, isAuthenticated } = authContext || { user: null, isAuthenticated: false };
 
   const [openJobs, setOpenJobs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [currentPage, setCurrentPage] = useState(1);
   const [jobsPerPage] = useState(5);
   const [searchQuery, setSearchQuery] = useState('');
+  // Server-side search results; null while the search box is (nearly) empty
+  const [searchResults, setSearchResults] = useState(null);
+  const [searchMode, setSearchMode] = useState(null);
+  const [searchNextPage, setSearchNextPage] = useState(null);
   const [sortOrder, setSortOrder] = useState('default');
   const [profileData, setProfileData] = useState(null);
   const [profileLoading, setProfileLoading] = useState(true);
@@ -360,7 +368,8 @@ function ProfessionalJobs() {
           withCredentials: true,
         });
         console.log('Fetched jobs with documents:', response.data); // Debug log
-        setOpenJobs(response.data);
+        setOpenJobs(response.data.results);
+        setNextCursor(response.data.next_cursor);
         setLoading(false);
       } catch (err) {
         const errorMessage = err.response?.data?.error || 'Failed to fetch open jobs';
@@ -381,6 +390,81 @@ function ProfessionalJobs() {
     }
   }, [isAuthenticated, user]);
 
+  const loadMoreJobs = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${baseUrl}/api/open-jobs/`, {
+        params: { cursor: nextCursor },
+        withCredentials: true,
+      });
+      setOpenJobs((prevJobs) => [...prevJobs, ...response.data.results]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      const errorMessage = err.response?.data?.error || 'Failed to fetch more jobs';
+      Swal.fire({
+        icon: 'error',
+        title: 'Error',
+        text: errorMessage,
+        confirmButtonColor: '#dc3545',
+        timer: 3000,
+        timerProgressBar: true,
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Search open jobs on the server once the user stops typing
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (query.length < MIN_SEARCH_LENGTH) {
+      setSearchResults(null);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${baseUrl}/api/open-jobs/search/`, {
+          params: { q: query },
+          withCredentials: true,
+        });
+        if (cancelled) return;
+        setSearchResults(response.data.results);
+        setSearchMode(response.data.mode);
+        setSearchNextPage(response.data.next_page);
+      } catch (err) {
+        if (!cancelled) {
+          console.error('Error searching jobs:', err);
+          setSearchResults(null);
+        }
+      }
+    }, SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
+  const loadMoreSearchResults = async () => {
+    if (!searchNextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${baseUrl}/api/open-jobs/search/`, {
+        params: { q: searchQuery.trim(), page: searchNextPage, mode: searchMode },
+        withCredentials: true,
+      });
+      setSearchResults((prevJobs) => [...(prevJobs || []), ...response.data.results]);
+      setSearchNextPage(response.data.next_page);
+    } catch (err) {
+      console.error('Error loading more search results:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Redirect if not authenticated as professional
   useEffect(() => {
     if (!isAuthenticated || !user || user.role !== 'professional') {
@@ -443,10 +527,11 @@ function ProfessionalJobs() {
     }
   };
 
-  // Filter and sort jobs
-  const filteredJobs = openJobs
+  // Filter and sort jobs; server search results arrive already matched and ranked
+  const filteredJobs = (searchResults ?? openJobs)
     .filter(
       (job) =>
+        searchResults !== null ||
         (job.title?.toLowerCase() || '').includes(searchQuery.toLowerCase()) ||
         (job.description?.toLowerCase() || '').includes(searchQuery.toLowerCase()) ||
         (job.client_id?.name?.toLowerCase() || '').includes(searchQuery.toLowerCase())
@@ -598,7 +683,7 @@ function ProfessionalJobs() {
           <div className="search-bar">
             <input
               type="text"
-              placeholder="Search by title, description, or client name..."
+              placeholder="Search by title or description..."
               value={searchQuery}
               onChange={handleSearchChange}
               className="search-input"
@@ -716,6 +801,18 @@ function ProfessionalJobs() {
             )}
           </div>
         )}
+
+        {(searchResults === null ? nextCursor : searchNextPage) && (
+          <div className="pagination-container">
+            <button
+              onClick={searchResults === null ? loadMoreJobs : loadMoreSearchResults}
+              disabled={loadingMore}
+              className="page-btn"
+            >
+              {loadingMore ? 'Loading...' : 'Load more jobs'}
+            </button>
+          </div>
+        )}
         
         <div className="back-link">
           <a href="#" onClick={(e) => { e.preventDefault(); navigate('/professional-dashboard'); }}>
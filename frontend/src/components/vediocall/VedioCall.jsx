@@ -227,6 +227,20 @@ useEffect(() => {
             }
             break;
 
+        case 'ice_candidates':
+            // Candidates the server batched together; handle each like a single one
+            if (parseInt(data.sender_id, 10) === myId) {
+                break;
+            }
+            (data.ice_candidates || []).forEach((candidate) => {
+                if (!peerConnectionRef.current || !peerConnectionRef.current.remoteDescription) {
+                    iceCandidatesBuffer.current.push(candidate);
+                } else {
+                    handleNewICECandidate({ ...data, ice_candidate: candidate });
+                }
+            });
+            break;
+
         case 'call_ended':
             if (!data.user_id) {
                 console.error('Received call_ended without user_id');